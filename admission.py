@@ -0,0 +1,154 @@
+import collections
+import itertools
+import math
+import threading
+import time
+
+
+class AdmissionRejected(Exception):
+    """Raised when a lane cannot admit a request; carries the HTTP status."""
+    def __init__(self, message, status, retry_after):
+        super().__init__(message)
+        self.status = status
+        self.retry_after = retry_after
+
+
+class Lane:
+    """Concurrency limit with a bounded, fair-share wait queue.
+
+    At most `limit` requests run at once and `max_waiting` more may wait up
+    to `queue_timeout` seconds for a slot. While several clients compete,
+    each client runs at most its fair share (limit / active clients) so one
+    busy client cannot take the whole lane; `per_client` additionally caps
+    how many requests a single client may have running or waiting.
+    """
+    def __init__(self, name, limit, max_waiting=0, queue_timeout=30, per_client=None):
+        self.name = name
+        self.limit = limit
+        self.max_waiting = max_waiting
+        self.queue_timeout = queue_timeout
+        self.per_client = per_client
+        self.admitted = 0
+        self.rejected = 0
+        self.timed_out = 0
+        self._running = collections.Counter()
+        self._waiting = collections.deque()
+        self._tickets = itertools.count()
+        self._cond = threading.Condition()
+        self._avg_duration = 1.0
+
+    def _share(self):
+        clients = set(self._running) | {client for _, client in self._waiting}
+        return max(1, self.limit // max(1, len(clients)))
+
+    def _next_ticket(self):
+        """The oldest waiting ticket whose client is under its fair share."""
+        if sum(self._running.values()) >= self.limit:
+            return None
+        share = self._share()
+        for ticket, client in self._waiting:
+            if self._running[client] < share:
+                return ticket
+        return None
+
+    def acquire(self, client):
+        """Block until `client` may run; raises AdmissionRejected otherwise."""
+        with self._cond:
+            held = self._running[client] + sum(1 for _, c in self._waiting if c == client)
+            if self.per_client and held >= self.per_client:
+                self.rejected += 1
+                raise AdmissionRejected(f"Too many {self.name} requests from this client",
+                                        429, self._retry_after_locked())
+            if len(self._waiting) >= self.max_waiting and not self._can_start(client):
+                self.rejected += 1
+                raise AdmissionRejected(f"{self.name.capitalize()} lane is full",
+                                        429, self._retry_after_locked())
+            ticket = next(self._tickets)
+            entry = (ticket, client)
+            self._waiting.append(entry)
+            deadline = time.monotonic() + self.queue_timeout
+            try:
+                while self._next_ticket() != ticket:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self.timed_out += 1
+                        raise AdmissionRejected(f"Timed out waiting for a {self.name} slot",
+                                                503, self._retry_after_locked())
+                    self._cond.wait(remaining)
+            finally:
+                self._waiting.remove(entry)
+                # Our departure may make the next ticket eligible.
+                self._cond.notify_all()
+            self._running[client] += 1
+            self.admitted += 1
+            return time.monotonic()
+
+    def _can_start(self, client):
+        return not self._waiting and sum(self._running.values()) < self.limit \
+            and self._running[client] < self._share()
+
+    def _retry_after_locked(self):
+        # Time for the backlog ahead of a new request to drain, from the
+        # recent average hold time.
+        backlog = len(self._waiting) + sum(self._running.values())
+        return max(1, math.ceil(self._avg_duration * backlog / max(1, self.limit)))
+
+    def release(self, client, started):
+        with self._cond:
+            self._running[client] -= 1
+            if self._running[client] <= 0:
+                del self._running[client]
+            self._avg_duration = 0.8 * self._avg_duration + 0.2 * (time.monotonic() - started)
+            self._cond.notify_all()
+
+    def stats(self):
+        with self._cond:
+            return {
+                'limit': self.limit,
+                'max_waiting': self.max_waiting,
+                'running': sum(self._running.values()),
+                'waiting': len(self._waiting),
+                'clients': len(set(self._running) | {client for _, client in self._waiting}),
+                'admitted': self.admitted,
+                'rejected': self.rejected,
+                'timed_out': self.timed_out,
+            }
+
+
+class Admission:
+    """Routes requests to lanes by path; unrouted paths are never held back."""
+    def __init__(self):
+        self.lanes = {}
+        self._routes = {}
+
+    def add_lane(self, lane, routes):
+        self.lanes[lane.name] = lane
+        for route in routes:
+            self._routes[route] = lane
+        return lane
+
+    def lane_for(self, path):
+        return self._routes.get(path)
+
+    def fit(self, threads, reserve=1):
+        """Shrink the lanes so that `reserve` server threads stay free.
+
+        A waiting request holds a server thread just like a running one, so
+        the lanes together may occupy at most `threads - reserve` threads.
+        Queues are shortened first, then limits (never below 1).
+        """
+        budget = max(0, threads - reserve)
+        lanes = list(self.lanes.values())
+        while sum(lane.limit + lane.max_waiting for lane in lanes) > budget:
+            waiting = max(lanes, key=lambda lane: lane.max_waiting)
+            if waiting.max_waiting > 0:
+                waiting.max_waiting -= 1
+                continue
+            running = max(lanes, key=lambda lane: lane.limit)
+            if running.limit <= 1:
+                return False
+            running.limit -= 1
+        return True
+
+    def stats(self):
+        return {name: lane.stats() for name, lane in self.lanes.items()}
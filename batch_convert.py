@@ -0,0 +1,149 @@
+import hashlib
+import json
+import os
+import uuid
+import zipfile
+import zlib
+from datetime import datetime
+
+import fitz
+from werkzeug.utils import secure_filename
+
+CHUNK_SIZE = 1024 * 1024
+
+
+class BatchError(ValueError):
+    pass
+
+
+def extract_zip(path, folder, max_bytes):
+    """Extract the files of an uploaded ZIP into `folder`.
+
+    Returns `(filename, path, sha256)` per member in archive order. Directory
+    entries are skipped and the archive is rejected when its members add up to
+    more than `max_bytes` once uncompressed. On BatchError nothing extracted
+    is left behind.
+    """
+    try:
+        archive = zipfile.ZipFile(path)
+    except zipfile.BadZipFile as e:
+        raise BatchError(f"Invalid ZIP archive: {e}") from e
+    with archive:
+        members = [info for info in archive.infolist() if not info.is_dir()]
+        if sum(info.file_size for info in members) > max_bytes:
+            raise BatchError(f"ZIP archive expands to more than {max_bytes} bytes")
+        timestamp = datetime.now().strftime('%Y%m%d%H%M%S')
+        extracted = []
+        target = None
+        try:
+            for info in members:
+                filename = secure_filename(os.path.basename(info.filename)) or 'member'
+                target = os.path.abspath(os.path.join(folder, f"{timestamp}_{uuid.uuid4().hex[:8]}_{filename}"))
+                sha256 = hashlib.sha256()
+                written = 0
+                with archive.open(info) as src, open(target, 'wb') as dst:
+                    while True:
+                        chunk = src.read(CHUNK_SIZE)
+                        if not chunk:
+                            break
+                        written += len(chunk)
+                        if written > info.file_size:
+                            raise BatchError(f"ZIP member {info.filename} is larger than declared")
+                        sha256.update(chunk)
+                        dst.write(chunk)
+                extracted.append((filename, target, sha256.hexdigest()))
+                target = None
+        except (zipfile.BadZipFile, zlib.error, RuntimeError, NotImplementedError) as e:
+            # Corrupt data, encrypted or unsupported members.
+            _remove([path for _, path, _ in extracted] + [target])
+            raise BatchError(f"Cannot extract ZIP archive: {e}") from e
+        except BaseException:
+            _remove([path for _, path, _ in extracted] + [target])
+            raise
+        return extracted
+
+
+def _remove(paths):
+    for path in paths:
+        if path and os.path.exists(path):
+            os.remove(path)
+
+
+class _StreamBuffer:
+    """Write-only, unseekable sink that zipfile writes into; drained by the
+    response generator between chunks."""
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def output_name(index, filename):
+    return f"{index + 1:03d}_{filename.rsplit('.', 1)[0]}.pdf"
+
+
+def stream_zip(members):
+    """Yield a ZIP of converted PDFs as each member completes, in order.
+
+    `members` is a list of `(filename, job)`; a `report.json` with the outcome
+    of every member is appended at the end.
+    """
+    buffer = _StreamBuffer()
+    report = []
+    with zipfile.ZipFile(buffer, 'w', compression=zipfile.ZIP_STORED) as archive:
+        for index, (filename, job) in enumerate(members):
+            job.wait()
+            if job.status != 'done':
+                report.append({"filename": filename, "status": "failed", "error": str(job.error)})
+                continue
+            output_path, _ = job.result
+            name = output_name(index, filename)
+            with open(output_path, 'rb') as src, archive.open(name, 'w', force_zip64=True) as dst:
+                while True:
+                    chunk = src.read(CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    dst.write(chunk)
+                    yield buffer.drain()
+            report.append({"filename": filename, "status": "done", "output": name})
+            yield buffer.drain()
+        archive.writestr('report.json', json.dumps(report, indent=2))
+    yield buffer.drain()
+
+
+def merge_pdfs(members, output_path):
+    """Merge the converted members into one PDF with a bookmark per file.
+
+    Returns the per-member report; failed members are left out of the PDF.
+    """
+    report = []
+    toc = []
+    merged = fitz.open()
+    try:
+        for filename, job in members:
+            job.wait()
+            if job.status != 'done':
+                report.append({"filename": filename, "status": "failed", "error": str(job.error)})
+                continue
+            output_path_member, _ = job.result
+            with fitz.open(output_path_member) as doc:
+                toc.append([1, filename, merged.page_count + 1])
+                merged.insert_pdf(doc)
+            report.append({"filename": filename, "status": "done"})
+        if merged.page_count == 0:
+            raise BatchError("No file in the batch could be converted")
+        merged.set_toc(toc)
+        merged.save(output_path, garbage=1, deflate=True)
+    finally:
+        merged.close()
+    return report
@@ -0,0 +1,328 @@
+"""Load and latency benchmark for /ping, /convert and /extract-signature.
+
+    python -m benchmarks.http_load [--threads 4 8] [--concurrency 1 8 32]
+                                   [--requests 200] [--output run.json]
+                                   [--compare baseline.json]
+
+The app is served by waitress in a child process with the fake converter
+backend, so the numbers are reproducible on any machine. The child process
+reports its own CPU time and RSS, which keeps the load generator out of the
+server figures. Results are written as JSON; --compare prints the change
+against an earlier run and exits with 1 when p95 latency or throughput
+regressed by more than --tolerance.
+"""
+import argparse
+import http.client
+import io
+import json
+import multiprocessing
+import os
+import platform
+import socket
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import uuid
+import zipfile
+
+from benchmarks.signed_pdf import make_pdf
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ENDPOINTS = ['/ping', '/extract-signature', '/convert']
+# /extract-signature answers unsigned PDFs with 400.
+EXPECTED_STATUSES = {'/ping': {200}, '/extract-signature': {200, 400}, '/convert': {200}}
+
+
+def make_docx(text):
+    """Smallest OOXML package Word accepts, with `text` as its only paragraph."""
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr('[Content_Types].xml',
+                         '<?xml version="1.0" encoding="UTF-8"?>'
+                         '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+                         '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+                         '<Default Extension="xml" ContentType="application/xml"/>'
+                         '<Override PartName="/word/document.xml" ContentType="application/'
+                         'vnd.openxmlformats-officedocument.wordprocessingml.document.main+xml"/></Types>')
+        archive.writestr('_rels/.rels',
+                         '<?xml version="1.0" encoding="UTF-8"?>'
+                         '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+                         '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/'
+                         'relationships/officeDocument" Target="word/document.xml"/></Relationships>')
+        archive.writestr('word/document.xml',
+                         '<?xml version="1.0" encoding="UTF-8"?>'
+                         '<w:document xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main">'
+                         f'<w:body><w:p><w:r><w:t>{text}</w:t></w:r></w:p></w:body></w:document>')
+    return buffer.getvalue()
+
+
+def build_corpus(documents, pages, unique):
+    """Payload factories per endpoint; each returns (filename, bytes) or None.
+
+    A third of the PDFs are unsigned, which /extract-signature answers with
+    400. With `unique` every conversion payload is distinct, so /convert
+    measures the converter rather than the conversion cache.
+    """
+    signed = [(f'signed_{i}.pdf', make_pdf(pages=pages, signatures=i % 3)) for i in range(documents)]
+    cached = ('cached.docx', make_docx('cached'))
+    return {
+        '/ping': [lambda: None],
+        '/extract-signature': [lambda payload=payload: payload for payload in signed],
+        '/convert': [lambda: (f'{uuid.uuid4().hex}.docx', make_docx(uuid.uuid4().hex)) if unique else cached],
+    }
+
+
+def _rss():
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss
+    except ImportError:
+        pass
+    try:
+        with open('/proc/self/statm') as statm:
+            return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except OSError:
+        return None
+
+
+def _report_stats(conn):
+    while True:
+        try:
+            conn.recv()
+        except EOFError:
+            return
+        conn.send((time.process_time(), _rss()))
+
+
+def serve_app(port, threads, connection_limit, converters, convert_delay, workdir, conn):
+    """Child process: run main.app under waitress with the fake backend."""
+    os.chdir(workdir)
+    sys.path.insert(0, ROOT)
+    import logging
+    from waitress import serve
+    import main
+    from office_converter import ConverterPool, FakeConverter, default_factories
+
+    main.log_pipeline.echo = False
+    # waitress warns on every queued request once its threads are saturated.
+    logging.getLogger('waitress.queue').setLevel(logging.ERROR)
+    FakeConverter.convert_delay = convert_delay
+    main.converter_pool = ConverterPool(factories=default_factories('fake'), size=converters)
+    main.converter_pool.start()
+    main.job_queue.workers = converters * len(main.converter_pool.factories)
+    # Same lane sizes as main.py's defaults for this many threads.
+    main.size_lanes(threads, main.job_queue.workers, 8, main.app.config['CPU_WORKERS'])
+    threading.Thread(target=_report_stats, args=(conn,), daemon=True).start()
+    serve(main.app, host='127.0.0.1', port=port, threads=threads,
+          connection_limit=connection_limit, _quiet=True)
+
+
+def _multipart(filename, data):
+    boundary = uuid.uuid4().hex
+    body = (f'--{boundary}\r\nContent-Disposition: form-data; name="file"; filename="{filename}"\r\n'
+            f'Content-Type: application/octet-stream\r\n\r\n').encode() + data + f'\r\n--{boundary}--\r\n'.encode()
+    return body, {'Content-Type': f'multipart/form-data; boundary={boundary}'}
+
+
+def _percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+class Server:
+    """Handle on the child process; samples its CPU time and RSS."""
+    def __init__(self, threads, connection_limit, converters, convert_delay, workdir):
+        with socket.socket() as probe:
+            probe.bind(('127.0.0.1', 0))
+            self.port = probe.getsockname()[1]
+        self._conn, child_conn = multiprocessing.Pipe()
+        self._lock = threading.Lock()
+        self.process = multiprocessing.Process(
+            target=serve_app,
+            args=(self.port, threads, connection_limit, converters, convert_delay, workdir, child_conn),
+            daemon=True,
+        )
+
+    def __enter__(self):
+        self.process.start()
+        deadline = time.monotonic() + 60
+        while True:
+            try:
+                connection = http.client.HTTPConnection('127.0.0.1', self.port, timeout=5)
+                connection.request('GET', '/ping')
+                connection.getresponse().read()
+                connection.close()
+                return self
+            except OSError:
+                if time.monotonic() > deadline or not self.process.is_alive():
+                    raise RuntimeError('Benchmark server did not start')
+                time.sleep(0.2)
+
+    def __exit__(self, *exc):
+        self.process.terminate()
+        self.process.join(10)
+
+    def stats(self):
+        with self._lock:
+            self._conn.send(None)
+            return self._conn.recv()
+
+
+def run_endpoint(server, endpoint, payloads, concurrency, count, timeout):
+    """Drive `count` requests with `concurrency` keep-alive clients."""
+    latencies = []
+    statuses = {}
+    issued = iter(range(count))
+    lock = threading.Lock()
+    stop = threading.Event()
+    peak_rss = [0]
+
+    def client():
+        connection = http.client.HTTPConnection('127.0.0.1', server.port, timeout=timeout)
+        while True:
+            with lock:
+                index = next(issued, None)
+            if index is None:
+                break
+            payload = payloads[index % len(payloads)]()
+            if payload is None:
+                body, headers, method = None, {}, 'GET'
+            else:
+                body, headers = _multipart(*payload)
+                method = 'POST'
+            start = time.perf_counter()
+            try:
+                connection.request(method, endpoint, body=body, headers=headers)
+                response = connection.getresponse()
+                response.read()
+                status = response.status
+            except (OSError, http.client.HTTPException):
+                connection.close()
+                connection = http.client.HTTPConnection('127.0.0.1', server.port, timeout=timeout)
+                status = 'error'
+            elapsed = time.perf_counter() - start
+            with lock:
+                latencies.append(elapsed)
+                statuses[status] = statuses.get(status, 0) + 1
+        connection.close()
+
+    def sample_rss():
+        while not stop.wait(0.1):
+            peak_rss[0] = max(peak_rss[0], server.stats()[1] or 0)
+
+    cpu_before, rss_before = server.stats()
+    sampler = threading.Thread(target=sample_rss, daemon=True)
+    sampler.start()
+    started = time.perf_counter()
+    clients = [threading.Thread(target=client) for _ in range(concurrency)]
+    for thread in clients:
+        thread.start()
+    for thread in clients:
+        thread.join()
+    duration = time.perf_counter() - started
+    stop.set()
+    sampler.join()
+    cpu_after, rss_after = server.stats()
+
+    # Only the statuses the corpus is built to produce are served requests;
+    # 429 and 503 from admission, other 4xx, 5xx and dropped connections
+    # are errors and do not count towards throughput.
+    errors = sum(n for status, n in statuses.items() if status not in EXPECTED_STATUSES[endpoint])
+    return {
+        'requests': count,
+        'concurrency': concurrency,
+        'statuses': {str(status): n for status, n in statuses.items()},
+        'duration_s': round(duration, 3),
+        'errors': errors,
+        'throughput_rps': round((count - errors) / duration, 1),
+        'latency_ms': {
+            'p50': round(_percentile(latencies, 0.50) * 1000, 2),
+            'p95': round(_percentile(latencies, 0.95) * 1000, 2),
+            'p99': round(_percentile(latencies, 0.99) * 1000, 2),
+            'max': round(max(latencies) * 1000, 2),
+            'mean': round(statistics.fmean(latencies) * 1000, 2),
+        },
+        'server_cpu_percent': round((cpu_after - cpu_before) / duration * 100, 1),
+        'server_rss_mb': round(max(peak_rss[0], rss_before or 0, rss_after or 0) / 1024 / 1024, 1) or None,
+    }
+
+
+def compare(baseline, current, tolerance):
+    """Print per-scenario changes; return the regressed scenario names."""
+    regressions = []
+    old = {(r['threads'], r['endpoint'], r['concurrency']): r for r in baseline['results']}
+    print(f"\n{'scenario':<42} {'p95 ms':>16} {'rps':>16}")
+    for result in current['results']:
+        key = (result['threads'], result['endpoint'], result['concurrency'])
+        previous = old.get(key)
+        if previous is None:
+            continue
+        p95, old_p95 = result['latency_ms']['p95'], previous['latency_ms']['p95']
+        rps, old_rps = result['throughput_rps'], previous['throughput_rps']
+        name = f"threads={key[0]} {key[1]} c={key[2]}"
+        flag = ''
+        if p95 > old_p95 * (1 + tolerance) or rps < old_rps * (1 - tolerance):
+            regressions.append(name)
+            flag = '  REGRESSION'
+        print(f"{name:<42} {old_p95:>7} -> {p95:<7} {old_rps:>7} -> {rps:<7}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--endpoints', nargs='+', choices=ENDPOINTS, default=ENDPOINTS)
+    parser.add_argument('--threads', type=int, nargs='+', default=[4], help='waitress thread counts to compare')
+    parser.add_argument('--connection_limit', type=int, default=200)
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 8, 32])
+    parser.add_argument('--requests', type=int, default=200, help='Requests per endpoint and concurrency level')
+    parser.add_argument('--warmup', type=int, default=20)
+    parser.add_argument('--converters', type=int, default=2, help='Fake converter instances per document type')
+    parser.add_argument('--convert_delay', type=float, default=0.05, help='Seconds the fake converter takes per document')
+    parser.add_argument('--documents', type=int, default=50, help='Distinct documents in the corpus')
+    parser.add_argument('--pages', type=int, default=20, help='Pages per generated PDF')
+    parser.add_argument('--cache_hits', action='store_true', help='Convert the same document every time')
+    parser.add_argument('--timeout', type=float, default=120)
+    parser.add_argument('--output', default='http_load.json')
+    parser.add_argument('--compare', help='Earlier result file to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.15, help='Allowed relative regression. Default 0.15')
+    args = parser.parse_args()
+
+    corpus = build_corpus(args.documents, args.pages, unique=not args.cache_hits)
+    run = {
+        'started_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'platform': {'python': platform.python_version(), 'system': platform.platform(), 'cpus': os.cpu_count()},
+        'config': {key: value for key, value in vars(args).items() if key not in ('output', 'compare')},
+        'results': [],
+    }
+    print(f"{'threads':>7} {'endpoint':<20} {'conc':>5} {'rps':>8} {'p50 ms':>8} {'p95 ms':>8} "
+          f"{'p99 ms':>8} {'cpu %':>6} {'rss MB':>7} {'errors':>6}")
+    for threads in args.threads:
+        with tempfile.TemporaryDirectory() as workdir, \
+                Server(threads, args.connection_limit, args.converters, args.convert_delay, workdir) as server:
+            for endpoint in args.endpoints:
+                run_endpoint(server, endpoint, corpus[endpoint], 1, args.warmup, args.timeout)
+                for concurrency in args.concurrency:
+                    result = run_endpoint(server, endpoint, corpus[endpoint], concurrency, args.requests, args.timeout)
+                    result.update(threads=threads, endpoint=endpoint)
+                    run['results'].append(result)
+                    errors = result['errors']
+                    latency = result['latency_ms']
+                    print(f"{threads:>7} {endpoint:<20} {concurrency:>5} {result['throughput_rps']:>8} "
+                          f"{latency['p50']:>8} {latency['p95']:>8} {latency['p99']:>8} "
+                          f"{result['server_cpu_percent']:>6} {result['server_rss_mb'] or '-':>7} {errors:>6}")
+
+    with open(args.output, 'w') as f:
+        json.dump(run, f, indent=2)
+    print(f"\nResults written to {args.output}")
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(json.load(f), run, args.tolerance)
+        if regressions:
+            print(f"{len(regressions)} scenario(s) regressed by more than {args.tolerance:.0%}")
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
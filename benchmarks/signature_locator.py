@@ -0,0 +1,51 @@
+"""Compare the memory-mapped signature locator with the pypdf form walk.
+
+    python -m benchmarks.signature_locator [--pages 10 100 500 2000] [--repeat 5]
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import time
+import tracemalloc
+
+from benchmarks.signed_pdf import make_pdf
+from pdf_signature_extract import SignatureExtract
+
+
+def measure(fn, path, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(path)
+        timings.append(time.perf_counter() - start)
+    tracemalloc.start()
+    fn(path)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return statistics.median(timings), peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--pages', type=int, nargs='+', default=[10, 100, 500, 2000])
+    parser.add_argument('--signatures', type=int, default=2)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    extract = SignatureExtract()
+    print(f"{'pages':>6} {'size MB':>8} {'locator ms':>11} {'pypdf ms':>9} {'speedup':>8} {'locator KB':>11} {'pypdf KB':>9}")
+    with tempfile.TemporaryDirectory() as folder:
+        for pages in args.pages:
+            path = os.path.join(folder, f"signed_{pages}.pdf")
+            with open(path, 'wb') as f:
+                f.write(make_pdf(pages=pages, signatures=args.signatures, timestamp=True))
+            assert len(extract.locate_signatures(path)) == len(extract.read_signature_fields(path))
+            fast, fast_peak = measure(extract.locate_signatures, path, args.repeat)
+            slow, slow_peak = measure(extract.read_signature_fields, path, args.repeat)
+            print(f"{pages:>6} {os.path.getsize(path) / 1e6:>8.2f} {fast * 1000:>11.2f} {slow * 1000:>9.2f} "
+                  f"{slow / fast:>7.1f}x {fast_peak / 1024:>11.0f} {slow_peak / 1024:>9.0f}")
+
+
+if __name__ == '__main__':
+    main()
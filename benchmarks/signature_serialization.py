@@ -0,0 +1,104 @@
+"""Per-signature cost of building and serializing /extract-signature results.
+
+    python -m benchmarks.signature_serialization [--signatures 1 10 100] [--repeat 200]
+
+Parsing is done once up front; only what happens after it is timed. The
+legacy path is the one /extract-signature used before SignatureDetails
+became a slotted type: copy every field through the AttrClass wrappers,
+build nested dicts, then let Flask serialize them.
+"""
+import argparse
+import io
+import json
+import statistics
+import time
+import tracemalloc
+
+from werkzeug.http import http_date
+
+from benchmarks.signed_pdf import make_pdf
+from pdf_signature_extract import Signature, SignatureDetails, SignatureExtract, dumps_signatures
+
+
+def _default(value):
+    # What Flask's JSON provider does with dates.
+    if hasattr(value, 'isoformat'):
+        return http_date(value)
+    raise TypeError(value)
+
+
+def legacy_details(signature):
+    """The former SignatureDetails.from_signature(...).to_dict()."""
+    certificate = signature.certificate
+    issuer = certificate.issuer
+    subject = signature.certificate.subject
+    return {
+        "digest_algorithm": signature.digest_algorithm,
+        "signature_algorithm": signature.signature_algorithm,
+        "content_type": signature.content_type,
+        "type": signature.type,
+        "signer_contact_info": signature.signer_contact_info,
+        "signer_location": signature.signer_location,
+        "signing_time": signature.signing_time,
+        "signature_type": signature.signature_type,
+        "signature_handler": signature.signature_handler,
+        "valid_from": certificate.validity.not_before,
+        "valid_to": certificate.validity.not_after,
+        "issuer": {
+            "country_name": issuer.country_name,
+            "organization_name": issuer.organization_name,
+            "common_name": issuer.common_name,
+        },
+        "subject": {
+            "country_name": subject.country_name,
+            "organization_name": subject.organization_name,
+            "organizational_unit_name": subject.organizational_unit_name,
+            "common_name": subject.common_name,
+            "locality_name": signature.locality_name,
+        },
+    }
+
+
+def legacy(attrdicts):
+    signatures = [Signature(dict(attrdict)) for attrdict in attrdicts]
+    return json.dumps([legacy_details(signature) for signature in signatures],
+                      default=_default, sort_keys=True, separators=(',', ':'))
+
+
+def current(attrdicts):
+    return dumps_signatures([SignatureDetails.from_attrdict(attrdict) for attrdict in attrdicts])
+
+
+def measure(fn, attrdicts, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(attrdicts)
+        timings.append(time.perf_counter() - start)
+    tracemalloc.start()
+    fn(attrdicts)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return statistics.median(timings) / len(attrdicts), peak / len(attrdicts)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--signatures', type=int, nargs='+', default=[1, 10, 100])
+    parser.add_argument('--repeat', type=int, default=200)
+    args = parser.parse_args()
+
+    extract = SignatureExtract(cache=False)
+    print(f"{'signatures':>10} {'legacy us':>10} {'slots us':>9} {'speedup':>8} {'legacy B':>9} {'slots B':>8}")
+    for count in args.signatures:
+        pdf = make_pdf(pages=1, signatures=count)
+        attrdicts = list(extract._signature_attrdicts(io.BytesIO(pdf)))
+        assert len(json.loads(legacy(attrdicts))) == len(json.loads(current(attrdicts))) == count
+        old, old_peak = measure(legacy, attrdicts, args.repeat)
+        new, new_peak = measure(current, attrdicts, args.repeat)
+        print(f"{count:>10} {old * 1e6:>10.1f} {new * 1e6:>9.1f} {old / new:>7.1f}x "
+              f"{old_peak:>9.0f} {new_peak:>8.0f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,191 @@
+"""Generate signed and unsigned PDFs for benchmarks.
+
+The signatures are structurally valid CMS SignedData packages with a
+correct message digest over the /ByteRange, signed by a throw-away
+certificate. The RSA signature value itself is random bytes, which is
+enough for extraction and digest verification but not for a real trust
+check. Document timestamps are RFC 3161 tokens whose TSTInfo carries the
+/ByteRange digest as its message imprint.
+"""
+import hashlib
+import os
+from datetime import datetime, timedelta, timezone
+
+from asn1crypto import algos, cms, core, keys, tsp, x509
+
+CONTENTS_SIZE = 8192
+
+
+def _name(common_name, organization="Benchmark Org", country="VN"):
+    return x509.Name.build({
+        'country_name': country,
+        'organization_name': organization,
+        'common_name': common_name,
+    })
+
+
+def make_certificate(common_name, issuer_name="Benchmark CA", serial=1000, days=365):
+    now = datetime.now(timezone.utc).replace(microsecond=0)
+    public_key = keys.RSAPublicKey({'modulus': int.from_bytes(os.urandom(256), 'big') | 1, 'public_exponent': 65537})
+    return x509.Certificate({
+        'tbs_certificate': {
+            'version': 'v3',
+            'serial_number': serial,
+            'signature': {'algorithm': 'sha256_rsa'},
+            'issuer': _name(issuer_name),
+            'validity': {
+                'not_before': x509.Time({'utc_time': now - timedelta(days=1)}),
+                'not_after': x509.Time({'utc_time': now + timedelta(days=days)}),
+            },
+            'subject': _name(common_name),
+            'subject_public_key_info': {
+                'algorithm': {'algorithm': 'rsa'},
+                'public_key': public_key,
+            },
+        },
+        'signature_algorithm': {'algorithm': 'sha256_rsa'},
+        'signature_value': os.urandom(256),
+    })
+
+
+def make_tst_info(digest, serial=1):
+    return tsp.TSTInfo({
+        'version': 'v1',
+        'policy': '1.2.3.4.1',
+        'message_imprint': {
+            'hash_algorithm': {'algorithm': 'sha256'},
+            'hashed_message': digest,
+        },
+        'serial_number': serial,
+        'gen_time': datetime.now(timezone.utc).replace(microsecond=0),
+    })
+
+
+def make_cms(digest, certificate, extra_certificates=(), tst_info=None):
+    """Detached CMS signature over `digest`, or a timestamp token over `tst_info`."""
+    tbs = certificate['tbs_certificate']
+    content_type = 'data'
+    encap_content_info = {'content_type': 'data'}
+    if tst_info is not None:
+        content_type = 'tst_info'
+        encap_content_info = {'content_type': 'tst_info', 'content': tst_info}
+        digest = hashlib.sha256(tst_info.dump()).digest()
+    signed_attrs = cms.CMSAttributes([
+        cms.CMSAttribute({'type': 'content_type', 'values': [content_type]}),
+        cms.CMSAttribute({'type': 'signing_time', 'values': [cms.Time({'utc_time': datetime.now(timezone.utc)})]}),
+        cms.CMSAttribute({'type': 'message_digest', 'values': [digest]}),
+    ])
+    signer_info = cms.SignerInfo({
+        'version': 'v1',
+        'sid': cms.SignerIdentifier({'issuer_and_serial_number': cms.IssuerAndSerialNumber({
+            'issuer': tbs['issuer'],
+            'serial_number': tbs['serial_number'],
+        })}),
+        'digest_algorithm': algos.DigestAlgorithm({'algorithm': 'sha256'}),
+        'signed_attrs': signed_attrs,
+        'signature_algorithm': algos.SignedDigestAlgorithm({'algorithm': 'sha256_rsa'}),
+        'signature': os.urandom(256),
+    })
+    signed_data = cms.SignedData({
+        'version': 'v3' if tst_info is not None else 'v1',
+        'digest_algorithms': [algos.DigestAlgorithm({'algorithm': 'sha256'})],
+        'encap_content_info': encap_content_info,
+        'certificates': [*extra_certificates, certificate],
+        'signer_infos': [signer_info],
+    })
+    return cms.ContentInfo({'content_type': 'signed_data', 'content': signed_data}).dump()
+
+
+class _Writer:
+    def __init__(self):
+        self.data = bytearray()
+        self.offsets = {}
+
+    def obj(self, number, body):
+        self.offsets[number] = len(self.data)
+        self.data += f"{number} 0 obj\n".encode() + body + b"\nendobj\n"
+
+    def xref(self, size, root, prev=None):
+        start = len(self.data)
+        self.data += b"xref\n"
+        numbers = sorted(self.offsets)
+        if prev is None:
+            self.data += f"0 {size}\n0000000000 65535 f \n".encode()
+            for number in range(1, size):
+                self.data += f"{self.offsets[number]:010d} 00000 n \n".encode()
+        else:
+            for number in numbers:
+                self.data += f"{number} 1\n{self.offsets[number]:010d} 00000 n \n".encode()
+        trailer = f"<< /Size {size} /Root {root} 0 R"
+        if prev is not None:
+            trailer += f" /Prev {prev}"
+        self.data += f"trailer\n{trailer} >>\nstartxref\n{start}\n%%EOF\n".encode()
+        self.offsets = {}
+        return start
+
+
+def make_pdf(pages=1, signatures=0, page_text_bytes=2000, timestamp=False, signers=None):
+    """Return PDF bytes with `pages` pages and `signatures` incremental signatures.
+
+    When `timestamp` is true the last signature is a /DocTimeStamp.
+    """
+    writer = _Writer()
+    writer.data += b"%PDF-1.7\n%\xe2\xe3\xcf\xd3\n"
+    page_numbers = [4 + 2 * i for i in range(pages)]
+    kids = " ".join(f"{n} 0 R" for n in page_numbers)
+    writer.obj(1, b"<< /Type /Catalog /Pages 2 0 R >>")
+    writer.obj(2, f"<< /Type /Pages /Kids [{kids}] /Count {pages} >>".encode())
+    writer.obj(3, b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+    filler = ("Lorem ipsum dolor sit amet " * (page_text_bytes // 27 + 1))[:page_text_bytes]
+    for n in page_numbers:
+        stream = f"BT /F1 8 Tf 20 800 Td ({filler}) Tj ET".encode()
+        writer.obj(n, f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+                      f"/Resources << /Font << /F1 3 0 R >> >> /Contents {n + 1} 0 R >>".encode())
+        writer.obj(n + 1, f"<< /Length {len(stream)} >>\nstream\n".encode() + stream + b"\nendstream")
+    size = 4 + 2 * pages
+    prev = writer.xref(size, 1)
+
+    fields = []
+    for index in range(signatures):
+        is_timestamp = timestamp and index == signatures - 1
+        field, value = size, size + 1
+        size += 2
+        fields.append(field)
+        writer.obj(field, f"<< /FT /Sig /T (Signature{index + 1}) /V {value} 0 R /Type /Annot "
+                          f"/Subtype /Widget /Rect [0 0 0 0] /F 132 /P {page_numbers[0]} 0 R >>".encode())
+        sig_type = "/DocTimeStamp" if is_timestamp else "/Sig"
+        sub_filter = "/ETSI.RFC3161" if is_timestamp else "/adbe.pkcs7.detached"
+        head = (f"<< /Type {sig_type} /Filter /Adobe.PPKLite /SubFilter {sub_filter} "
+                f"/Name (Signer {index + 1}) /Location (Hanoi) /ContactInfo (signer{index + 1}@example.com) "
+                f"/M (D:20240102030405+07'00') /ByteRange ").encode()
+        byte_range_placeholder = b"[0 0000000000 0000000000 0000000000]"
+        value_offset = len(writer.data) + len(f"{value} 0 obj\n")
+        writer.obj(value, head + byte_range_placeholder + b" /Contents <" + b"0" * (2 * CONTENTS_SIZE) + b"> >>")
+        all_fields = " ".join(f"{n} 0 R" for n in fields)
+        writer.obj(1, f"<< /Type /Catalog /Pages 2 0 R /AcroForm << /Fields [{all_fields}] /SigFlags 3 >> >>".encode())
+        prev = writer.xref(size, 1, prev)
+
+        contents_start = value_offset + len(head) + len(byte_range_placeholder) + len(b" /Contents ")
+        contents_end = contents_start + 2 * CONTENTS_SIZE + 2
+        byte_range = [0, contents_start, contents_end, len(writer.data) - contents_end]
+        rendered = "[{} {:010d} {:010d} {:010d}]".format(*byte_range).encode()
+        range_offset = value_offset + len(head)
+        writer.data[range_offset:range_offset + len(rendered)] = rendered
+
+        digest = hashlib.sha256(writer.data[:contents_start] + writer.data[contents_end:]).digest()
+        signer = (signers or [f"Signer {index + 1}"])[index % len(signers or [None])]
+        certificate = make_certificate(signer, serial=1000 + index)
+        tst_info = make_tst_info(digest, serial=index + 1) if is_timestamp else None
+        signature = make_cms(digest, certificate, [make_certificate("Benchmark CA", serial=1)],
+                             tst_info=tst_info).hex().encode()
+        if len(signature) > 2 * CONTENTS_SIZE:
+            raise ValueError("CMS package does not fit into /Contents")
+        writer.data[contents_start + 1:contents_start + 1 + len(signature)] = signature
+    return bytes(writer.data)
+
+
+if __name__ == "__main__":
+    import sys
+    pages = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    with open(sys.argv[1], "wb") as f:
+        f.write(make_pdf(pages=pages, signatures=2, timestamp=True))
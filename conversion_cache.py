@@ -0,0 +1,166 @@
+import hashlib
+import json
+import os
+import re
+import threading
+import uuid
+from collections import OrderedDict
+from concurrent.futures import Future
+
+_KEY_PATTERN = re.compile(r'^[0-9a-f]{64}_[0-9a-f]{16}\.pdf$')
+
+
+class ConversionCache:
+    """Content-addressed store of converted PDFs.
+
+    Entries live directly in `folder` as `<sha256>_<options>.pdf`, are evicted
+    least-recently-used first once they take more than `max_bytes`, and
+    concurrent requests for the same key share a single conversion. Entries
+    for which `in_use(path)` is true (leased by the retention index while a
+    request or download still uses them) are never evicted.
+    """
+    def __init__(self, folder, max_bytes=2 * 1024 * 1024 * 1024, in_use=None):
+        self.folder = folder
+        self.max_bytes = max_bytes
+        self.in_use = in_use
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._size = 0
+        self._inflight = {}
+        self._load()
+
+    def _load(self):
+        # Rebuild the index from the files left by a previous run, oldest first.
+        if not os.path.isdir(self.folder):
+            return
+        found = []
+        for name in os.listdir(self.folder):
+            if _KEY_PATTERN.match(name):
+                path = os.path.join(self.folder, name)
+                stat = os.stat(path)
+                found.append((stat.st_mtime, name[:-4], stat.st_size))
+        for _, key, size in sorted(found):
+            self._entries[key] = size
+            self._size += size
+        self._evict()
+
+    @staticmethod
+    def key(digest, file_type, options=None):
+        options = json.dumps({'type': file_type, **(options or {})}, sort_keys=True)
+        return f"{digest}_{hashlib.sha256(options.encode()).hexdigest()[:16]}"
+
+    def path(self, key):
+        return os.path.abspath(os.path.join(self.folder, f"{key}.pdf"))
+
+    def get(self, key):
+        """Return the cached PDF path for `key`, or None."""
+        with self._lock:
+            return self._lookup(key)
+
+    def _lookup(self, key):
+        if key not in self._entries:
+            return None
+        path = self.path(key)
+        if not os.path.exists(path):
+            # Removed behind our back (e.g. by the retention job).
+            self._size -= self._entries.pop(key)
+            return None
+        self._entries.move_to_end(key)
+        return path
+
+    def get_or_create(self, key, produce):
+        """Return `(path, hit)`, calling `produce(output_path)` on a miss.
+
+        Only one caller converts a given key; the others wait for its result.
+        """
+        with self._lock:
+            path = self._lookup(key)
+            if path:
+                self.hits += 1
+                return path, True
+            future = self._inflight.get(key)
+            owner = future is None
+            if owner:
+                self.misses += 1
+                future = self._inflight[key] = Future()
+            else:
+                self.coalesced += 1
+        if not owner:
+            return future.result(), True
+
+        try:
+            path = self._produce(key, produce)
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(path)
+            return path, False
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    def _produce(self, key, produce):
+        path = self.path(key)
+        # Office appends ".pdf" to names without it, so keep the extension.
+        partial = os.path.join(self.folder, f"partial_{uuid.uuid4().hex}_{key}.pdf")
+        try:
+            produce(partial)
+            os.replace(partial, path)
+        finally:
+            if os.path.exists(partial):
+                os.remove(partial)
+        with self._lock:
+            size = os.path.getsize(path)
+            self._size += size - self._entries.get(key, 0)
+            self._entries[key] = size
+            self._entries.move_to_end(key)
+            self._evict(keep=key)
+        return path
+
+    def _evict(self, keep=None):
+        for key in list(self._entries):
+            if self._size <= self.max_bytes:
+                break
+            if key == keep:
+                continue
+            path = self.path(key)
+            if self.in_use and self.in_use(path):
+                continue
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            except OSError:
+                # Still open by a download on Windows; try again next time.
+                continue
+            self._size -= self._entries.pop(key)
+            self.evictions += 1
+
+    def forget(self, path):
+        """Drop the entry of a cached PDF deleted by someone else."""
+        name = os.path.basename(path)
+        if not _KEY_PATTERN.match(name):
+            return
+        with self._lock:
+            size = self._entries.pop(name[:-4], None)
+            if size is not None:
+                self._size -= size
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses + self.coalesced
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'coalesced': self.coalesced,
+                'hit_rate': (self.hits + self.coalesced) / lookups if lookups else 0.0,
+                'evictions': self.evictions,
+                'entries': len(self._entries),
+                'bytes': self._size,
+                'max_bytes': self.max_bytes,
+            }
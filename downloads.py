@@ -0,0 +1,124 @@
+"""File downloads that can be resumed: byte ranges, strong ETags, conditional GET.
+
+Waitress has no sendfile(); the closest it offers is wsgi.file_wrapper,
+which it drains from the file object itself in large blocks instead of
+iterating the application's response. A range is served by seeking the
+file and bounding it to the range, so a resumed download only reads the
+bytes it is missing.
+"""
+import io
+import os
+import unicodedata
+import urllib.parse
+
+from flask import Response
+from werkzeug.wsgi import wrap_file
+
+
+class FileRange(io.RawIOBase):
+    """Read-only window of `length` bytes of `file`, starting at `start`.
+
+    Seeking is relative to the file, but the end of the window acts as the
+    end of the file so servers that size the body with seek(0, 2) see only
+    the range.
+    """
+    def __init__(self, file, start, length):
+        super().__init__()
+        self.file = file
+        self.start = start
+        self.end = start + length
+        file.seek(start)
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def read(self, size=-1):
+        remaining = self.end - self.file.tell()
+        if remaining <= 0:
+            return b''
+        return self.file.read(remaining if size is None or size < 0 else min(size, remaining))
+
+    def readinto(self, buffer):
+        data = self.read(len(buffer))
+        buffer[:len(data)] = data
+        return len(data)
+
+    def tell(self):
+        return self.file.tell()
+
+    def seek(self, offset, whence=os.SEEK_SET):
+        if whence == os.SEEK_END:
+            offset += self.end
+        elif whence == os.SEEK_CUR:
+            offset += self.file.tell()
+        return self.file.seek(min(max(offset, self.start), self.end))
+
+    def close(self):
+        if not self.closed:
+            self.file.close()
+        super().close()
+
+
+def file_etag(stat):
+    # Files are only ever replaced whole (os.replace), which gives them a new
+    # mtime, so size and mtime identify the bytes.
+    return f"{stat.st_size:x}-{stat.st_mtime_ns:x}"
+
+
+def _content_disposition(download_name):
+    try:
+        download_name.encode('ascii')
+        return {'filename': download_name}
+    except UnicodeEncodeError:
+        simple = unicodedata.normalize('NFKD', download_name).encode('ascii', 'ignore').decode('ascii')
+        quoted = urllib.parse.quote(download_name, safe="!#$&+^`|~")
+        return {'filename': simple, 'filename*': f"UTF-8''{quoted}"}
+
+
+class FileResponse(Response):
+    """Response for a file on disk, honouring Range, If-Range and conditional headers.
+
+    Answers 206 with the requested range, 304 when the client's copy is
+    current, 412 when If-Match fails and raises RequestedRangeNotSatisfiable
+    (416) for ranges outside the file. Only GET and HEAD are conditional.
+    """
+    def __init__(self, path, environ, mimetype='application/octet-stream', download_name=None):
+        super().__init__(mimetype=mimetype, direct_passthrough=True)
+        file = open(path, 'rb')
+        try:
+            stat = os.fstat(file.fileno())
+            self._range = (0, stat.st_size)
+            self.content_length = stat.st_size
+            # Also on the answer to a POST /convert, so clients know a broken
+            # download can be resumed from the result URL.
+            self.accept_ranges = 'bytes'
+            self.set_etag(file_etag(stat))
+            self.last_modified = int(stat.st_mtime)
+            # Results are per client; make caches revalidate with the ETag.
+            self.cache_control.private = True
+            self.cache_control.no_cache = True
+            if download_name:
+                self.headers.set('Content-Disposition', 'attachment', **_content_disposition(download_name))
+            self.make_conditional(environ, accept_ranges=True, complete_length=stat.st_size)
+        except BaseException:
+            file.close()
+            raise
+        if self.status_code in (304, 412):
+            file.close()
+            self.direct_passthrough = False
+            self.response = []
+            if self.status_code == 412:
+                self.content_length = 0
+            return
+        start, length = self._range
+        self.content_length = length
+        self.response = wrap_file(environ, FileRange(file, start, length))
+
+    def _wrap_range_response(self, start, length):
+        # Called by make_conditional for a satisfiable Range; the file is
+        # seeked to it instead of being read and skipped up to `start`.
+        if self.status_code == 206:
+            self._range = (start, length)
@@ -0,0 +1,174 @@
+import contextvars
+import itertools
+import json
+import queue
+import threading
+import time
+import urllib.parse
+import urllib.request
+import uuid
+from datetime import datetime
+
+from profiler import follow
+
+PRIORITIES = {'high': 0, 'normal': 1, 'low': 2}
+
+
+def check_webhook(url, allowed_hosts=None):
+    """Raise ValueError unless `url` is an http(s) URL, to one of `allowed_hosts` if given."""
+    parts = urllib.parse.urlsplit(url)
+    if parts.scheme not in ('http', 'https') or not parts.hostname:
+        raise ValueError("webhook must be an http or https URL")
+    if allowed_hosts and parts.hostname.lower() not in allowed_hosts:
+        raise ValueError(f"webhook host {parts.hostname} is not allowed")
+    return url
+
+
+class _NoRedirect(urllib.request.HTTPRedirectHandler):
+    # A redirect could lead the callback past check_webhook.
+    def redirect_request(self, *args):
+        return None
+
+
+_webhook_opener = urllib.request.build_opener(_NoRedirect)
+
+
+class QueueFull(Exception):
+    """Raised when the job queue is at capacity."""
+    def __init__(self, retry_after):
+        super().__init__(f"Job queue is full, retry after {retry_after} seconds")
+        self.retry_after = retry_after
+
+
+class Job:
+    def __init__(self, fn, priority='normal', webhook=None, **info):
+        if priority not in PRIORITIES:
+            raise ValueError(f"Unknown priority: {priority}")
+        self.id = uuid.uuid4().hex
+        # Profiled with the submitting request when it is being profiled.
+        self.fn = follow(fn)
+        self.priority = priority
+        self.webhook = webhook
+        self.info = info
+        self.status = 'queued'
+        self.result = None
+        self.error = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.done = threading.Event()
+        self.context = contextvars.copy_context()
+
+    def wait(self, timeout=None):
+        return self.done.wait(timeout)
+
+    def to_dict(self):
+        def iso(ts):
+            return datetime.fromtimestamp(ts).isoformat() if ts else None
+        return {
+            "id": self.id,
+            "status": self.status,
+            "priority": self.priority,
+            "error": str(self.error) if self.error else None,
+            "created_at": iso(self.created_at),
+            "started_at": iso(self.started_at),
+            "finished_at": iso(self.finished_at),
+            **self.info,
+        }
+
+
+class JobQueue:
+    """Bounded priority queue of jobs run by a fixed set of worker threads.
+
+    `submit` raises QueueFull once `max_size` jobs are waiting, with a
+    Retry-After estimate based on the recent job duration.
+    """
+    def __init__(self, workers=4, max_size=100, log=print):
+        self.workers = workers
+        self.max_size = max_size
+        self.log = log
+        self.jobs = {}
+        self._queue = queue.PriorityQueue()
+        self._counter = itertools.count()
+        self._lock = threading.Lock()
+        self._queued = 0
+        self._running = 0
+        self._avg_duration = 5.0
+        self._threads = []
+
+    def start(self):
+        while len(self._threads) < self.workers:
+            thread = threading.Thread(target=self._work, name=f"job-worker-{len(self._threads)}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def submit(self, job):
+        return self.submit_many([job])[0]
+
+    def submit_many(self, jobs):
+        """Queue all jobs or none of them."""
+        self.start()
+        with self._lock:
+            if self._queued + len(jobs) > self.max_size:
+                raise QueueFull(self.retry_after())
+            self._queued += len(jobs)
+            for job in jobs:
+                self.jobs[job.id] = job
+        for job in jobs:
+            self._queue.put((PRIORITIES[job.priority], next(self._counter), job))
+        return jobs
+
+    def get(self, job_id):
+        return self.jobs.get(job_id)
+
+    def retry_after(self):
+        waves = (self._queued + self._running) / max(self.workers, 1)
+        return max(1, int(waves * self._avg_duration))
+
+    def depth(self):
+        return self._queued
+
+    def running(self):
+        return self._running
+
+    def _work(self):
+        while True:
+            _, _, job = self._queue.get()
+            with self._lock:
+                self._queued -= 1
+                self._running += 1
+            job.status = 'running'
+            job.started_at = time.time()
+            try:
+                job.result = job.context.run(job.fn)
+                job.status = 'done'
+            except Exception as e:
+                job.error = e
+                job.status = 'failed'
+            job.finished_at = time.time()
+            with self._lock:
+                self._running -= 1
+                duration = job.finished_at - job.started_at
+                self._avg_duration = 0.8 * self._avg_duration + 0.2 * duration
+            job.done.set()
+            if job.webhook:
+                threading.Thread(target=self._notify, args=(job,), daemon=True).start()
+
+    def _notify(self, job):
+        try:
+            request = urllib.request.Request(
+                job.webhook,
+                data=json.dumps(job.to_dict()).encode(),
+                headers={'Content-Type': 'application/json'},
+                method='POST',
+            )
+            _webhook_opener.open(request, timeout=10).close()
+        except Exception as e:
+            self.log(f"Webhook {job.webhook} for job {job.id} failed: {e}")
+
+    def prune(self, max_age):
+        """Forget finished jobs older than `max_age` seconds."""
+        cutoff = time.time() - max_age
+        with self._lock:
+            for job_id in [j.id for j in self.jobs.values() if j.finished_at and j.finished_at < cutoff]:
+                del self.jobs[job_id]
@@ -0,0 +1,143 @@
+import atexit
+import contextvars
+import json
+import os
+import queue
+import random
+import sys
+import threading
+import time
+from datetime import datetime
+
+request_id = contextvars.ContextVar('request_id', default=None)
+
+
+class LogPipeline:
+    """Non-blocking JSON-lines logger.
+
+    `emit` only enqueues the record (dropping it when the queue is full);
+    a single writer thread drains the queue in batches, keeps the file open,
+    echoes to stdout and rotates the file by size and by age.
+    """
+    def __init__(self, folder='log', filename='log.jsonl', max_bytes=50 * 1024 * 1024,
+                 rotate_seconds=24 * 3600, backup_count=14, queue_size=10000, batch_size=500, echo=True):
+        self.folder = folder
+        self.filename = filename
+        self.max_bytes = max_bytes
+        self.rotate_seconds = rotate_seconds
+        self.backup_count = backup_count
+        self.batch_size = batch_size
+        self.echo = echo
+        self.dropped = 0
+        self.sampled_out = 0
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._lock = threading.Lock()
+        self._thread = None
+        self._file = None
+        self._opened_at = 0
+
+    @property
+    def path(self):
+        return os.path.join(self.folder, self.filename)
+
+    def start(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='log-writer', daemon=True)
+                self._thread.start()
+                atexit.register(self.close)
+
+    def emit(self, message, level='info', sample=None, **fields):
+        """Queue a record; `sample` (0..1) keeps only that share of calls."""
+        if sample is not None and random.random() >= sample:
+            self.sampled_out += 1
+            return
+        record = {
+            'ts': datetime.now().isoformat(timespec='milliseconds'),
+            'level': level,
+            'request_id': request_id.get(),
+            'thread': threading.current_thread().name,
+            'message': message,
+            **fields,
+        }
+        if self._thread is None:
+            self.start()
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def close(self, timeout=5):
+        if self._thread is None or not self._thread.is_alive():
+            return
+        try:
+            self._queue.put(None, timeout=timeout)
+        except queue.Full:
+            return
+        self._thread.join(timeout)
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            stop = None in batch
+            records = [record for record in batch if record is not None]
+            if records:
+                try:
+                    self._write(records)
+                except Exception as e:
+                    print(f"Log writer failed: {e.__class__.__name__}: {e}", file=sys.stderr)
+            if stop:
+                if self._file:
+                    self._file.close()
+                    self._file = None
+                return
+
+    def _write(self, records):
+        lines = ''.join(json.dumps(record, default=str, ensure_ascii=False) + '\n' for record in records)
+        if self.echo:
+            for record in records:
+                print(f"{record['ts']} - {record['message']}", file=sys.stdout)
+        self._rotate_if_needed(len(lines))
+        self._file.write(lines)
+        self._file.flush()
+
+    def _rotate_if_needed(self, incoming):
+        if self._file is None:
+            os.makedirs(self.folder, exist_ok=True)
+            self._open()
+        expired = time.time() - self._opened_at >= self.rotate_seconds
+        full = self._file.tell() > 0 and self._file.tell() + incoming > self.max_bytes
+        if not (expired or full):
+            return
+        self._file.close()
+        if os.path.getsize(self.path):
+            os.replace(self.path, f"{self.path}.{datetime.now().strftime('%Y%m%d%H%M%S%f')}")
+        backups = sorted(name for name in os.listdir(self.folder) if name.startswith(self.filename + '.'))
+        for name in backups[:max(0, len(backups) - self.backup_count)]:
+            os.remove(os.path.join(self.folder, name))
+        self._open()
+
+    def _open(self):
+        self._file = open(self.path, 'a', encoding='utf-8')
+        # Age of an existing file counts from its first record, not our
+        # start (getctime is the inode change time on Linux).
+        self._opened_at = (self._first_record_time() if self._file.tell() else None) or time.time()
+
+    def _first_record_time(self):
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                return datetime.fromisoformat(json.loads(f.readline())['ts']).timestamp()
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+
+
+pipeline = LogPipeline()
+
+
+def log(message, level='info', sample=None, **fields):
+    pipeline.emit(message, level=level, sample=sample, **fields)
@@ -1,265 +1,1003 @@
-import os, sys, argparse
-from flask import Flask, request, jsonify, send_file
-import fitz
-# import win32com.client as win32
-# import xlwings as excelConvert
-from waitress import serve
-from apscheduler.schedulers.background import BackgroundScheduler
-from datetime import datetime, timedelta
-from office_converter import WordConverter, ExcelConverter
-from pdf_signature_extract import SignatureExtract, SignatureDetails
-import os
-import time
-
-# import tempfile
-
-
-app = Flask(__name__)
-app.config['UPLOAD_FOLDER'] = 'uploads'
-app.config['OUTPUT_FOLDER'] = 'output'
-app.config['LOGS_FOLDER'] = 'log'
-app.config['FILE_RETENTION_DAYS'] = 1
-
-os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
-os.makedirs(app.config['OUTPUT_FOLDER'], exist_ok=True)
-os.makedirs(app.config['LOGS_FOLDER'], exist_ok=True)
-
-def cout(message: str):
-    timestamp = datetime.now().strftime("%d/%m/%Y %H:%M:%S")
-    port = app.config.get('PORT', '')
-    log_message = f"{timestamp}::{port} - {message}"
-    
-    print(log_message, file=sys.stdout)
-    
-    with open(os.path.join(app.config['LOGS_FOLDER'], "log.txt"), "a") as f:
-        f.write(f"{log_message}\n")
-
-
-def convert_to_pdf(file_path, output_path):
-    cout(f'Convert {file_path} to {output_path}')
-    ext = file_path.split('.')[-1].lower()
-    if ext == 'pdf':
-        # If the file is already a PDF, we just copy it to the output path
-        os.copy(file_path, output_path)
-    elif ext in ['doc', 'docx']:
-        word = WordConverter()
-        try:
-            start_time = time.time()
-            word.convert(file_path, output_path)
-            end_time = time.time()
-            cout(f"Conversion completed in {end_time - start_time:.2f} seconds.")
-            return output_path
-        finally:
-            word.close()
-    elif ext in ['xls', 'xlsx']:
-        start_time = time.time()
-        excel = ExcelConverter()
-        try:
-            excel.convert(file_path, output_path)
-            excel.close()
-            end_time = time.time()
-            print(f"Conversion completed in {end_time - start_time:.2f} seconds.")
-            return output_path
-        finally:
-            excel.close()
-    else:
-        raise ValueError('Unsupported file type')
-    
-# @app.route('/convert2', methods=['POST'])
-# def convert_file2():
-#     if 'file' not in request.files:
-#         return "No file part", 400
-
-#     file = request.files['file']
-#     if file.filename == '':
-#         return "No selected file", 400
-
-#     if file and file.filename.endswith('.docx'):
-#         with tempfile.TemporaryDirectory() as tempdir:
-#             from docx2pdf import convert
-#             input_path = os.path.join(tempdir, file.filename)
-#             file.save(input_path)
-            
-#             output_path = os.path.splitext(input_path)[0] + ".pdf"
-
-#             # Đo thời gian bắt đầu chuyển đổi
-#             start_time = time.time()
-            
-#             convert(input_path, output_path)
-
-#             # Đo thời gian kết thúc chuyển đổi
-#             end_time = time.time()
-#             processing_time = end_time - start_time
-            
-#             return send_file(output_path, as_attachment=True)
-
-#     return "Invalid file format", 400
-
-@app.route('/ping', methods=['GET', 'POST'])
-def health_check():
-    return jsonify({'message': 'Hi, I am fine'}), 200
-
-@app.route('/convert', methods=['POST'])
-def convert_file():
-    if 'file' not in request.files:
-        return jsonify({'error': 'No file part'}), 400
-    
-    file = request.files['file']
-    if file.filename == '':
-        return jsonify({'error': 'No selected file'}), 400
-    from werkzeug.utils import secure_filename
-    filename = secure_filename(file.filename)
-    
-        # Add a timestamp to the filename to make it unique
-    timestamp = datetime.now().strftime('%Y%m%d%H%M%S')
-    filename_with_timestamp = f"{timestamp}_{filename}"
-    
-    print(f'Convert file {filename_with_timestamp}')
-    file_path = os.path.abspath(os.path.join(app.config['UPLOAD_FOLDER'], filename_with_timestamp))
-    file.save(file_path)
-
-
-    output_filename = f'converted_{timestamp}_{filename.rsplit(".", 1)[0]}.pdf'
-    output_path = os.path.abspath(os.path.join(app.config['OUTPUT_FOLDER'], output_filename))
-
-    try:
-        convert_to_pdf(file_path, output_path)
-    except ValueError as e:
-        return jsonify({'error': str(e)}), 400
-    except Exception as e:
-        cout(f"Error processing file {file_path}: {e}")
-        return jsonify({'error': 'File conversion failed'}), 500
-
-    return send_file(output_path, as_attachment=True, mimetype='application/pdf')
-
-@app.route('/extract-signature', methods=['POST'])
-def extract_signature():
-    if 'file' not in request.files:
-        return jsonify({"message": "No file part", "filename": "", "signatures": []}), 400
-
-    file = request.files['file']
-    filename = file.filename
-
-    if filename == '':
-        return jsonify({"message": "No selected file", "filename": "", "signatures": []}), 400
-
-    try:
-        # Save the uploaded file temporarily
-        from werkzeug.utils import secure_filename
-        filename = secure_filename(file.filename)
-        
-            # Add a timestamp to the filename to make it unique
-        timestamp = datetime.now().strftime('%Y%m%d%H%M%S')
-        filename_with_timestamp = f"{timestamp}_{filename}"
-        
-        print(f'Extract signature from file {filename_with_timestamp}')
-        file_path = os.path.abspath(os.path.join(app.config['UPLOAD_FOLDER'], filename_with_timestamp))
-        file.save(file_path)
-        
-        # Open the PDF file
-        signatures_raw = SignatureExtract().get_pdf_signatures(filename = file_path);
-        signatures = []
-        for signature in signatures_raw:
-            sig = SignatureDetails()
-            sig.digest_algorithm = signature.digest_algorithm
-            sig.signature_algorithm = signature.signature_algorithm
-            sig.content_type = signature.content_type
-            sig.type=signature.type
-            sig.signer_contact_info=signature.signer_contact_info
-            sig.signer_location=signature.signer_location
-            sig.signing_time=signature.signing_time
-            sig.signature_type=signature.signature_type
-            sig.signature_handler=signature.signature_handler
-            
-            certificate = signature.certificate
-            sig.valid_from=certificate.validity.not_before
-            sig.valid_to=certificate.validity.not_after
-            issuer = certificate.issuer
-            
-            sig.issuer_country_name=issuer.country_name
-            sig.issuer_organization_name=issuer.organization_name
-            sig.issuer_common_name=issuer.common_name
-            
-            subject = signature.certificate.subject
-            sig.subject_country_name=subject.country_name
-            sig.subject_organization_name=subject.organization_name
-            sig.subject_organizational_unit_name="subject.organizational_unit_name"
-            sig.subject_common_name=subject.common_name
-            sig.subject_locality_name=signature.locality_name
-
-            signatures.append(sig)
-        os.remove(file_path)
-
-        if not signatures:
-            return jsonify({"message": "No signatures found", "filename": filename, "signatures": []}), 400
-
-        signature_details_dict = [sd.to_dict() for sd in signatures]    
-        return jsonify({"message": "Signatures extracted", "filename": filename, "signatures": signature_details_dict})
-
-    except Exception as e:
-        return jsonify({"message": str(e), "filename": filename, "signatures": []}), 500
-
-# @app.route('/convert', methods=['POST'])
-# def convert_file():
-#     if 'source' not in request.form or 'destination' not in request.form:
-#         return jsonify({'error': 'Missing form-data fields'}), 400
-    
-#     # Retrieve form-data fields
-#     source = request.form['source']
-#     destination = request.form['destination']
-#     try:
-#         convert_to_pdf(source, destination)
-#     except ValueError as e:
-#         return jsonify({'error': str(e)}), 400
-#     except Exception as e:
-#         cout(f"Error processing file {source}: {e}")
-#         return jsonify({'error': 'File conversion failed'}), 500
-
-#     return destination, 200
-
-def delete_old_files():
-    cout('Cron:: Remove old file scanning')
-    now = datetime.now()
-    retention_period = timedelta(days=app.config['FILE_RETENTION_DAYS'])
-
-    for folder in [app.config['UPLOAD_FOLDER'], app.config['OUTPUT_FOLDER']]:
-        for filename in os.listdir(folder):
-            file_path = os.path.join(folder, filename)
-            if os.path.isfile(file_path):
-                file_modified_time = datetime.fromtimestamp(os.path.getmtime(file_path))
-                if now - file_modified_time > retention_period:
-                    try:
-                        os.remove(file_path)
-                        cout(f"Deleted old file: {file_path}")
-                    except Exception as e:
-                        cout(f"Error deleting file {file_path}: {e}")
-
-                        
-if __name__ == '__main__':
-    parser = argparse.ArgumentParser(description="Run Flask app with specified port and debug mode")
-    
-    parser.add_argument('--keep_old_file', type=lambda x: (str(x).lower() == 'true'), default=True, help='Scan and remove old file after 1 day')
-    parser.add_argument('--port', type=int, default=5000, help='Port to run the app on. Default 5000')
-    parser.add_argument('--threads', type=int, default=4, help='Maximum threads being create. Default 4')
-    parser.add_argument('--connection_limit', type=int, default=200, help='Maxium connection being serve. Default 200')
-    parser.add_argument('--debug', type=lambda x: (str(x).lower() == 'true'), default=False, help='Run app in debug mode. Note that it will using Flask as backend. Some features might not available. Not recommend for running as product.')
-    
-    args = parser.parse_args()
-    app.config['PORT'] = args.port
-    
-    cout(f'Start application with port {args.port}. Debug mode set to {args.debug}')
-    if args.keep_old_file == True:
-        cout('Remove old file is enable')
-        scheduler = BackgroundScheduler()
-        scheduler.add_job(delete_old_files, 'interval', days=1)
-        scheduler.start()
-        
-    if args.debug:
-        # Debug mode (not recommended for production)
-        app.run(port=args.port, debug=args.debug, host='0.0.0.0', threaded=True)
-    else:
-        cout(f'Connection limit: {args.connection_limit}')
-        cout(f'Threads limit: {args.threads}')
-        cout(f'File uploaded being auto-remove after 1 days: {args.keep_old_file}')
-        # Production mode with Waitress
-        serve(app, host='0.0.0.0', port=args.port, connection_limit=args.connection_limit)
+import os, sys, argparse
+from flask import Flask, Response, g, request, jsonify
+import fitz
+# import win32com.client as win32
+# import xlwings as excelConvert
+from waitress import serve
+from apscheduler.schedulers.background import BackgroundScheduler
+from datetime import datetime, timedelta
+from office_converter import BACKEND_ENV, ConversionTimeout, ConverterPool, default_factories, office_available
+from pdf_signature_extract import SignatureExtract, dumps_signatures, extract_signatures_json, signature_cache
+from signature_index import SignatureIndex
+from conversion_cache import ConversionCache
+from upload_stream import StreamingRequest
+from batch_convert import BatchError, extract_zip, merge_pdfs, stream_zip
+from job_queue import Job, JobQueue, QueueFull, PRIORITIES, check_webhook
+from retention import RetentionIndex
+from pdf_optimizer import OptimizeOptions, optimize_pdf
+from sheet_export import SheetExportError, SheetOptions, export_workbook
+from preflight import classify
+from page_preview import FORMATS, PageRenderer, PreviewCache, to_json as preview_json
+from admission import Admission, AdmissionRejected, Lane
+from log_pipeline import log, pipeline as log_pipeline, request_id
+from profiler import profiler
+from metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, registry
+from downloads import FileResponse
+import os
+import io
+import json
+import math
+import re
+import shutil
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from functools import partial, wraps
+from multiprocessing import freeze_support
+
+# import tempfile
+
+
+app = Flask(__name__)
+app.request_class = StreamingRequest
+app.config['UPLOAD_FOLDER'] = 'uploads'
+app.config['OUTPUT_FOLDER'] = 'output'
+app.config['LOGS_FOLDER'] = 'log'
+app.config['FILE_RETENTION_DAYS'] = 1
+app.config['RETENTION_DB'] = 'retention.sqlite3'
+app.config['SIGNATURE_INDEX_DB'] = 'signatures.sqlite3'
+app.config['CACHE_MAX_BYTES'] = 2 * 1024 * 1024 * 1024
+app.config['MAX_UPLOAD_BYTES'] = 512 * 1024 * 1024
+app.config['MAX_CONTENT_LENGTH'] = app.config['MAX_UPLOAD_BYTES'] + 1024 * 1024
+app.config['UPLOAD_MEMORY_ROUTES'] = {'/extract-signature'}
+app.config['UPLOAD_MEMORY_MAX'] = 10 * 1024 * 1024
+app.config['CPU_WORKERS'] = os.cpu_count() or 1
+app.config['PREVIEW_CACHE_BYTES'] = 256 * 1024 * 1024
+app.config['QUEUE_TIMEOUT'] = 30
+app.config['CONVERT_TIMEOUT'] = 120
+app.config['WEBHOOK_HOSTS'] = None
+
+os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
+os.makedirs(app.config['OUTPUT_FOLDER'], exist_ok=True)
+os.makedirs(app.config['LOGS_FOLDER'], exist_ok=True)
+log_pipeline.folder = app.config['LOGS_FOLDER']
+
+def cout(message: str, level='info', sample=None):
+    log(message, level=level, sample=sample, port=app.config.get('PORT', ''))
+
+@app.before_request
+def assign_request_id():
+    request_id.set(request.headers.get('X-Request-ID') or uuid.uuid4().hex[:16])
+
+@app.after_request
+def return_request_id(response):
+    response.headers['X-Request-ID'] = request_id.get()
+    return response
+
+def client_id():
+    return request.headers.get('X-Client-ID') or request.remote_addr or 'unknown'
+
+@app.before_request
+def admit_request():
+    # Conversions and signature extraction each run in their own lane so a
+    # burst of one cannot take every server thread from the other or from
+    # cheap calls like /ping and job status.
+    lane = admission.lane_for(request.path)
+    if lane is None:
+        return None
+    client = client_id()
+    try:
+        started = lane.acquire(client)
+    except AdmissionRejected as e:
+        response = jsonify({'error': str(e)})
+        response.headers['Retry-After'] = str(e.retry_after)
+        return response, e.status
+    g.admission = (lane, client, started)
+    return None
+
+def release_admitted(admitted):
+    lane, client, started = admitted
+    lane.release(client, started)
+
+@app.after_request
+def release_admission_on_close(response):
+    # Generated bodies (bulk signatures, batch zips) are produced after the
+    # view returns; keep the lane slot until the server closes the body.
+    # Files are only sent, so they give the slot back at teardown.
+    if response.is_streamed and not response.direct_passthrough:
+        admitted = g.pop('admission', None)
+        if admitted:
+            response.call_on_close(partial(release_admitted, admitted))
+    return response
+
+@app.teardown_request
+def release_admission(exc):
+    admitted = g.pop('admission', None)
+    if admitted:
+        release_admitted(admitted)
+
+@app.teardown_request
+def discard_uploads(exc):
+    # Uploads are on disk before the view runs; remove the ones it did not
+    # keep, such as those of rejected requests or routes that take no file.
+    request.discard_unclaimed()
+
+def profile_token():
+    return request.headers.get('X-Profile') or request.args.get('profile')
+
+@app.before_request
+def start_profile():
+    # Started after admission so time spent waiting for a lane is not profiled.
+    if not profiler.enabled or request.path.startswith('/profiles'):
+        return None
+    # Without a configured token (sampling only) the header means nothing.
+    token = profile_token() if profiler.token else None
+    if token and not profiler.authorized(token):
+        return jsonify({'error': 'Invalid profile token'}), 403
+    rule = request.url_rule.rule if request.url_rule else request.path
+    g.profile = profiler.start(rule, request.method, request.path, requested=bool(token))
+    return None
+
+@app.after_request
+def return_profile_id(response):
+    session = g.get('profile')
+    if session:
+        session.record.status = response.status_code
+        response.headers['X-Profile-ID'] = session.record.id
+    return response
+
+@app.teardown_request
+def stop_profile(exc):
+    session = g.pop('profile', None)
+    if session:
+        profiler.stop(session, 500 if exc else None)
+
+def require_profile_token(view):
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if not profiler.authorized(profile_token()):
+            return jsonify({'error': 'A valid X-Profile token is required'}), 403
+        return view(*args, **kwargs)
+    return wrapper
+
+
+converter_pool = ConverterPool(convert_timeout=app.config['CONVERT_TIMEOUT'])
+_process_pool = None
+conversion_cache = ConversionCache(app.config['OUTPUT_FOLDER'], app.config['CACHE_MAX_BYTES'])
+job_queue = JobQueue(log=cout)
+admission = Admission()
+admission.add_lane(Lane('convert', limit=4, max_waiting=4, queue_timeout=app.config['QUEUE_TIMEOUT']),
+                   ['/convert', '/convert-batch', '/jobs'])
+# Previews render in the same process pool as signature extraction.
+admission.add_lane(Lane('signature', limit=app.config['CPU_WORKERS'], max_waiting=app.config['CPU_WORKERS'],
+                        queue_timeout=app.config['QUEUE_TIMEOUT']),
+                   ['/extract-signature', '/extract-signature-bulk', '/preview'])
+
+
+def size_lanes(threads, convert_limit, convert_queue, signature_limit, signature_queue=None):
+    """Size the admission lanes for a server with `threads` threads.
+
+    Waiting requests hold a server thread too, so a quarter of the threads
+    is kept for /ping, job status and result downloads. Returns False when
+    the lanes could not be shrunk that far.
+    """
+    convert_lane, signature_lane = admission.lanes['convert'], admission.lanes['signature']
+    convert_lane.limit = convert_limit
+    convert_lane.max_waiting = convert_queue
+    signature_lane.limit = signature_limit
+    signature_lane.max_waiting = signature_queue if signature_queue is not None else signature_limit
+    return admission.fit(threads, reserve=max(1, threads // 4))
+
+
+signature_index = SignatureIndex(app.config['SIGNATURE_INDEX_DB'])
+retention = RetentionIndex(
+    app.config['RETENTION_DB'],
+    [app.config['UPLOAD_FOLDER'], app.config['OUTPUT_FOLDER']],
+    ttl=app.config['FILE_RETENTION_DAYS'] * 86400,
+    on_delete=conversion_cache.forget,
+    log=cout,
+)
+conversion_cache.in_use = retention.leased
+
+
+def process_pool():
+    # Signature parsing and page rendering are CPU bound; worker processes
+    # sidestep the GIL that serializes them under waitress threads.
+    global _process_pool
+    if _process_pool is None:
+        _process_pool = ProcessPoolExecutor(max_workers=app.config['CPU_WORKERS'])
+    return _process_pool
+
+
+page_renderer = PageRenderer(process_pool, PreviewCache(app.config['PREVIEW_CACHE_BYTES']))
+
+stage_seconds = registry.histogram(
+    'stage_seconds', 'Time spent in each stage: upload_save, preflight, conversion, signature_parse, response_send',
+    ['stage'])
+conversions = registry.counter(
+    'conversions_total', 'Conversions by document format and outcome (converted, cache_hit, rejected, timeout, error)',
+    ['format', 'outcome'])
+signature_extractions = registry.counter(
+    'signature_extractions_total', 'Files read for signatures by outcome (signed, unsigned, error)', ['outcome'])
+registry.gauge('jobs_in_flight', 'Conversion jobs running', collect=lambda: job_queue.running())
+registry.gauge('job_queue_depth', 'Conversion jobs waiting for a worker', collect=lambda: job_queue.depth())
+registry.gauge('admission_requests', 'Requests held by each admission lane', ['lane', 'state'], collect=lambda: {
+    (name, state): lane[state] for name, lane in admission.stats().items() for state in ('running', 'waiting')})
+registry.gauge('disk_usage_bytes', 'Size of the tracked files per folder', ['folder'], collect=lambda: {
+    (os.path.basename(folder),): size for folder, (_, size) in retention.usage().items()})
+registry.gauge('disk_files', 'Number of tracked files per folder', ['folder'], collect=lambda: {
+    (os.path.basename(folder),): count for folder, (count, _) in retention.usage().items()})
+registry.gauge('converter_instances', 'Office instances by document type and state (idle, busy, launching)',
+               ['kind', 'state'], collect=lambda: {
+    (kind, state): count for kind, states in converter_pool.stats()['instances'].items()
+    for state, count in states.items()})
+registry.counter('converter_timeouts_total', 'Conversions killed for overrunning their deadline',
+                 collect=lambda: converter_pool.stats()['timeouts'])
+registry.counter('converter_recycled_total', 'Office instances restarted after too many jobs or too much memory',
+                 collect=lambda: converter_pool.stats()['recycled'])
+
+@app.after_request
+def observe_response(response):
+    if request.upload_seconds is not None:
+        stage_seconds.observe(request.upload_seconds, stage='upload_save')
+    if response.direct_passthrough or response.is_streamed:
+        # Files and streams are written after the view returns; time them
+        # until waitress closes the body.
+        started = time.perf_counter()
+        response.call_on_close(lambda: stage_seconds.observe(time.perf_counter() - started, stage='response_send'))
+    return response
+
+class ClosingFile:
+    """File proxy that runs `on_close` once the file is closed."""
+    def __init__(self, file, on_close):
+        self._file = file
+        self._on_close = on_close
+
+    def __getattr__(self, name):
+        return getattr(self._file, name)
+
+    def close(self):
+        try:
+            self._file.close()
+        finally:
+            on_close, self._on_close = self._on_close, None
+            if on_close:
+                on_close()
+
+@app.after_request
+def close_file_responses(response):
+    # File responses hand the server a wsgi.file_wrapper that it closes itself,
+    # so Response.close and the call_on_close callbacks (lease release,
+    # response_send timing) would never run. Hook the wrapped file instead
+    # of giving up the file wrapper.
+    body = response.response
+    if response.direct_passthrough and isinstance(getattr(body, 'file', None), io.IOBase):
+        body.file = ClosingFile(body.file, response.close)
+    return response
+
+def preflight_file(file_path):
+    with stage_seconds.time(stage='preflight'):
+        return classify(file_path)
+
+def conversion_outcome(error):
+    if isinstance(error, ConversionTimeout):
+        return 'timeout'
+    if isinstance(error, ValueError):
+        return 'rejected'
+    return 'error'
+
+
+def convert_to_pdf(file_path, output_path, timeout=None, sheets=None, sheet_report=None, preflight=None):
+    cout(f'Convert {file_path} to {output_path}')
+    # Go by the bytes rather than the extension, and turn encrypted or
+    # broken files away before an Office instance is borrowed.
+    preflight = (preflight or preflight_file(file_path)).check()
+    if preflight.format == 'pdf':
+        # If the file is already a PDF, we just copy it to the output path
+        shutil.copyfile(file_path, output_path)
+        return output_path
+
+    source = file_path
+    if not file_path.lower().endswith('.' + preflight.format):
+        # Office picks its parser from the extension.
+        source = f'{file_path}.{preflight.format}'
+        cout(f'{file_path} is really {preflight.format}, converting it as {source}')
+        try:
+            os.link(file_path, source)
+        except OSError:
+            shutil.copyfile(file_path, source)
+    try:
+        if sheets and preflight.kind == 'excel':
+            try:
+                with stage_seconds.time(stage='conversion'):
+                    report = export_workbook(converter_pool, os.path.abspath(source), os.path.abspath(output_path), sheets, timeout)
+            except SheetExportError as e:
+                if sheet_report is not None:
+                    sheet_report.update(e.report)
+                raise
+            cout(f"Exported {len(report['sheets'])} sheets on {report['parallel']} instances in {report['duration_ms']} ms")
+            if sheet_report is not None:
+                sheet_report.update(report)
+            return output_path
+        start_time = time.time()
+        with stage_seconds.time(stage='conversion'):
+            converter_pool.convert(preflight.kind, source, output_path, timeout)
+        end_time = time.time()
+        cout(f"Conversion completed in {end_time - start_time:.2f} seconds.")
+        return output_path
+    finally:
+        if source != file_path and os.path.exists(source):
+            os.remove(source)
+    
+# @app.route('/convert2', methods=['POST'])
+# def convert_file2():
+#     if 'file' not in request.files:
+#         return "No file part", 400
+
+#     file = request.files['file']
+#     if file.filename == '':
+#         return "No selected file", 400
+
+#     if file and file.filename.endswith('.docx'):
+#         with tempfile.TemporaryDirectory() as tempdir:
+#             from docx2pdf import convert
+#             input_path = os.path.join(tempdir, file.filename)
+#             file.save(input_path)
+            
+#             output_path = os.path.splitext(input_path)[0] + ".pdf"
+
+#             # Đo thời gian bắt đầu chuyển đổi
+#             start_time = time.time()
+            
+#             convert(input_path, output_path)
+
+#             # Đo thời gian kết thúc chuyển đổi
+#             end_time = time.time()
+#             processing_time = end_time - start_time
+            
+#             return send_file(output_path, as_attachment=True)
+
+#     return "Invalid file format", 400
+
+@app.route('/ping', methods=['GET', 'POST'])
+def health_check():
+    return jsonify({'message': 'Hi, I am fine'}), 200
+
+@app.route('/ready', methods=['GET'])
+def readiness_check():
+    # /ping only says the process answers; this says whether a conversion
+    # sent now has a converter to run on.
+    reasons = []
+    for kind, states in converter_pool.stats()['instances'].items():
+        if states['idle'] + states['busy'] == 0:
+            reasons.append(f'No {kind} converter is running' + (' yet' if states['launching'] else ''))
+    if job_queue.depth() >= job_queue.max_size:
+        reasons.append('Job queue is full')
+    lane = admission.lanes['convert'].stats()
+    if lane['running'] >= lane['limit'] and lane['waiting'] >= lane['max_waiting']:
+        reasons.append('Convert lane is full')
+    return jsonify({'ready': not reasons, 'reasons': reasons}), 503 if reasons else 200
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    return Response(registry.render(), mimetype=None, content_type=METRICS_CONTENT_TYPE)
+
+def convert_upload(file_path, file_type, digest, options=None, report=None, timeout=None,
+                   sheets=None, sheet_report=None, preflight=None):
+    """Convert a saved upload through the cache; returns (output_path, hit).
+
+    The caller leases `file_path`; the lease is released here. With
+    `options` (OptimizeOptions) the PDF is optimized before it is cached and
+    the optimization report is written into `report`. `timeout` is the
+    conversion deadline in seconds (default CONVERT_TIMEOUT). With `sheets`
+    (SheetOptions) a workbook is exported sheet by sheet in parallel and
+    the per-sheet report is written into `sheet_report`. `preflight` is the
+    upload's classification when the caller already has it.
+    """
+    def produce(path):
+        convert_to_pdf(file_path, path, timeout, sheets, sheet_report, preflight)
+        if options:
+            result = optimize_pdf(path, options)
+            cout(f"Optimized {file_path}: {result['size_before']} -> {result['size_after']} bytes "
+                 f"in {result['duration_ms']} ms")
+            if report is not None:
+                report.update(result)
+
+    try:
+        key_options = {**(options.to_dict() if options else {}), **(sheets.to_dict() if sheets else {})}
+        cache_key = conversion_cache.key(digest, file_type, key_options or None)
+        output_path, hit = conversion_cache.get_or_create(cache_key, produce)
+        retention.track(output_path)
+        if hit:
+            cout(f'Serve {file_path} from cache {cache_key}')
+            os.remove(file_path)
+        conversions.inc(format=file_type, outcome='cache_hit' if hit else 'converted')
+        return output_path, hit
+    except Exception as e:
+        conversions.inc(format=file_type, outcome=conversion_outcome(e))
+        raise
+    finally:
+        retention.release(file_path)
+
+def conversion_timeout(values):
+    """Deadline from the `timeout` form field; it can only be shortened."""
+    limit = app.config['CONVERT_TIMEOUT']
+    if not values.get('timeout'):
+        return limit
+    try:
+        timeout = float(values['timeout'])
+    except ValueError:
+        raise ValueError('timeout must be a number of seconds') from None
+    if not math.isfinite(timeout) or timeout <= 0:
+        raise ValueError('timeout must be a positive number of seconds')
+    return min(timeout, limit) if limit else timeout
+
+def track_upload(file_path):
+    retention.track(file_path)
+    retention.lease(file_path)
+
+def send_tracked_file(path, mimetype='application/pdf', download_name=None):
+    """Send `path` with Range/ETag support, keeping it from being swept until the response closes."""
+    retention.lease(path)
+    try:
+        response = FileResponse(path, request.environ, mimetype=mimetype, download_name=download_name)
+    except Exception:
+        retention.release(path)
+        raise
+    response.call_on_close(partial(retention.release, path))
+    return response
+
+RESULT_ID = re.compile(r'^[A-Za-z0-9_-]{1,200}$')
+
+def result_id(output_path):
+    """Stable id of a file in the output folder; the cache key for conversions."""
+    return os.path.splitext(os.path.basename(output_path))[0]
+
+def result_headers(response, output_path):
+    response.headers['X-Result-ID'] = result_id(output_path)
+    response.headers['Content-Location'] = f'/results/{result_id(output_path)}'
+    return response
+
+def submit_conversion():
+    """Save an upload and queue its conversion; returns (job, error response)."""
+    if 'file' not in request.files:
+        return None, (jsonify({'error': 'No file part'}), 400)
+
+    file = request.files['file']
+    if file.filename == '':
+        return None, (jsonify({'error': 'No selected file'}), 400)
+    priority = request.form.get('priority', 'normal')
+    if priority not in PRIORITIES:
+        return None, (jsonify({'error': f'Unknown priority: {priority}'}), 400)
+    try:
+        options = OptimizeOptions.from_form(request.values)
+        sheets = SheetOptions.from_form(request.values)
+        timeout = conversion_timeout(request.values)
+        webhook = request.form.get('webhook')
+        if webhook:
+            check_webhook(webhook, app.config['WEBHOOK_HOSTS'])
+    except ValueError as e:
+        return None, (jsonify({'error': str(e)}), 400)
+    upload = file.stream
+    filename = upload.filename
+    timestamp = datetime.now().strftime('%Y%m%d%H%M%S')
+    file_path = upload.source()
+    digest = upload.hexdigest()
+    preflight = preflight_file(file_path)
+    try:
+        preflight.check()
+        if sheets and preflight.kind != 'excel':
+            raise ValueError('Sheet selection only applies to Excel workbooks')
+    except ValueError as e:
+        cout(f'Rejected {file_path}: {e}')
+        conversions.inc(format=preflight.format or 'unknown', outcome='rejected')
+        upload.discard()
+        return None, (jsonify({'error': str(e)}), 400)
+    track_upload(file_path)
+    upload.claim()
+    cout(f'Convert file {file_path}')
+
+    file_type = preflight.format
+    output_filename = f'converted_{timestamp}_{filename.rsplit(".", 1)[0]}.pdf'
+    optimization = {}
+    sheet_report = {}
+    job = Job(
+        lambda: convert_upload(file_path, file_type, digest, options, optimization, timeout, sheets, sheet_report,
+                               preflight),
+        priority=priority,
+        webhook=webhook,
+        filename=filename,
+        output_filename=output_filename,
+        optimization=optimization,
+        sheets=sheet_report,
+    )
+    try:
+        job_queue.submit(job)
+    except QueueFull as e:
+        retention.release(file_path)
+        os.remove(file_path)
+        response = jsonify({'error': str(e)})
+        response.headers['Retry-After'] = str(e.retry_after)
+        return None, (response, 429)
+    return job, None
+
+def send_job_result(job):
+    output_path, hit = job.result
+    if not os.path.exists(output_path):
+        return jsonify({'error': 'Result has expired'}), 410
+    response = send_tracked_file(output_path, download_name=job.info['output_filename'])
+    result_headers(response, output_path)
+    response.headers['X-Cache'] = 'HIT' if hit else 'MISS'
+    if job.info.get('optimization'):
+        response.headers['X-Optimization'] = json.dumps(job.info['optimization'])
+    if job.info.get('sheets'):
+        response.headers['X-Sheet-Report'] = json.dumps(job.info['sheets'])
+    return response
+
+def job_error(job):
+    if isinstance(job.error, SheetExportError):
+        return jsonify({'error': str(job.error), 'sheets': job.error.report['sheets']}), 422
+    if isinstance(job.error, ValueError):
+        return jsonify({'error': str(job.error)}), 400
+    if isinstance(job.error, ConversionTimeout):
+        return jsonify({'error': str(job.error)}), 504
+    cout(f"Error processing file {job.info['filename']}: {job.error}")
+    return jsonify({'error': 'File conversion failed'}), 500
+
+@app.route('/convert', methods=['POST'])
+def convert_file():
+    job, error = submit_conversion()
+    if error:
+        return error
+    job.wait()
+    if job.status == 'failed':
+        return job_error(job)
+    return send_job_result(job)
+
+@app.route('/jobs', methods=['POST'])
+def create_job():
+    job, error = submit_conversion()
+    if error:
+        return error
+    response = jsonify(job.to_dict())
+    response.headers['Location'] = f'/jobs/{job.id}'
+    return response, 202
+
+@app.route('/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    job = job_queue.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Unknown job'}), 404
+    data = job.to_dict()
+    if job.status != 'done':
+        return jsonify(data), 200
+    data['result_url'] = f'/results/{result_id(job.result[0])}'
+    response = jsonify(data)
+    # Lets the supervisor's router send the result_url back to this worker.
+    response.headers['X-Result-ID'] = result_id(job.result[0])
+    return response, 200
+
+@app.route('/jobs/<job_id>/result', methods=['GET'])
+def get_job_result(job_id):
+    job = job_queue.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Unknown job'}), 404
+    if job.status == 'failed':
+        return job_error(job)
+    if job.status != 'done':
+        response = jsonify(job.to_dict())
+        response.headers['Retry-After'] = str(job_queue.retry_after())
+        return response, 409
+    return send_job_result(job)
+
+@app.route('/results/<result_id>', methods=['GET', 'HEAD'])
+def download_result(result_id):
+    # Resumable: clients retry with Range/If-Range instead of converting again.
+    if not RESULT_ID.match(result_id):
+        return jsonify({'error': 'Unknown result'}), 404
+    output_path = os.path.abspath(os.path.join(app.config['OUTPUT_FOLDER'], f'{result_id}.pdf'))
+    if not os.path.isfile(output_path):
+        return jsonify({'error': 'Unknown or expired result'}), 404
+    return send_tracked_file(output_path, download_name=request.args.get('name') or f'{result_id}.pdf')
+
+@app.route('/convert-batch', methods=['POST'])
+def convert_batch():
+    uploads = [f for f in request.files.getlist('file') if f.filename != '']
+    if not uploads:
+        return jsonify({'error': 'No selected file'}), 400
+    output = request.form.get('output', 'zip')
+    if output not in ('zip', 'merged'):
+        return jsonify({'error': f'Unknown output: {output}'}), 400
+    priority = request.form.get('priority', 'normal')
+    if priority not in PRIORITIES:
+        return jsonify({'error': f'Unknown priority: {priority}'}), 400
+    try:
+        options = OptimizeOptions.from_form(request.values)
+        timeout = conversion_timeout(request.values)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    entries = []
+    try:
+        for file in uploads:
+            upload = file.stream
+            if upload.filename.lower().endswith('.zip'):
+                try:
+                    entries.extend(extract_zip(upload.source(), app.config['UPLOAD_FOLDER'], app.config['MAX_UPLOAD_BYTES']))
+                finally:
+                    upload.discard()
+            else:
+                entries.append((upload.filename, upload.claim().source(), upload.hexdigest()))
+    except BatchError as e:
+        for _, file_path, _ in entries:
+            os.remove(file_path)
+        return jsonify({'error': str(e)}), 400
+    if not entries:
+        return jsonify({'error': 'No file in the batch'}), 400
+    for _, file_path, _ in entries:
+        track_upload(file_path)
+
+    members = []
+    for filename, file_path, digest in entries:
+        # Go by the bytes, as for single uploads; members that fail the
+        # preflight are reported as failed in the batch.
+        preflight = preflight_file(file_path)
+        members.append((filename, Job(
+            partial(convert_upload, file_path, preflight.format or 'unknown', digest, options, timeout=timeout,
+                    preflight=preflight),
+            priority=priority, filename=filename)))
+    try:
+        job_queue.submit_many([job for _, job in members])
+    except QueueFull as e:
+        for _, file_path, _ in entries:
+            retention.release(file_path)
+            os.remove(file_path)
+        response = jsonify({'error': str(e)})
+        response.headers['Retry-After'] = str(e.retry_after)
+        return response, 429
+    cout(f'Convert batch of {len(members)} files to {output}')
+
+    timestamp = datetime.now().strftime('%Y%m%d%H%M%S')
+    if output == 'zip':
+        return Response(stream_zip(members), mimetype='application/zip', headers={
+            'Content-Disposition': f'attachment; filename=converted_{timestamp}.zip',
+        })
+
+    output_path = os.path.abspath(os.path.join(app.config['OUTPUT_FOLDER'], f'merged_{timestamp}_{uuid.uuid4().hex[:8]}.pdf'))
+    try:
+        report = merge_pdfs(members, output_path)
+    except BatchError as e:
+        return jsonify({'error': str(e), 'files': [
+            {'filename': filename, 'status': job.status, 'error': str(job.error)} for filename, job in members
+        ]}), 422
+    retention.track(output_path)
+    response = send_tracked_file(output_path, download_name=f'converted_{timestamp}.pdf')
+    result_headers(response, output_path)
+    response.headers['X-Batch-Report'] = json.dumps(report)
+    return response
+
+def preview_response(path, digest):
+    fmt = request.args.get('format', 'png').lower()
+    try:
+        width = int(request.args['width']) if request.args.get('width') else None
+        scale = float(request.args['scale']) if request.args.get('scale') else None
+        rendered = page_renderer.render(path, digest, request.args.get('pages'), width, scale, fmt)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    if len(rendered) == 1:
+        return Response(rendered[0][1], mimetype=FORMATS[fmt])
+    return jsonify(preview_json(rendered, fmt))
+
+@app.route('/jobs/<job_id>/preview', methods=['GET'])
+def preview_job(job_id):
+    job = job_queue.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Unknown job'}), 404
+    if job.status != 'done':
+        return jsonify(job.to_dict()), 409
+    output_path, _ = job.result
+    if not os.path.exists(output_path):
+        return jsonify({'error': 'Result has expired'}), 410
+    retention.lease(output_path)
+    try:
+        # Cached outputs are named after their content digest.
+        return preview_response(output_path, os.path.basename(output_path)[:-4])
+    finally:
+        retention.release(output_path)
+
+@app.route('/preview', methods=['POST'])
+def preview_upload():
+    file = request.files.get('file')
+    if file is None or file.filename == '':
+        return jsonify({'error': 'No selected file'}), 400
+    upload = file.stream
+    try:
+        return preview_response(upload.source(), upload.hexdigest())
+    except RuntimeError:
+        return jsonify({'error': 'Cannot open PDF'}), 400
+    finally:
+        upload.discard()
+
+@app.route('/admission-stats', methods=['GET'])
+def admission_stats():
+    return jsonify(admission.stats()), 200
+
+@app.route('/converter-stats', methods=['GET'])
+def converter_stats():
+    return jsonify(converter_pool.stats()), 200
+
+@app.route('/profiles', methods=['GET'])
+@require_profile_token
+def list_profiles():
+    return jsonify(profiler.recent(request.args.get('endpoint'), request.args.get('limit', 50, type=int))), 200
+
+@app.route('/profiles/hot', methods=['GET'])
+@require_profile_token
+def hot_functions():
+    return jsonify(profiler.hot(request.args.get('endpoint'), request.args.get('window', type=float),
+                                request.args.get('limit', 20, type=int))), 200
+
+@app.route('/profiles/<profile_id>', methods=['GET'])
+@require_profile_token
+def get_profile(profile_id):
+    record = profiler.get(profile_id)
+    if record is None:
+        return jsonify({'error': 'Unknown profile'}), 404
+    if request.args.get('format') == 'pstats':
+        response = Response(record.dump(), mimetype='application/octet-stream')
+        response.headers['Content-Disposition'] = f'attachment; filename={record.id}.prof'
+        return response
+    return jsonify(record.to_dict(request.args.get('top', profiler.top, type=int),
+                                  request.args.get('sort', 'cumulative'))), 200
+
+@app.route('/cache-stats', methods=['GET'])
+def cache_stats():
+    return jsonify({
+        'conversions': conversion_cache.stats(),
+        'signatures': signature_cache.stats(),
+        'previews': page_renderer.cache.stats(),
+    }), 200
+
+@app.route('/signatures', methods=['GET'])
+def query_signatures():
+    """Query the signature index, e.g. ?expiring_before=2026-12-31&issuer=CA%20X"""
+    filters = {
+        name: request.args.get(name) for name in (
+            'expiring_before', 'expiring_after', 'issuer', 'signer', 'serial', 'signed_before', 'signed_after')
+    }
+    try:
+        limit = min(int(request.args.get('limit', 100)), 1000)
+        offset = int(request.args.get('offset', 0))
+    except ValueError:
+        return jsonify({'error': 'limit and offset must be integers'}), 400
+    start = time.perf_counter()
+    signatures = signature_index.query(limit=limit, offset=offset, **filters)
+    return jsonify({
+        'signatures': signatures,
+        'count': len(signatures),
+        'duration_ms': round((time.perf_counter() - start) * 1000, 2),
+        'index': signature_index.stats(),
+    }), 200
+
+@app.route('/extract-signature', methods=['POST'])
+def extract_signature():
+    if 'file' not in request.files:
+        return jsonify({"message": "No file part", "filename": "", "signatures": []}), 400
+
+    file = request.files['file']
+    filename = file.filename
+
+    if filename == '':
+        return jsonify({"message": "No selected file", "filename": "", "signatures": []}), 400
+
+    upload = file.stream
+    try:
+        filename = upload.filename
+        cout(f'Extract signature from file {upload.path or filename} ({upload.size} bytes)')
+        
+        # Open the PDF file
+        verify = request.values.get('verify', 'false').lower() == 'true'
+        keep_raw = request.values.get('include_raw', 'false').lower() == 'true'
+        extractor = SignatureExtract()
+        with stage_seconds.time(stage='signature_parse'):
+            signatures = extractor.get_signature_details(upload.source(), verify=verify, keep_raw=keep_raw)
+        signature_extractions.inc(outcome='signed' if signatures else 'unsigned')
+        cache = {"hits": extractor.cache_hits, "misses": extractor.cache_misses, "totals": signature_cache.stats()}
+
+        if not signatures:
+            return jsonify({"message": "No signatures found", "filename": filename, "signatures": [], "cache": cache}), 400
+
+        # Same bytes as jsonify (sorted keys, compact), written in one pass.
+        body = (f'{{"cache":{app.json.dumps(cache, separators=(",", ":"))},"filename":{app.json.dumps(filename)},'
+                f'"message":"Signatures extracted","signatures":{dumps_signatures(signatures)}}}\n')
+        return Response(body, mimetype='application/json')
+
+    except Exception as e:
+        signature_extractions.inc(outcome='error')
+        return jsonify({"message": str(e), "filename": filename, "signatures": []}), 500
+    finally:
+        upload.discard()
+
+def iter_bulk_signatures(futures):
+    """Yield one NDJSON line per file, in completion order."""
+    for future in as_completed(futures):
+        filename, file_path = futures[future]
+        try:
+            count, signatures = future.result()
+            signature_extractions.inc(outcome='signed' if count else 'unsigned')
+            message = "Signatures extracted" if count else "No signatures found"
+            yield f'{{"filename":{app.json.dumps(filename)},"message":"{message}","signatures":{signatures}}}\n'
+        except Exception as e:
+            signature_extractions.inc(outcome='error')
+            yield app.json.dumps({"message": str(e), "filename": filename, "signatures": []}) + "\n"
+        finally:
+            os.remove(file_path)
+
+def remove_upload(file_path, future=None):
+    try:
+        os.remove(file_path)
+    except FileNotFoundError:
+        pass
+
+def remove_bulk_uploads(futures):
+    # Runs when the response closes, also when the client went away before
+    # every line was sent: drop the work not started yet and remove each
+    # upload once nothing reads it any more.
+    for future, (_, file_path) in futures.items():
+        future.cancel()
+        future.add_done_callback(partial(remove_upload, file_path))
+
+@app.route('/extract-signature-bulk', methods=['POST'])
+def extract_signature_bulk():
+    uploads = [f for f in request.files.getlist('file') if f.filename != '']
+    if not uploads:
+        return jsonify({"message": "No selected file", "filename": "", "signatures": []}), 400
+    verify = request.values.get('verify', 'false').lower() == 'true'
+
+    entries = []
+    try:
+        for file in uploads:
+            upload = file.stream
+            if upload.filename.lower().endswith('.zip'):
+                try:
+                    entries.extend(
+                        (filename, file_path) for filename, file_path, _ in
+                        extract_zip(upload.source(), app.config['UPLOAD_FOLDER'], app.config['MAX_UPLOAD_BYTES']))
+                finally:
+                    upload.discard()
+            else:
+                entries.append((upload.filename, upload.claim().source()))
+    except BatchError as e:
+        for _, file_path in entries:
+            os.remove(file_path)
+        return jsonify({"message": str(e), "filename": "", "signatures": []}), 400
+
+    cout(f'Extract signatures from {len(entries)} files')
+    futures = {
+        process_pool().submit(extract_signatures_json, file_path, verify): (filename, file_path)
+        for filename, file_path in entries
+    }
+    response = Response(iter_bulk_signatures(futures), mimetype='application/x-ndjson')
+    response.call_on_close(partial(remove_bulk_uploads, futures))
+    return response
+
+# @app.route('/convert', methods=['POST'])
+# def convert_file():
+#     if 'source' not in request.form or 'destination' not in request.form:
+#         return jsonify({'error': 'Missing form-data fields'}), 400
+    
+#     # Retrieve form-data fields
+#     source = request.form['source']
+#     destination = request.form['destination']
+#     try:
+#         convert_to_pdf(source, destination)
+#     except ValueError as e:
+#         return jsonify({'error': str(e)}), 400
+#     except Exception as e:
+#         cout(f"Error processing file {source}: {e}")
+#         return jsonify({'error': 'File conversion failed'}), 500
+
+#     return destination, 200
+
+if __name__ == '__main__':
+    freeze_support()
+    parser = argparse.ArgumentParser(description="Run Flask app with specified port and debug mode")
+    
+    parser.add_argument('--keep_old_file', type=lambda x: (str(x).lower() == 'true'), default=True, help='Scan and remove old file after 1 day')
+    parser.add_argument('--port', type=int, default=5000, help='Port to run the app on. Default 5000')
+    parser.add_argument('--threads', type=int, default=16, help='Maximum threads being create. Default 16')
+    parser.add_argument('--connection_limit', type=int, default=200, help='Maxium connection being serve. Default 200')
+    parser.add_argument('--converters', type=int, default=2, help='Office instances kept warm per document type. Default 2')
+    parser.add_argument('--recycle_after', type=int, default=100, help='Restart an Office instance after this many conversions. Default 100')
+    parser.add_argument('--recycle_memory_mb', type=int, default=500, help='Restart an Office instance once it has grown by this many MB. Default 500')
+    parser.add_argument('--convert_timeout', type=float, default=120, help='Kill a conversion after this many seconds and retry it once on a fresh instance. 0 disables the deadline. Default 120')
+    parser.add_argument('--converter_backend', choices=['office', 'fake'], default=os.environ.get(BACKEND_ENV) or 'office', help='Converter backend. fake writes blank PDFs and is only for tests and benchmarks. Default office, or the CONVERTER_BACKEND environment variable')
+    parser.add_argument('--cache_size_mb', type=int, default=2048, help='Disk budget for cached conversions in MB. Default 2048')
+    parser.add_argument('--queue_size', type=int, default=100, help='Conversions allowed to wait before answering 429. Default 100')
+    parser.add_argument('--max_upload_mb', type=int, default=512, help='Largest accepted upload in MB. Default 512')
+    parser.add_argument('--cpu_workers', type=int, default=os.cpu_count() or 1, help='Processes used for bulk signature extraction and page previews. Default: number of cores')
+    parser.add_argument('--log_max_mb', type=int, default=50, help='Rotate log/log.jsonl once it reaches this size in MB. It is also rotated daily. Default 50')
+    parser.add_argument('--disk_quota_mb', type=int, default=0, help='Evict oldest uploads/outputs once they take more than this many MB. Default 0 (no quota)')
+    parser.add_argument('--disk_high_water', type=float, default=0.9, help='Evict oldest uploads/outputs once the disk is this full. Default 0.9')
+    parser.add_argument('--convert_queue', type=int, default=8, help='/convert requests allowed to wait for a converter before answering 429. Default 8')
+    parser.add_argument('--signature_concurrency', type=int, default=None, help='Concurrent /extract-signature requests. Default: --cpu_workers')
+    parser.add_argument('--signature_queue', type=int, default=None, help='/extract-signature requests allowed to wait before answering 429. Default: --signature_concurrency')
+    parser.add_argument('--client_quota', type=int, default=None, help='Requests one client (X-Client-ID or address) may have running or waiting per lane. Default no quota')
+    parser.add_argument('--queue_timeout', type=float, default=30, help='Seconds a request waits for its lane before answering 503. Default 30')
+    parser.add_argument('--signature_archive', default=None, help='Folder of signed PDFs to keep in the signature index queried by /signatures')
+    parser.add_argument('--signature_index_hours', type=float, default=24, help='Hours between re-indexing runs of --signature_archive. Default 24')
+    parser.add_argument('--profile_token', default=None, help='Secret that enables profiling a request with the X-Profile header (or ?profile=) and reading /profiles. Default disabled')
+    parser.add_argument('--profile_sample', type=float, default=0.0, help='Fraction of requests profiled with cProfile without being asked, for /profiles/hot. Default 0')
+    parser.add_argument('--profile_window', type=float, default=3600, help='Seconds of profiles aggregated by /profiles/hot. Default 3600')
+    parser.add_argument('--webhook_hosts', default=None, help='Comma-separated hosts job webhooks may call. Default any host')
+    parser.add_argument('--debug', type=lambda x: (str(x).lower() == 'true'), default=False, help='Run app in debug mode. Note that it will using Flask as backend. Some features might not available. Not recommend for running as product.')
+    
+    args = parser.parse_args()
+    if args.converter_backend == 'office' and not office_available():
+        parser.error('The office converter backend needs Microsoft Office and pywin32 on Windows; '
+                     'pass --converter_backend fake only for tests and benchmarks')
+    app.config['PORT'] = args.port
+    log_pipeline.max_bytes = args.log_max_mb * 1024 * 1024
+    
+    cout(f'Start application with port {args.port}. Debug mode set to {args.debug}')
+    scheduler = BackgroundScheduler()
+    retention.ttl = app.config['FILE_RETENTION_DAYS'] * 86400
+    retention.quota_bytes = args.disk_quota_mb * 1024 * 1024 if args.disk_quota_mb else None
+    retention.high_water = args.disk_high_water
+    retention.low_water = args.disk_high_water - 0.1
+    if args.keep_old_file == True:
+        cout('Remove old file is enable')
+        retention.reconcile()
+        scheduler.add_job(retention.sweep, 'interval', minutes=1)
+        scheduler.add_job(retention.reconcile, 'interval', days=1)
+
+    converter_pool = ConverterPool(
+        factories=default_factories(args.converter_backend),
+        size=args.converters,
+        max_jobs=args.recycle_after,
+        max_memory_growth=args.recycle_memory_mb * 1024 * 1024,
+        convert_timeout=args.convert_timeout or None,
+    )
+    cout(f'Launching {args.converters} converter instances per document type')
+    converter_pool.start()
+    app.config['CACHE_MAX_BYTES'] = args.cache_size_mb * 1024 * 1024
+    app.config['MAX_UPLOAD_BYTES'] = args.max_upload_mb * 1024 * 1024
+    app.config['MAX_CONTENT_LENGTH'] = app.config['MAX_UPLOAD_BYTES'] + 1024 * 1024
+    app.config['CPU_WORKERS'] = args.cpu_workers
+    app.config['CONVERT_TIMEOUT'] = args.convert_timeout or None
+    if args.webhook_hosts:
+        app.config['WEBHOOK_HOSTS'] = {host.strip().lower() for host in args.webhook_hosts.split(',') if host.strip()}
+    conversion_cache.max_bytes = app.config['CACHE_MAX_BYTES']
+    scheduler.add_job(converter_pool.check_idle, 'interval', minutes=1)
+    job_queue.workers = args.converters * len(converter_pool.factories)
+    job_queue.max_size = args.queue_size
+    for lane in admission.lanes.values():
+        lane.queue_timeout = args.queue_timeout
+        lane.per_client = args.client_quota
+    if not size_lanes(args.threads, job_queue.workers, args.convert_queue,
+                      args.signature_concurrency or args.cpu_workers, args.signature_queue):
+        cout(f'--threads {args.threads} is too low for the admission lanes; light requests may queue', level='warning')
+    for lane in admission.lanes.values():
+        cout(f'Lane {lane.name}: {lane.limit} running, {lane.max_waiting} waiting, {lane.queue_timeout}s timeout')
+    profiler.token = args.profile_token
+    profiler.sample_rate = args.profile_sample
+    profiler.window = args.profile_window
+    if profiler.sample_rate and not profiler.token:
+        cout('--profile_sample is set without --profile_token; sampled profiles cannot be read', level='warning')
+    if args.signature_archive:
+        # Unchanged files are skipped, so re-runs only parse new documents.
+        scheduler.add_job(signature_index.index, 'interval', hours=args.signature_index_hours,
+                          next_run_time=datetime.now(), args=[args.signature_archive],
+                          kwargs={'executor': process_pool(), 'log': cout})
+    scheduler.add_job(job_queue.prune, 'interval', hours=1, args=[app.config['FILE_RETENTION_DAYS'] * 86400])
+    scheduler.start()
+        
+    if args.debug:
+        # Debug mode (not recommended for production)
+        app.run(port=args.port, debug=args.debug, host='0.0.0.0', threaded=True)
+    else:
+        cout(f'Connection limit: {args.connection_limit}')
+        cout(f'Threads limit: {args.threads}')
+        cout(f'File uploaded being auto-remove after 1 days: {args.keep_old_file}')
+        # Production mode with Waitress
+        serve(app, host='0.0.0.0', port=args.port, threads=args.threads, connection_limit=args.connection_limit)
@@ -1,95 +1,657 @@
-import platform
-import os, sys, argparse
-from datetime import datetime, timedelta
-
-def cout(message: str):
-    timestamp = datetime.now().strftime("%d/%m/%Y %H:%M:%S")
-    log_message = f"{timestamp} - {message}"
-    
-    print(log_message, file=sys.stdout)
-    
-    # with open(os.path.join(app.config['LOGS_FOLDER'], "log.txt"), "a") as f:
-    #     f.write(f"{log_message}\n")
-
-class WordConverter:
-
-    
-    def __init__(self):
-        if platform.system() == "Windows":
-            import pythoncom
-            import win32com.client as win32
-
-        pythoncom.CoInitialize()    
-        # self.word = win32.DispatchEx('Word.Application')
-        self.word = win32.gencache.EnsureDispatch('Word.Application')
-        self.word.Visible = False
-    def convert(self, file_path, output_path):
-        try:
-            if not self.word:
-                raise ValueError("Word application is not initialized.")
-            
-            print(f"Word Application Object: {self.word}")
-            try:
-                doc = self.word.Documents.Open(
-                    file_path,
-                    ReadOnly=True,
-                    NoEncodingDialog=True,
-                    PasswordDocument="123" 
-                )
-                doc.Activate()
-            except Exception as e:
-                if "password" in str(e).lower():
-                    raise ValueError("The file is password protected and cannot be opened.") from e
-                else:
-                    raise e
-            doc = self.word.Documents.Open(file_path)
-            doc.SaveAs(output_path, FileFormat=17)  # 17 is the code for PDF
-            doc.Close()
-        except Exception as e:
-            print(f"Error converting {file_path} to PDF: {e.__class__.__name__}: {str(e)}")
-            raise e
-        finally:
-            self.word.Quit()
-
-    def close(self):
-        if platform.system() == "Windows":
-            import pythoncom
-            import win32com.client as win32
-        self.word.Quit()
-        self.word = None
-        pythoncom.CoUninitialize()
-
-class ExcelConverter:
-    def __init__(self):
-        if platform.system() == "Windows":
-            import pythoncom
-            import win32com.client as win32
-        pythoncom.CoInitialize()
-        self.excel = win32.DispatchEx('Excel.Application')
-        self.excel.Visible = False  # Set to True for debugging purposes if needed
-
-    def convert(self, file_path, output_path):
-        try:
-            if not self.excel:
-                raise ValueError("Excel application is not initialized.")
-            
-            print(f"Excel Application Object: {self.excel}")  # Debug: Print the Excel object
-            
-            workbook = self.excel.Workbooks.Open(file_path)
-            workbook.ExportAsFixedFormat(0, output_path)  # 0 for PDF
-            workbook.Close(False)
-        except Exception as e:
-            print(f"Error converting {file_path} to PDF: {e.__class__.__name__}: {str(e)}")
-            raise e
-
-    def close(self):
-        try:
-            if platform.system() == "Windows":
-                import pythoncom
-                import win32com.client as win32
-            if self.excel:
-                self.excel.Quit()
-                self.excel = None
-                pythoncom.CoUninitialize()
-        except Exception as e:
-            print(f"Error closing Excel application: {e.__class__.__name__}: {str(e)}")
\ No newline at end of file
+import platform
+import os, sys, argparse
+import contextvars
+import importlib.util
+import queue
+import re
+import signal
+import threading
+import time
+import zipfile
+from collections import deque
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+from contextlib import contextmanager
+from functools import partial
+from datetime import datetime, timedelta
+
+from log_pipeline import log
+from profiler import follow
+
+def cout(message: str, level='info', sample=None):
+    log(message, level=level, sample=sample, source='office_converter')
+
+
+def _office_process_id(hwnd):
+    """Return the pid of the Office process owning the window handle, or None."""
+    try:
+        import win32process
+        return win32process.GetWindowThreadProcessId(hwnd)[1]
+    except Exception:
+        return None
+
+
+def _process_memory(pid):
+    """Return the working set (bytes) of a process, or None when unknown."""
+    if not pid:
+        return None
+    try:
+        import win32api
+        import win32con
+        import win32process
+        handle = win32api.OpenProcess(
+            win32con.PROCESS_QUERY_INFORMATION | win32con.PROCESS_VM_READ, False, pid)
+        try:
+            return win32process.GetProcessMemoryInfo(handle)['WorkingSetSize']
+        finally:
+            win32api.CloseHandle(handle)
+    except Exception:
+        return None
+
+
+def _kill_process(pid):
+    """Terminate a process by pid; returns True when it was signalled."""
+    if not pid:
+        return False
+    try:
+        import win32api
+        import win32con
+    except ImportError:
+        try:
+            os.kill(pid, signal.SIGTERM)
+            return True
+        except OSError:
+            return False
+    try:
+        handle = win32api.OpenProcess(win32con.PROCESS_TERMINATE, False, pid)
+        try:
+            win32api.TerminateProcess(handle, 1)
+        finally:
+            win32api.CloseHandle(handle)
+        return True
+    except Exception:
+        return False
+
+
+class WordConverter:
+
+    
+    def __init__(self):
+        if platform.system() == "Windows":
+            import pythoncom
+            import win32com.client as win32
+
+        pythoncom.CoInitialize()    
+        # self.word = win32.DispatchEx('Word.Application')
+        self.word = win32.gencache.EnsureDispatch('Word.Application')
+        self.word.Visible = False
+        self.pid = self._find_process_id()
+
+    def _find_process_id(self):
+        # Word does not expose its main window handle, so give it a unique
+        # caption and look the window up by class name.
+        try:
+            import win32gui
+            caption = f"pdf-converter-{os.getpid()}-{id(self)}"
+            self.word.Caption = caption
+            return _office_process_id(win32gui.FindWindow("OpusApp", caption))
+        except Exception:
+            return None
+
+    def convert(self, file_path, output_path):
+        try:
+            if not self.word:
+                raise ValueError("Word application is not initialized.")
+            
+            cout(f"Word Application Object: {self.word}", level='debug', sample=0.01)
+            try:
+                # Encrypted files are rejected by the pre-flight check; the
+                # dummy password still keeps one that slips through from
+                # blocking on a password prompt.
+                doc = self.word.Documents.Open(
+                    file_path,
+                    ConfirmConversions=False,
+                    ReadOnly=True,
+                    AddToRecentFiles=False,
+                    PasswordDocument="123",
+                    NoEncodingDialog=True,
+                )
+            except Exception as e:
+                if "password" in str(e).lower():
+                    raise ValueError("The file is password protected and cannot be opened.") from e
+                else:
+                    raise e
+            doc.SaveAs(output_path, FileFormat=17)  # 17 is the code for PDF
+            doc.Close(False)
+        except Exception as e:
+            cout(f"Error converting {file_path} to PDF: {e.__class__.__name__}: {str(e)}", level='error')
+            raise e
+        finally:
+            # The application is reused by the pool, only drop what this
+            # conversion has opened.
+            try:
+                while self.word and self.word.Documents.Count:
+                    self.word.Documents(1).Close(False)
+            except Exception:
+                pass
+
+    def is_alive(self):
+        try:
+            return bool(self.word) and self.word.Version is not None
+        except Exception:
+            return False
+
+    def memory_usage(self):
+        return _process_memory(self.pid)
+
+    def kill(self):
+        # Called from another thread while a COM call is stuck, so it must
+        # not touch self.word.
+        return _kill_process(self.pid)
+
+    def close(self):
+        if platform.system() == "Windows":
+            import pythoncom
+            import win32com.client as win32
+        self.word.Quit()
+        self.word = None
+        pythoncom.CoUninitialize()
+
+class ExcelConverter:
+    def __init__(self):
+        if platform.system() == "Windows":
+            import pythoncom
+            import win32com.client as win32
+        pythoncom.CoInitialize()
+        self.excel = win32.DispatchEx('Excel.Application')
+        self.excel.Visible = False  # Set to True for debugging purposes if needed
+        self.excel.DisplayAlerts = False
+        self.pid = _office_process_id(self.excel.Hwnd)
+
+    def convert(self, file_path, output_path):
+        try:
+            if not self.excel:
+                raise ValueError("Excel application is not initialized.")
+            
+            cout(f"Excel Application Object: {self.excel}", level='debug', sample=0.01)
+            
+            workbook = self.excel.Workbooks.Open(file_path)
+            try:
+                workbook.ExportAsFixedFormat(0, output_path)  # 0 for PDF
+            finally:
+                workbook.Close(False)
+        except Exception as e:
+            cout(f"Error converting {file_path} to PDF: {e.__class__.__name__}: {str(e)}", level='error')
+            raise e
+
+    def sheet_names(self, file_path):
+        """Names of the visible worksheets, in workbook order."""
+        workbook = self.excel.Workbooks.Open(file_path, ReadOnly=True)
+        try:
+            # -1 is xlSheetVisible; hidden sheets are not exported either.
+            return [sheet.Name for sheet in workbook.Worksheets if sheet.Visible == -1]
+        finally:
+            workbook.Close(False)
+
+    def export_sheets(self, file_path, targets):
+        """Export every (sheet name, output path) in `targets` to its own PDF.
+
+        Returns one (seconds, error) pair per target; a sheet Excel refuses
+        to export (for instance an empty one) gets its error instead of
+        failing the others.
+        """
+        workbook = self.excel.Workbooks.Open(file_path, ReadOnly=True)
+        try:
+            results = []
+            for name, output_path in targets:
+                start = time.time()
+                try:
+                    workbook.Worksheets(name).ExportAsFixedFormat(0, output_path)
+                    results.append((time.time() - start, None))
+                except Exception as e:
+                    results.append((time.time() - start, f"{e.__class__.__name__}: {str(e)}"))
+            return results
+        finally:
+            workbook.Close(False)
+
+    def is_alive(self):
+        try:
+            return bool(self.excel) and self.excel.Version is not None
+        except Exception:
+            return False
+
+    def memory_usage(self):
+        return _process_memory(self.pid)
+
+    def kill(self):
+        return _kill_process(self.pid)
+
+    def close(self):
+        try:
+            if platform.system() == "Windows":
+                import pythoncom
+                import win32com.client as win32
+            if self.excel:
+                self.excel.Quit()
+                self.excel = None
+                pythoncom.CoUninitialize()
+        except Exception as e:
+            cout(f"Error closing Excel application: {e.__class__.__name__}: {str(e)}", level='error')
+
+
+def write_placeholder_pdf(output_path, pages=1):
+    """Write a minimal, valid PDF with the given number of blank A4 pages."""
+    objects = [b"<< /Type /Catalog /Pages 2 0 R >>"]
+    kids = " ".join(f"{3 + i} 0 R" for i in range(pages))
+    objects.append(f"<< /Type /Pages /Kids [{kids}] /Count {pages} >>".encode())
+    for _ in range(pages):
+        objects.append(b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] >>")
+
+    body = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, obj in enumerate(objects, start=1):
+        offsets.append(len(body))
+        body += f"{number} 0 obj\n".encode() + obj + b"\nendobj\n"
+    xref = len(body)
+    body += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+    for offset in offsets:
+        body += f"{offset:010d} 00000 n \n".encode()
+    body += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode()
+    with open(output_path, "wb") as f:
+        f.write(body)
+
+
+class FakeConverter:
+    """In-process stand-in for the Office converters.
+
+    Used on machines without Office (Linux, CI, benchmarks). It sleeps for
+    `launch_delay` / `convert_delay` seconds to mimic Office and writes a
+    blank PDF instead of exporting the document. Files whose name contains
+    `hang_on` block until the converter is killed, like a poison document.
+    """
+    launch_delay = 0.0
+    convert_delay = 0.0
+    hang_on = None
+
+    def __init__(self):
+        self._killed = threading.Event()
+        if self._killed.wait(self.launch_delay):
+            raise RuntimeError("Fake converter was killed while launching.")
+        self.pid = None
+
+    def convert(self, file_path, output_path):
+        hang = self.hang_on and self.hang_on in os.path.basename(file_path)
+        if self._killed.wait(None if hang else self.convert_delay):
+            raise RuntimeError("Fake converter was killed.")
+        write_placeholder_pdf(output_path)
+
+    def sheet_names(self, file_path):
+        # Read the sheet list straight from an .xlsx; anything else is
+        # treated as a single-sheet workbook.
+        try:
+            with zipfile.ZipFile(file_path) as archive:
+                workbook = archive.read('xl/workbook.xml').decode('utf-8', 'replace')
+        except (OSError, KeyError, zipfile.BadZipFile):
+            return ['Sheet1']
+        names = []
+        for tag in re.findall(r'<(?:\w+:)?sheet\b[^>]*>', workbook):
+            name = re.search(r'\bname="([^"]*)"', tag)
+            if name and 'state="hidden"' not in tag and 'state="veryHidden"' not in tag:
+                names.append(name.group(1))
+        return names or ['Sheet1']
+
+    def export_sheets(self, file_path, targets):
+        results = []
+        for _, output_path in targets:
+            start = time.time()
+            if self._killed.wait(self.convert_delay):
+                raise RuntimeError("Fake converter was killed.")
+            write_placeholder_pdf(output_path)
+            results.append((time.time() - start, None))
+        return results
+
+    def is_alive(self):
+        return not self._killed.is_set()
+
+    def memory_usage(self):
+        return None
+
+    def kill(self):
+        self._killed.set()
+        return True
+
+    def close(self):
+        self._killed.set()
+
+
+BACKEND_ENV = 'CONVERTER_BACKEND'
+
+
+def office_available():
+    """True when Word and Excel can be driven over COM on this machine."""
+    return platform.system() == "Windows" and importlib.util.find_spec('win32com') is not None
+
+
+def default_factories(backend=None):
+    """Converter factories per document kind for the given backend name.
+
+    `backend` is 'office' or 'fake'. It defaults to the CONVERTER_BACKEND
+    environment variable and then to Office on every platform; the fake
+    converter writes blank PDFs and is only for tests and benchmarks.
+    """
+    backend = backend or os.environ.get(BACKEND_ENV) or "office"
+    if backend == "office":
+        return {'word': WordConverter, 'excel': ExcelConverter}
+    if backend == "fake":
+        return {'word': FakeConverter, 'excel': FakeConverter}
+    raise ValueError(f"Unknown converter backend: {backend}")
+
+
+class PoolTimeout(Exception):
+    """Raised when no converter instance became free in time."""
+    pass
+
+
+class ConversionTimeout(Exception):
+    """Raised when a conversion ran past its deadline on every attempt."""
+    pass
+
+
+class ConverterInstance:
+    """One converter application bound to its own thread.
+
+    COM objects live in the apartment of the thread that created them, so the
+    backend is launched, used and closed on a dedicated thread and every call
+    is marshalled to it through a queue.
+    """
+    def __init__(self, kind, factory):
+        self.kind = kind
+        self.factory = factory
+        self.backend = None
+        self.error = None
+        self.jobs = 0
+        self.baseline_memory = None
+        self.memory = None
+        self.started_at = time.time()
+        self.ready = threading.Event()
+        self._tasks = queue.Queue()
+        self._thread = threading.Thread(
+            target=self._run, name=f"converter-{kind}", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        try:
+            self.backend = self.factory()
+            self.baseline_memory = self.backend.memory_usage()
+        except Exception as e:
+            cout(f"Error launching {self.kind} converter: {e.__class__.__name__}: {str(e)}")
+            self.error = e
+            self.ready.set()
+            return
+        self.ready.set()
+        while True:
+            task = self._tasks.get()
+            if task is None:
+                break
+            fn, future = task
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                future.set_result(fn(self.backend))
+            except BaseException as e:
+                future.set_exception(e)
+        try:
+            self.backend.close()
+        except Exception as e:
+            cout(f"Error closing {self.kind} converter: {e.__class__.__name__}: {str(e)}")
+
+    @property
+    def alive(self):
+        return self.backend is not None and self.error is None and self._thread.is_alive()
+
+    def submit(self, fn):
+        future = Future()
+        # Run in the caller's context so log records keep its request id
+        # and the work shows up in the caller's profile.
+        self._tasks.put((partial(contextvars.copy_context().run, follow(fn)), future))
+        return future
+
+    def call(self, fn, timeout=None):
+        return self.submit(fn).result(timeout)
+
+    def run(self, fn, timeout=None, label='Conversion'):
+        """Run fn(backend) as one job; kill the backend if it overruns `timeout`."""
+        def job(backend):
+            try:
+                return fn(backend)
+            finally:
+                self.jobs += 1
+                self.memory = backend.memory_usage()
+        try:
+            return self.call(job, timeout)
+        except FutureTimeout:
+            self.kill()
+            raise ConversionTimeout(f"{label} took longer than {timeout} seconds") from None
+
+    def convert(self, file_path, output_path, timeout=None):
+        return self.run(lambda backend: backend.convert(file_path, output_path), timeout,
+                        f"Converting {os.path.basename(file_path)}")
+
+    def kill(self):
+        """Terminate a stuck backend and mark this instance dead.
+
+        The blocked call on the instance thread fails once the backend
+        process is gone; the pool replaces the instance on release.
+        """
+        self.error = self.error or RuntimeError("Killed by the watchdog")
+        backend = self.backend
+        killed = backend is not None and backend.kill()
+        if not killed:
+            cout(f"Could not kill the stuck {self.kind} converter; abandoning its thread", level='warning')
+        return killed
+
+    def memory_growth(self):
+        if self.memory is None or self.baseline_memory is None:
+            return 0
+        return self.memory - self.baseline_memory
+
+    def close(self):
+        self._tasks.put(None)
+
+
+class ConverterPool:
+    """Keeps warm converter instances per document kind.
+
+    `size` instances of every kind in `factories` are launched up front and
+    handed out one request at a time. An instance is recycled (closed and
+    replaced) once it has served `max_jobs` conversions or its process has
+    grown by more than `max_memory_growth` bytes, and idle instances are
+    health-checked by `check_idle`. A conversion running longer than
+    `convert_timeout` seconds has its backend killed and is retried
+    `retries` times on a fresh instance before ConversionTimeout is raised.
+    """
+    def __init__(self, factories=None, size=2, max_jobs=100,
+                 max_memory_growth=500 * 1024 * 1024, acquire_timeout=300,
+                 convert_timeout=None, retries=1):
+        self.factories = factories or default_factories()
+        self.size = size
+        self.max_jobs = max_jobs
+        self.max_memory_growth = max_memory_growth
+        self.acquire_timeout = acquire_timeout
+        self.convert_timeout = convert_timeout
+        self.retries = retries
+        self._lock = threading.Condition()
+        self._idle = {kind: deque() for kind in self.factories}
+        self._busy = {kind: set() for kind in self.factories}
+        self._launching = {kind: 0 for kind in self.factories}
+        self._started = False
+        self._closed = False
+        self.recycled = 0
+        self.timeouts = 0
+        self.kills = 0
+        # Files that timed out, newest last, to spot poison documents.
+        self.timed_out = deque(maxlen=50)
+
+    def start(self, wait=False):
+        with self._lock:
+            if self._started:
+                return
+            self._started = True
+            for kind in self.factories:
+                for _ in range(self.size):
+                    self._spawn(kind)
+        if wait:
+            with self._lock:
+                self._lock.wait_for(lambda: not any(self._launching.values()))
+
+    def _spawn(self, kind):
+        # Called with the lock held; the launch itself happens on the
+        # instance's thread so a slow Office start never blocks the caller.
+        self._launching[kind] += 1
+        instance = ConverterInstance(kind, self.factories[kind])
+        threading.Thread(target=self._await_launch, args=(instance,), daemon=True).start()
+
+    def _await_launch(self, instance):
+        instance.ready.wait()
+        with self._lock:
+            self._launching[instance.kind] -= 1
+            if instance.alive and not self._closed:
+                self._idle[instance.kind].append(instance)
+            elif not self._closed:
+                instance.close()
+                # Back off so a broken installation does not spin.
+                timer = threading.Timer(5, self._respawn, args=(instance.kind,))
+                timer.daemon = True
+                timer.start()
+            self._lock.notify_all()
+
+    def _respawn(self, kind):
+        with self._lock:
+            if not self._closed and self._capacity(kind) < self.size:
+                self._spawn(kind)
+
+    def _capacity(self, kind):
+        return len(self._idle[kind]) + len(self._busy[kind]) + self._launching[kind]
+
+    def _retire(self, instance):
+        # Called with the lock held.
+        self._busy[instance.kind].discard(instance)
+        try:
+            self._idle[instance.kind].remove(instance)
+        except ValueError:
+            pass
+        instance.close()
+        if not self._closed:
+            self._spawn(instance.kind)
+
+    @contextmanager
+    def acquire(self, kind, timeout=None):
+        if kind not in self.factories:
+            raise ValueError(f"No converter available for {kind}")
+        self.start()
+        timeout = self.acquire_timeout if timeout is None else timeout
+        with self._lock:
+            if not self._lock.wait_for(lambda: self._idle[kind] or self._closed, timeout):
+                raise PoolTimeout(f"No {kind} converter became available within {timeout} seconds")
+            if self._closed:
+                raise PoolTimeout("Converter pool is closed")
+            instance = self._idle[kind].popleft()
+            self._busy[kind].add(instance)
+        try:
+            yield instance
+        finally:
+            self.release(instance)
+
+    def release(self, instance):
+        with self._lock:
+            if instance not in self._busy[instance.kind]:
+                return
+            if not instance.alive:
+                cout(f"Replacing dead {instance.kind} converter")
+                self._retire(instance)
+            elif instance.jobs >= self.max_jobs or instance.memory_growth() > self.max_memory_growth:
+                cout(f"Recycling {instance.kind} converter after {instance.jobs} jobs, "
+                     f"memory growth {instance.memory_growth() // (1024 * 1024)} MB")
+                self.recycled += 1
+                self._retire(instance)
+            else:
+                self._busy[instance.kind].discard(instance)
+                self._idle[instance.kind].append(instance)
+            self._lock.notify_all()
+
+    def convert(self, kind, file_path, output_path, timeout=None):
+        return self.run(kind, lambda backend: backend.convert(file_path, output_path), file_path, timeout)
+
+    def run(self, kind, fn, file_path, timeout=None, label=None):
+        """Run fn(backend) on a `kind` instance under the conversion deadline.
+
+        `file_path` is the document being worked on; it names the job in
+        timeout errors and in the poison-document list.
+        """
+        timeout = self.convert_timeout if timeout is None else timeout
+        label = label or f"Converting {os.path.basename(file_path)}"
+        for attempt in range(self.retries + 1):
+            with self.acquire(kind) as instance:
+                try:
+                    return instance.run(fn, timeout, label)
+                except ConversionTimeout as e:
+                    error = e
+                    with self._lock:
+                        self.timeouts += 1
+                        self.kills += 1
+                        self.timed_out.append({
+                            'file': os.path.basename(file_path),
+                            'kind': kind,
+                            'attempt': attempt + 1,
+                            'at': datetime.now().isoformat(timespec='seconds'),
+                        })
+                    cout(f"{error}; killed the {kind} converter (attempt {attempt + 1} of {self.retries + 1})",
+                         level='error')
+        raise error
+
+    def check_idle(self, timeout=30):
+        """Health-check idle instances and replace the ones that fail."""
+        with self._lock:
+            idle = [instance for kind in self._idle for instance in self._idle[kind]]
+            for instance in idle:
+                self._idle[instance.kind].remove(instance)
+                self._busy[instance.kind].add(instance)
+        for instance in idle:
+            try:
+                healthy = instance.call(lambda backend: backend.is_alive(), timeout)
+            except FutureTimeout:
+                instance.kill()
+                with self._lock:
+                    self.kills += 1
+                healthy = False
+            except Exception:
+                healthy = False
+            if not healthy:
+                cout(f"Health check failed for {instance.kind} converter")
+                instance.error = instance.error or RuntimeError("Health check failed")
+            self.release(instance)
+
+    def stats(self):
+        with self._lock:
+            instances = {
+                kind: {
+                    'idle': len(self._idle[kind]),
+                    'busy': len(self._busy[kind]),
+                    'launching': self._launching[kind],
+                } for kind in self.factories
+            }
+            return {
+                'instances': instances,
+                'recycled': self.recycled,
+                'timeouts': self.timeouts,
+                'kills': self.kills,
+                'timed_out': list(self.timed_out),
+            }
+
+    def close(self):
+        with self._lock:
+            self._closed = True
+            for kind in self.factories:
+                for instance in list(self._idle[kind]) + list(self._busy[kind]):
+                    instance.close()
+                self._idle[kind].clear()
+            self._lock.notify_all()
@@ -0,0 +1,134 @@
+import base64
+import threading
+from collections import OrderedDict
+
+import fitz
+
+try:
+    from PIL import Image
+except ImportError:  # WebP output is optional
+    Image = None
+
+FORMATS = {'png': 'image/png', 'jpeg': 'image/jpeg', 'webp': 'image/webp'}
+
+
+def render_page(path, page_number, width=None, scale=1.0, fmt='png'):
+    """Render one page (1-based) to image bytes.
+
+    Module-level so it can run in a process pool; MuPDF rendering does not
+    scale across threads.
+    """
+    with fitz.open(path) as doc:
+        page = doc[page_number - 1]
+        if width:
+            scale = width / page.rect.width
+        pixmap = page.get_pixmap(matrix=fitz.Matrix(scale, scale), alpha=False)
+        if fmt == 'webp':
+            import io
+            buffer = io.BytesIO()
+            Image.frombytes('RGB', (pixmap.width, pixmap.height), pixmap.samples).save(buffer, 'WEBP')
+            return buffer.getvalue()
+        return pixmap.tobytes('jpg' if fmt == 'jpeg' else 'png')
+
+
+class PreviewCache:
+    """LRU of rendered pages bounded by their total size in bytes."""
+    def __init__(self, max_bytes=256 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            image = self._entries.get(key)
+            if image is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return image
+
+    def put(self, key, image):
+        if len(image) > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._size -= len(previous)
+            self._entries[key] = image
+            self._size += len(image)
+            while self._size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= len(evicted)
+
+    def stats(self):
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'entries': len(self._entries),
+                    'bytes': self._size, 'max_bytes': self.max_bytes}
+
+
+def parse_pages(spec, page_count):
+    """Page numbers from '1,3,5-7' (1-based); defaults to the first page."""
+    if not spec:
+        return [1]
+    pages = []
+    for part in spec.split(','):
+        first, _, last = part.strip().partition('-')
+        try:
+            first, last = int(first), int(last or first)
+        except ValueError as e:
+            raise ValueError(f"Invalid page selection: {spec}") from e
+        if not 1 <= first <= last <= page_count:
+            raise ValueError(f"Pages must be between 1 and {page_count}")
+        pages.extend(range(first, last + 1))
+    return pages
+
+
+class PageRenderer:
+    """Renders the requested pages only, through a shared cache, in parallel."""
+    def __init__(self, executor, cache=None, max_pages=20):
+        self.executor = executor
+        self.cache = cache or PreviewCache()
+        self.max_pages = max_pages
+
+    def render(self, path, digest, pages=None, width=None, scale=None, fmt='png'):
+        """Return [(page_number, image bytes)] for the selection in `pages`."""
+        if fmt not in FORMATS:
+            raise ValueError(f"Unknown format: {fmt}")
+        if fmt == 'webp' and Image is None:
+            raise ValueError("WebP previews require Pillow")
+        if width is not None and not 16 <= width <= 4096:
+            raise ValueError("width must be between 16 and 4096")
+        scale = 1.0 if scale is None else scale
+        if not 0.05 <= scale <= 8:
+            raise ValueError("scale must be between 0.05 and 8")
+        with fitz.open(path) as doc:
+            page_numbers = parse_pages(pages, doc.page_count)
+        if len(page_numbers) > self.max_pages:
+            raise ValueError(f"At most {self.max_pages} pages per request")
+
+        size = f"w{width}" if width else f"s{scale:.3f}"
+        results = {}
+        futures = {}
+        for number in page_numbers:
+            key = (digest, number, size, fmt)
+            image = self.cache.get(key)
+            if image is not None:
+                results[number] = image
+            elif key not in futures:
+                futures[key] = self.executor().submit(render_page, path, number, width, scale, fmt)
+        for key, future in futures.items():
+            image = future.result()
+            self.cache.put(key, image)
+            results[key[1]] = image
+        return [(number, results[number]) for number in page_numbers]
+
+
+def to_json(rendered, fmt):
+    return {"pages": [
+        {"page": number, "mimetype": FORMATS[fmt], "data": base64.b64encode(image).decode('ascii')}
+        for number, image in rendered
+    ]}
@@ -0,0 +1,88 @@
+import os
+import time
+
+import fitz
+
+
+class OptimizeOptions:
+    """Per-request optimization settings.
+
+    Attributes:
+        downsample_dpi (int, None): re-encode images above this resolution
+            down to it
+        image_quality (int): JPEG quality used for re-encoded images
+        linearize (bool): write a linearized ("fast web view") file when the
+            installed MuPDF still supports it
+    """
+    def __init__(self, downsample_dpi=None, image_quality=75, linearize=False):
+        self.downsample_dpi = downsample_dpi
+        self.image_quality = image_quality
+        self.linearize = linearize
+
+    @classmethod
+    def from_form(cls, form):
+        """Options from request form/query values, or None when not requested."""
+        if form.get('optimize', 'false').lower() != 'true':
+            return None
+        try:
+            dpi = int(form['dpi']) if form.get('dpi') else None
+            quality = int(form.get('image_quality', 75))
+        except ValueError as e:
+            raise ValueError(f"Invalid optimization option: {e}") from e
+        if dpi is not None and dpi < 36:
+            raise ValueError("dpi must be at least 36")
+        return cls(dpi, quality, form.get('linearize', 'false').lower() == 'true')
+
+    def to_dict(self):
+        return {
+            "downsample_dpi": self.downsample_dpi,
+            "image_quality": self.image_quality,
+            "linearize": self.linearize,
+        }
+
+
+def optimize_pdf(path, options):
+    """Rewrite the PDF at `path` in place and return a size/time report.
+
+    Unused and duplicate objects are dropped (garbage=4), streams, fonts and
+    images are recompressed, embedded fonts are subset and, optionally,
+    images are downsampled.
+    """
+    start = time.perf_counter()
+    size_before = os.path.getsize(path)
+    temp_path = f"{path}.optimized.pdf"
+    linearized = False
+    with fitz.open(path) as doc:
+        if options.downsample_dpi:
+            doc.rewrite_images(
+                dpi_threshold=options.downsample_dpi + 1,
+                dpi_target=options.downsample_dpi,
+                quality=options.image_quality,
+            )
+        try:
+            doc.subset_fonts()
+        except Exception:
+            # Subsetting is best effort; some fonts cannot be rebuilt.
+            pass
+        save_options = dict(garbage=4, clean=True, deflate=True, deflate_images=True, deflate_fonts=True)
+        if options.linearize:
+            try:
+                doc.save(temp_path, linear=True, **save_options)
+                linearized = True
+            except Exception:
+                # MuPDF 1.24+ removed linearization.
+                pass
+        if not linearized:
+            doc.save(temp_path, use_objstms=True, **save_options)
+    if os.path.getsize(temp_path) < size_before:
+        os.replace(temp_path, path)
+    else:
+        os.remove(temp_path)
+        linearized = False
+    return {
+        "size_before": size_before,
+        "size_after": os.path.getsize(path),
+        "duration_ms": round((time.perf_counter() - start) * 1000, 3),
+        "linearized": linearized,
+        **options.to_dict(),
+    }
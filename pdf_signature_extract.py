@@ -1,260 +1,1133 @@
-import datetime
-import sys
-
-from asn1crypto import cms
-from dateutil.parser import parse
-from pypdf import PdfReader
-
-
-class AttrClass:
-    def __init__(self, data, cls_name=None):
-        self._data = data
-        self._cls_name = cls_name
-
-    def __getattr__(self, name):
-        try:
-            value = self._data[name]
-        except KeyError:
-            value = None
-        else:
-            if isinstance(value, dict):
-                return AttrClass(value, cls_name=name.capitalize() or self._cls_name)
-        return value
-
-    def __values_for_str__(self):
-        """Values to show for "str" and "repr" methods"""
-        return [
-            (k, v) for k, v in self._data.items()
-            if isinstance(v, (str, int, datetime.datetime))
-        ]
-
-    def __str__(self):
-        """String representation of object"""
-        values = ", ".join([
-            f"{k}={v}" for k, v in self.__values_for_str__()
-        ])
-        return f"{self._cls_name or self.__class__.__name__}({values})"
-
-    def __repr__(self):
-        return f"<{self}>"
-
-
-class Signature(AttrClass):
-    """Signature helper class
-
-    Attributes:
-        type (str): 'timestamp' or 'signature'
-        signing_time (datetime, datetime): when user has signed
-            (user HW's clock)
-        signer_name (str): the signer's common name
-        signer_contact_info (str, None): the signer's email / contact info
-        signer_location (str, None): the signer's location
-        signature_type (str): ETSI.cades.detached, adbe.pkcs7.detached, ...
-        certificate (Certificate): the signers certificate
-        digest_algorithm (str): the digest algorithm used
-        message_digest (bytes): the digest
-        signature_algorithm (str): the signature algorithm used
-        signature_bytes (bytest): the raw signature
-    """
-
-    @property
-    def signer_name(self):
-        return (
-            self._data.get('signer_name') or
-            getattr(self.certificate.subject, 'common_name', '')
-        )
-
-
-class Subject(AttrClass):
-    """Certificate subject helper class
-
-    Attributes:
-        common_name (str): the subject's common name
-        given_name (str): the subject's first name
-        surname (str): the subject's surname
-        serial_number (str): subject's identifier (may not exist)
-        country (str): subject's country
-    """
-    pass
-
-
-class Certificate(AttrClass):
-    """Signer's certificate helper class
-
-    Attributes:
-        version (str): v3 (= X509v3)
-        serial_number (int): the certificate's serial number
-        subject (object): signer's subject details
-        issuer (object): certificate issuer's details
-        signature (object): certificate signature
-        extensions (list[OrderedDict]): certificate extensions
-        validity (object): validity (not_before, not_after)
-        subject_public_key_info (object): public key info
-        issuer_unique_id (object, None): issuer unique id
-        subject_uniqiue_id (object, None): subject unique id
-    """
-    def __init__(self, *args, **kwargs):
-        super().__init__(*args, **kwargs)
-        self.subject = Subject(self._data['subject'])
-
-    def __values_for_str__(self):
-        return (
-            super().__values_for_str__() +
-            [('common_name', self.subject.common_name)]
-        )
-        
-class SignatureDetails:
-    def __init__(self):
-        self.digest_algorithm = None
-        self.signature_algorithm = None
-        self.content_type = None
-        self.type = None
-        self.signer_contact_info = None
-        self.signer_location = None
-        self.signing_time = None
-        self.signature_type = None
-        self.signature_handler = None
-        self.issuer_country_name = None
-        self.issuer_organization_name = None
-        self.issuer_common_name = None
-        self.subject_country_name = None
-        self.subject_organization_name = None
-        self.subject_organizational_unit_name = None
-        self.subject_common_name = None
-        self.subject_locality_name = None
-        self.common_name = None
-        self.valid_from = None
-        self.valid_to = None
-
-    def to_dict(self):
-        return {
-            "digest_algorithm": self.digest_algorithm,
-            "signature_algorithm": self.signature_algorithm,
-            "content_type": self.content_type,
-            "type": self.type,
-            "signer_contact_info": self.signer_contact_info,
-            "signer_location": self.signer_location,
-            "signing_time": self.signing_time,
-            "signature_type": self.signature_type,
-            "signature_handler": self.signature_handler,
-            "valid_from": self.valid_from,
-            "valid_to": self.valid_to,
-            "issuer": {
-                "country_name": self.issuer_country_name,
-                "organization_name": self.issuer_organization_name,
-                "common_name": self.issuer_common_name,
-            },
-            "subject": {
-                "country_name": self.subject_country_name,
-                "organization_name": self.subject_organization_name,
-                "organizational_unit_name": self.subject_organizational_unit_name,
-                "common_name": self.subject_common_name,
-                "locality_name": self.subject_locality_name,
-            },
-        }
-
-    def __repr__(self):
-        return (f"SignatureDetails(digest_algorithm={self.digest_algorithm}, signature_algorithm={self.signature_algorithm}, "
-                f"content_type={self.content_type}, type={self.type}, signer_contact_info={self.signer_contact_info}, "
-                f"signer_location={self.signer_location}, signing_time={self.signing_time}, signature_type={self.signature_type}, "
-                f"signature_handler={self.signature_handler}, issuer_country_name={self.issuer_country_name}, "
-                f"issuer_organization_name={self.issuer_organization_name}, issuer_common_name={self.issuer_common_name}, "
-                f"subject_country_name={self.subject_country_name}, subject_organization_name={self.subject_organization_name}, "
-                f"subject_organizational_unit_name={self.subject_organizational_unit_name}, subject_common_name={self.subject_common_name}, "
-                f"subject_locality_name={self.subject_locality_name})")
-
-    
-    
-class SignatureExtract:
-    def __init__(self) -> None:
-        pass
-        
-    def parse_pkcs7_signatures(self, signature_data: bytes):
-        content_info = cms.ContentInfo.load(signature_data).native
-        if content_info['content_type'] != 'signed_data':
-            return None
-        content = content_info['content']
-        certificates = content['certificates']
-        signer_infos = content['signer_infos']
-        for signer_info in signer_infos:
-            sid = signer_info['sid']
-            digest_algorithm = signer_info['digest_algorithm']['algorithm']
-            signature_algorithm = signer_info['signature_algorithm']['algorithm']
-            signature_bytes = signer_info['signature']
-            signed_attrs = {
-                sa['type']: sa['values'][0] for sa in signer_info['signed_attrs']}
-            for cert in certificates:
-                cert = cert['tbs_certificate']
-                if (
-                    sid['serial_number'] == cert['serial_number'] and
-                    sid['issuer'] == cert['issuer']
-                ):
-                    break
-            else:
-                raise RuntimeError(
-                    f"Couldn't find certificate in certificates collection: {sid}")
-            yield dict(
-                sid=sid,
-                certificate=Certificate(cert),
-                digest_algorithm=digest_algorithm,
-                signature_algorithm=signature_algorithm,
-                signature_bytes=signature_bytes,
-                signer_info=signer_info,
-                **signed_attrs,
-            )
-
-
-    def get_pdf_signatures(self, filename):
-        """Parse PDF signatures"""
-        reader = PdfReader(filename)
-        fields = reader.get_fields().values()
-        signature_field_values = [
-            f.value for f in fields if f.field_type == '/Sig']
-        for v in signature_field_values:
-            v_type = v['/Type']
-            if v_type in ('/Sig', '/DocTimeStamp'):  # unknow types are skipped
-                is_timestamp = v_type == '/DocTimeStamp'
-                try:
-                    signing_time = parse(v['/M'][2:].strip("'").replace("'", ":"))
-                except KeyError:
-                    signing_time = None
-                # - used standard for signature encoding, in my case:
-                # - get PKCS7/CMS/CADES signature package encoded in ASN.1 / DER format
-                raw_signature_data = v['/Contents']
-                # if is_timestamp:
-                for attrdict in self.parse_pkcs7_signatures(raw_signature_data):
-                    if attrdict:
-                        attrdict.update(dict(
-                            type='timestamp' if is_timestamp else 'signature',
-                            signer_name=v.get('/Name'),
-                            signer_contact_info=v.get('/ContactInfo'),
-                            signer_location=v.get('/Location'),
-                            signing_time=signing_time or attrdict.get('signing_time'),
-                            signature_type=v['/SubFilter'][1:],  # ETSI.CAdES.detached, ...
-                            signature_handler=v['/Filter'][1:],
-                            raw=raw_signature_data,
-                        ))
-                        yield Signature(attrdict)
-    
-    
-    
-if __name__ == "__main__":
-    if len(sys.argv) != 2:
-        print(f"Usage: {sys.argv[0]} <filename>")
-        sys.exit(1)
-    filename = sys.argv[1]
-    signatureExtract = SignatureExtract()
-    for signature in signatureExtract.get_pdf_signatures(filename):
-        print(f"--- {signature.type} ---")
-        print(f"Signature: {signature}")
-        print(f"Signer: {signature.signer_name}")
-        print(f"Signing time: {signature.signing_time}")
-        certificate = signature.certificate
-        print(f"Signer's certificate: {certificate}")
-        print(f"  - not before: {certificate.validity.not_before}")
-        print(f"  - not after: {certificate.validity.not_after}")
-        print(f"  - issuer: {certificate.issuer}")
-        subject = signature.certificate.subject
-        print(f"  - subject: {subject}")
-        print(f"    - common name: {subject.common_name}")
+import base64
+import datetime
+import email.utils
+import hashlib
+import io
+import json
+import mmap
+import re
+import sys
+import os
+import threading
+import time
+import zlib
+from collections import OrderedDict, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+from asn1crypto import cms
+from dateutil.parser import parse
+from pypdf import PdfReader
+
+
+class AttrClass:
+    def __init__(self, data, cls_name=None):
+        self._data = data
+        self._cls_name = cls_name
+
+    def __getattr__(self, name):
+        try:
+            value = self._data[name]
+        except KeyError:
+            value = None
+        else:
+            if isinstance(value, dict):
+                return AttrClass(value, cls_name=name.capitalize() or self._cls_name)
+        return value
+
+    def __values_for_str__(self):
+        """Values to show for "str" and "repr" methods"""
+        return [
+            (k, v) for k, v in self._data.items()
+            if isinstance(v, (str, int, datetime.datetime))
+        ]
+
+    def __str__(self):
+        """String representation of object"""
+        values = ", ".join([
+            f"{k}={v}" for k, v in self.__values_for_str__()
+        ])
+        return f"{self._cls_name or self.__class__.__name__}({values})"
+
+    def __repr__(self):
+        return f"<{self}>"
+
+
+class Signature(AttrClass):
+    """Signature helper class
+
+    Attributes:
+        type (str): 'timestamp' or 'signature'
+        signing_time (datetime, datetime): when user has signed
+            (user HW's clock)
+        signer_name (str): the signer's common name
+        signer_contact_info (str, None): the signer's email / contact info
+        signer_location (str, None): the signer's location
+        signature_type (str): ETSI.cades.detached, adbe.pkcs7.detached, ...
+        certificate (Certificate): the signers certificate
+        digest_algorithm (str): the digest algorithm used
+        message_digest (bytes): the digest
+        imprint_algorithm (str, None): hash algorithm of the timestamped
+            document digest, for RFC 3161 timestamps
+        message_imprint (bytes, None): the timestamped document digest
+        signature_algorithm (str): the signature algorithm used
+        signature_bytes (bytest): the raw signature
+        byte_range (list[int]): the signed /ByteRange (offset, length pairs)
+        verification (SignatureVerification, None): set when extracted
+            with verify=True
+    """
+
+    @property
+    def signer_name(self):
+        return (
+            self._data.get('signer_name') or
+            getattr(self.certificate.subject, 'common_name', '')
+        )
+
+
+class Subject(AttrClass):
+    """Certificate subject helper class
+
+    Attributes:
+        common_name (str): the subject's common name
+        given_name (str): the subject's first name
+        surname (str): the subject's surname
+        serial_number (str): subject's identifier (may not exist)
+        country (str): subject's country
+    """
+    pass
+
+
+class Certificate(AttrClass):
+    """Signer's certificate helper class
+
+    Attributes:
+        version (str): v3 (= X509v3)
+        serial_number (int): the certificate's serial number
+        subject (object): signer's subject details
+        issuer (object): certificate issuer's details
+        signature (object): certificate signature
+        extensions (list[OrderedDict]): certificate extensions
+        validity (object): validity (not_before, not_after)
+        subject_public_key_info (object): public key info
+        issuer_unique_id (object, None): issuer unique id
+        subject_uniqiue_id (object, None): subject unique id
+    """
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.subject = Subject(self._data['subject'])
+
+    def __values_for_str__(self):
+        return (
+            super().__values_for_str__() +
+            [('common_name', self.subject.common_name)]
+        )
+        
+class SignatureDetails:
+    """Flat, immutable summary of one signature, as returned by the API.
+
+    Built straight from the parser's attribute dict (see
+    `SignatureExtract.get_signature_details`). The raw CMS blob is only kept
+    when asked for, and `to_json` writes the response JSON in one pass.
+    """
+    __slots__ = (
+        'digest_algorithm', 'signature_algorithm', 'content_type', 'type',
+        'signer_contact_info', 'signer_location', 'signing_time', 'signature_type',
+        'signature_handler', 'valid_from', 'valid_to',
+        'issuer_country_name', 'issuer_organization_name', 'issuer_common_name',
+        'subject_country_name', 'subject_organization_name', 'subject_organizational_unit_name',
+        'subject_common_name', 'subject_locality_name', 'verification', 'raw',
+    )
+
+    def __init__(self, **values):
+        for name in self.__slots__:
+            object.__setattr__(self, name, values.get(name))
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    def __delattr__(self, name):
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    @classmethod
+    def from_attrdict(cls, data, keep_raw=False):
+        """Details of one parsed signature (`parse_signature_value` output)."""
+        certificate = data['certificate']._data
+        subject, issuer, validity = certificate['subject'], certificate['issuer'], certificate['validity']
+        return cls(
+            digest_algorithm=data.get('digest_algorithm'),
+            signature_algorithm=data.get('signature_algorithm'),
+            content_type=data.get('content_type'),
+            type=data.get('type'),
+            signer_contact_info=data.get('signer_contact_info'),
+            signer_location=data.get('signer_location'),
+            signing_time=data.get('signing_time'),
+            signature_type=data.get('signature_type'),
+            signature_handler=data.get('signature_handler'),
+            valid_from=validity['not_before'],
+            valid_to=validity['not_after'],
+            issuer_country_name=issuer.get('country_name'),
+            issuer_organization_name=issuer.get('organization_name'),
+            issuer_common_name=issuer.get('common_name'),
+            subject_country_name=subject.get('country_name'),
+            subject_organization_name=subject.get('organization_name'),
+            subject_organizational_unit_name=subject.get('organizational_unit_name'),
+            subject_common_name=subject.get('common_name'),
+            subject_locality_name=subject.get('locality_name'),
+            verification=data.get('verification'),
+            raw=bytes(data['raw']) if keep_raw and data.get('raw') is not None else None,
+        )
+
+    def to_dict(self):
+        return {
+            "digest_algorithm": self.digest_algorithm,
+            "signature_algorithm": self.signature_algorithm,
+            "content_type": self.content_type,
+            "type": self.type,
+            "signer_contact_info": self.signer_contact_info,
+            "signer_location": self.signer_location,
+            "signing_time": self.signing_time,
+            "signature_type": self.signature_type,
+            "signature_handler": self.signature_handler,
+            "valid_from": self.valid_from,
+            "valid_to": self.valid_to,
+            "issuer": {
+                "country_name": self.issuer_country_name,
+                "organization_name": self.issuer_organization_name,
+                "common_name": self.issuer_common_name,
+            },
+            "subject": {
+                "country_name": self.subject_country_name,
+                "organization_name": self.subject_organization_name,
+                "organizational_unit_name": self.subject_organizational_unit_name,
+                "common_name": self.subject_common_name,
+                "locality_name": self.subject_locality_name,
+            },
+            **({"verification": self.verification.to_dict()} if self.verification else {}),
+            **({"raw": base64.b64encode(self.raw).decode('ascii')} if self.raw is not None else {}),
+        }
+
+    def __repr__(self):
+        values = ", ".join(f"{name}={getattr(self, name)}" for name in self.__slots__ if name != 'raw')
+        return f"SignatureDetails({values})"
+
+
+_encode_string = json.encoder.encode_basestring_ascii
+
+
+def _json_value(value):
+    """JSON text of one field, matching what Flask's jsonify produces."""
+    if value is None:
+        return 'null'
+    if type(value) is str:
+        return _encode_string(value)
+    if isinstance(value, datetime.datetime):
+        # Flask renders dates as HTTP dates in UTC.
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=datetime.timezone.utc)
+        return '"' + email.utils.format_datetime(value.astimezone(datetime.timezone.utc), usegmt=True) + '"'
+    if isinstance(value, bytes):
+        return '"' + base64.b64encode(value).decode('ascii') + '"'
+    if hasattr(value, 'to_dict'):
+        value = value.to_dict()
+    return json.dumps(value, sort_keys=True, separators=(',', ':'), default=str)
+
+
+def _compile_to_json(layout):
+    """Generate `to_json(details) -> str` for a fixed key layout.
+
+    `layout` lists (key, slot) pairs in output order; a slot may be a nested
+    layout, and keys in `_OPTIONAL` are left out when their value is None.
+    The keys and punctuation are baked into a single expression, so
+    serializing only costs one encoder call per field.
+    """
+    def expression(layout):
+        parts = []
+        for index, (key, slot) in enumerate(layout):
+            prefix = ('' if index == 0 else ',') + _encode_string(key) + ':'
+            if isinstance(slot, tuple):
+                parts.append(repr(prefix + '{') + ' + ' + expression(slot) + " + '}'")
+            elif key in _OPTIONAL:
+                parts.append(f"({prefix!r} + _v(d.{slot}) if d.{slot} is not None else '')")
+            else:
+                parts.append(f"{prefix!r} + _v(d.{slot})")
+        return '(' + ' + '.join(parts) + ')'
+
+    source = f"def to_json(d, _v=_json_value):\n    return '{{' + {expression(layout)} + '}}'\n"
+    namespace = {'_json_value': _json_value}
+    exec(compile(source, '<SignatureDetails.to_json>', 'exec'), namespace)
+    return namespace['to_json']
+
+
+_OPTIONAL = {'raw', 'verification'}
+# Sorted like Flask's jsonify so the response bytes are unchanged.
+SignatureDetails.to_json = _compile_to_json((
+    ('content_type', 'content_type'),
+    ('digest_algorithm', 'digest_algorithm'),
+    ('issuer', (
+        ('common_name', 'issuer_common_name'),
+        ('country_name', 'issuer_country_name'),
+        ('organization_name', 'issuer_organization_name'),
+    )),
+    ('raw', 'raw'),
+    ('signature_algorithm', 'signature_algorithm'),
+    ('signature_handler', 'signature_handler'),
+    ('signature_type', 'signature_type'),
+    ('signer_contact_info', 'signer_contact_info'),
+    ('signer_location', 'signer_location'),
+    ('signing_time', 'signing_time'),
+    ('subject', (
+        ('common_name', 'subject_common_name'),
+        ('country_name', 'subject_country_name'),
+        ('locality_name', 'subject_locality_name'),
+        ('organization_name', 'subject_organization_name'),
+        ('organizational_unit_name', 'subject_organizational_unit_name'),
+    )),
+    ('type', 'type'),
+    ('valid_from', 'valid_from'),
+    ('valid_to', 'valid_to'),
+    ('verification', 'verification'),
+))
+
+
+def dumps_signatures(details):
+    """JSON array of SignatureDetails."""
+    return '[' + ','.join([d.to_json() for d in details]) + ']'
+
+
+class PdfSyntaxError(ValueError):
+    """Raised by SignatureLocator when the file is outside what it can read."""
+    pass
+
+
+Ref = namedtuple('Ref', 'num gen')
+
+_WHITESPACE = b' \t\r\n\x00\x0c'
+_REGULAR = re.compile(rb'[^ \t\r\n\x00\x0c()<>\[\]{}/%]+')
+_NUMBER = re.compile(rb'[+-]?(\d+\.?\d*|\.\d+)')
+_REF_TAIL = re.compile(rb'\s+(\d+)\s+R(?=[ \t\r\n\x00\x0c()<>\[\]{}/%]|$)')
+_OBJ_HEADER = re.compile(rb'\s*(\d+)\s+(\d+)\s+obj\b')
+_STREAM = re.compile(rb'\s*stream(\r\n|\n|\r)')
+_XREF_SUBSECTION = re.compile(rb'(\d+)\s+(\d+)')
+_XREF_ENTRY = re.compile(rb'\s*(\d{10})\s(\d{5})\s([nf])')
+_NAME_ESCAPE = re.compile(rb'#([0-9a-fA-F]{2})')
+_ESCAPES = {ord('n'): b'\n', ord('r'): b'\r', ord('t'): b'\t', ord('b'): b'\b', ord('f'): b'\f'}
+
+
+def _text(value):
+    """Decode a PDF text string the way pypdf does for the fields we expose."""
+    if isinstance(value, bytes):
+        if value.startswith(b'\xfe\xff'):
+            return value[2:].decode('utf-16-be', 'replace')
+        return value.decode('latin-1')
+    return value
+
+
+class SignatureLocator:
+    """Reads only the signature dictionaries of a PDF.
+
+    The file is memory-mapped and only the objects on the path
+    trailer -> /Root -> /AcroForm -> /Fields -> /V are parsed, following the
+    cross-reference tables (classic or streams, including incremental
+    updates). Anything unusual raises PdfSyntaxError so the caller can fall
+    back to pypdf.
+    """
+    def __init__(self, source):
+        self._mmap = None
+        if isinstance(source, str):
+            with open(source, 'rb') as f:
+                self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            self.data = self._mmap
+        elif isinstance(source, io.BytesIO):
+            self.data = source.getvalue()
+        elif isinstance(source, (bytes, bytearray)):
+            self.data = bytes(source)
+        else:
+            raise PdfSyntaxError(f"Unsupported source: {type(source).__name__}")
+        self.xref = {}
+        self.trailer = {}
+        self._object_streams = {}
+
+    def close(self):
+        if self._mmap is not None:
+            self._mmap.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # -- lexer ---------------------------------------------------------------
+
+    @staticmethod
+    def _skip(data, pos):
+        end = len(data)
+        while pos < end:
+            c = data[pos]
+            if c in _WHITESPACE:
+                pos += 1
+            elif c == 0x25:  # % comment
+                while pos < end and data[pos] not in b'\r\n':
+                    pos += 1
+            else:
+                break
+        return pos
+
+    def _parse(self, data, pos):
+        """Parse one object at `pos`; returns (object, position after it)."""
+        pos = self._skip(data, pos)
+        if pos >= len(data):
+            raise PdfSyntaxError("Unexpected end of data")
+        c = data[pos]
+        if c == 0x2F:  # /name
+            match = _REGULAR.match(data, pos + 1)
+            raw = match.group() if match else b''
+            end = pos + 1 + len(raw)
+            if b'#' in raw:
+                raw = _NAME_ESCAPE.sub(lambda m: bytes([int(m.group(1), 16)]), raw)
+            return '/' + raw.decode('latin-1'), end
+        if c == 0x3C:  # < or <<
+            if data[pos + 1] == 0x3C:
+                return self._parse_dict(data, pos + 2)
+            end = data.find(b'>', pos)
+            if end < 0:
+                raise PdfSyntaxError(f"Unterminated hex string at {pos}")
+            hex_digits = bytes(data[pos + 1:end]).translate(None, _WHITESPACE)
+            if len(hex_digits) % 2:
+                hex_digits += b'0'
+            try:
+                return bytes.fromhex(hex_digits.decode('ascii')), end + 1
+            except ValueError as e:
+                raise PdfSyntaxError(f"Invalid hex string at {pos}") from e
+        if c == 0x5B:  # [
+            items = []
+            pos += 1
+            while True:
+                pos = self._skip(data, pos)
+                if pos >= len(data):
+                    raise PdfSyntaxError("Unterminated array")
+                if data[pos] == 0x5D:
+                    return items, pos + 1
+                item, pos = self._parse(data, pos)
+                items.append(item)
+        if c == 0x28:  # (
+            return self._parse_literal(data, pos + 1)
+        match = _NUMBER.match(data, pos)
+        if match:
+            token = match.group()
+            if b'.' in token:
+                return float(token), match.end()
+            ref = _REF_TAIL.match(data, match.end())
+            if ref:
+                return Ref(int(token), int(ref.group(1))), ref.end()
+            return int(token), match.end()
+        match = _REGULAR.match(data, pos)
+        if match:
+            token = match.group()
+            if token in (b'true', b'false'):
+                return token == b'true', match.end()
+            if token == b'null':
+                return None, match.end()
+        raise PdfSyntaxError(f"Unexpected token at {pos}")
+
+    def _parse_dict(self, data, pos):
+        result = {}
+        while True:
+            pos = self._skip(data, pos)
+            if pos + 1 >= len(data):
+                raise PdfSyntaxError("Unterminated dictionary")
+            if data[pos] == 0x3E and data[pos + 1] == 0x3E:
+                return result, pos + 2
+            key, pos = self._parse(data, pos)
+            if not isinstance(key, str):
+                raise PdfSyntaxError(f"Dictionary key is not a name at {pos}")
+            result[key], pos = self._parse(data, pos)
+
+    @staticmethod
+    def _parse_literal(data, pos):
+        out = bytearray()
+        depth = 1
+        end = len(data)
+        while pos < end:
+            c = data[pos]
+            pos += 1
+            if c == 0x5C:  # backslash
+                c = data[pos]
+                pos += 1
+                if c in _ESCAPES:
+                    out += _ESCAPES[c]
+                elif 0x30 <= c <= 0x37:
+                    value = c - 0x30
+                    for _ in range(2):
+                        if not 0x30 <= data[pos] <= 0x37:
+                            break
+                        value = value * 8 + data[pos] - 0x30
+                        pos += 1
+                    out.append(value & 0xFF)
+                elif c == 0x0D:
+                    if data[pos] == 0x0A:
+                        pos += 1
+                elif c != 0x0A:
+                    out.append(c)
+            elif c == 0x28:
+                depth += 1
+                out.append(c)
+            elif c == 0x29:
+                depth -= 1
+                if depth == 0:
+                    return bytes(out), pos
+                out.append(c)
+            else:
+                out.append(c)
+        raise PdfSyntaxError("Unterminated string")
+
+    # -- objects -------------------------------------------------------------
+
+    def _read_indirect(self, offset):
+        """Return (object, raw stream bytes or None) of the object at `offset`."""
+        match = _OBJ_HEADER.match(self.data, offset)
+        if not match:
+            raise PdfSyntaxError(f"No object at offset {offset}")
+        obj, pos = self._parse(self.data, match.end())
+        if isinstance(obj, dict):
+            stream = _STREAM.match(self.data, pos)
+            if stream:
+                length = self.resolve(obj.get('/Length'))
+                if not isinstance(length, int):
+                    raise PdfSyntaxError("Stream without a usable /Length")
+                return obj, self.data[stream.end():stream.end() + length]
+        return obj, None
+
+    @staticmethod
+    def _decode_stream(obj, raw):
+        filters = obj.get('/Filter')
+        filters = filters if isinstance(filters, list) else [filters] if filters else []
+        params = obj.get('/DecodeParms') or {}
+        if isinstance(params, list):
+            params = params[0] or {}
+        data = raw
+        for name in filters:
+            if name != '/FlateDecode':
+                raise PdfSyntaxError(f"Unsupported filter {name}")
+            data = zlib.decompress(data)
+        predictor = params.get('/Predictor', 1)
+        if predictor >= 10:
+            data = SignatureLocator._png_unpredict(data, params.get('/Columns', 1))
+        elif predictor != 1:
+            raise PdfSyntaxError(f"Unsupported predictor {predictor}")
+        return data
+
+    @staticmethod
+    def _png_unpredict(data, columns):
+        row_length = columns + 1
+        previous = bytearray(columns)
+        out = bytearray()
+        for start in range(0, len(data) - columns, row_length):
+            kind = data[start]
+            row = bytearray(data[start + 1:start + row_length])
+            if kind == 1:
+                for i in range(1, columns):
+                    row[i] = (row[i] + row[i - 1]) & 0xFF
+            elif kind == 2:
+                for i in range(columns):
+                    row[i] = (row[i] + previous[i]) & 0xFF
+            elif kind == 3:
+                for i in range(columns):
+                    left = row[i - 1] if i else 0
+                    row[i] = (row[i] + ((left + previous[i]) >> 1)) & 0xFF
+            elif kind == 4:
+                for i in range(columns):
+                    a = row[i - 1] if i else 0
+                    b = previous[i]
+                    c = previous[i - 1] if i else 0
+                    p = a + b - c
+                    pa, pb, pc = abs(p - a), abs(p - b), abs(p - c)
+                    row[i] = (row[i] + (a if pa <= pb and pa <= pc else b if pb <= pc else c)) & 0xFF
+            elif kind != 0:
+                raise PdfSyntaxError(f"Unsupported PNG predictor {kind}")
+            out += row
+            previous = row
+        return bytes(out)
+
+    def resolve(self, value):
+        """Return the object a reference points to (or the value itself)."""
+        for _ in range(32):
+            if not isinstance(value, Ref):
+                return value
+            entry = self.xref.get(value.num)
+            if entry is None or entry[0] == 'f':
+                return None
+            if entry[0] == 'n':
+                value, _ = self._read_indirect(entry[1])
+            else:
+                value = self._from_object_stream(entry[1], entry[2])
+        raise PdfSyntaxError("Reference chain too deep")
+
+    def _from_object_stream(self, stream_num, index):
+        if stream_num not in self._object_streams:
+            entry = self.xref.get(stream_num)
+            if entry is None or entry[0] != 'n':
+                raise PdfSyntaxError(f"Missing object stream {stream_num}")
+            obj, raw = self._read_indirect(entry[1])
+            if raw is None:
+                raise PdfSyntaxError(f"Object {stream_num} is not a stream")
+            data = self._decode_stream(obj, raw)
+            first = self.resolve(obj['/First'])
+            header = data[:first].split()
+            offsets = [first + int(offset) for offset in header[1::2]]
+            self._object_streams[stream_num] = (data, offsets)
+        data, offsets = self._object_streams[stream_num]
+        obj, _ = self._parse(data, offsets[index])
+        return obj
+
+    # -- cross-reference -----------------------------------------------------
+
+    def load_xref(self):
+        tail = bytes(self.data[max(0, len(self.data) - 2048):])
+        position = tail.rfind(b'startxref')
+        if position < 0:
+            raise PdfSyntaxError("startxref not found")
+        offset = int(tail[position + 9:].split()[0])
+        seen = set()
+        while offset is not None:
+            if offset in seen or offset >= len(self.data):
+                raise PdfSyntaxError(f"Broken xref chain at {offset}")
+            seen.add(offset)
+            trailer = self._read_xref_section(offset)
+            if '/XRefStm' in trailer:
+                self._read_xref_section(trailer['/XRefStm'])
+            for key, value in trailer.items():
+                self.trailer.setdefault(key, value)
+            offset = trailer.get('/Prev')
+        if '/Encrypt' in self.trailer:
+            raise PdfSyntaxError("Encrypted documents are not supported")
+
+    def _read_xref_section(self, offset):
+        pos = self._skip(self.data, offset)
+        if self.data[pos:pos + 4] == b'xref':
+            return self._read_xref_table(pos + 4)
+        obj, raw = self._read_indirect(offset)
+        if not isinstance(obj, dict) or obj.get('/Type') != '/XRef' or raw is None:
+            raise PdfSyntaxError(f"No xref at offset {offset}")
+        self._read_xref_stream(obj, self._decode_stream(obj, raw))
+        return obj
+
+    def _read_xref_table(self, pos):
+        while True:
+            pos = self._skip(self.data, pos)
+            if self.data[pos:pos + 7] == b'trailer':
+                trailer, _ = self._parse(self.data, pos + 7)
+                return trailer
+            header = _XREF_SUBSECTION.match(self.data, pos)
+            if not header:
+                raise PdfSyntaxError(f"Invalid xref subsection at {pos}")
+            start, count = int(header.group(1)), int(header.group(2))
+            pos = header.end()
+            for number in range(start, start + count):
+                entry = _XREF_ENTRY.match(self.data, pos)
+                if not entry:
+                    raise PdfSyntaxError(f"Invalid xref entry at {pos}")
+                pos = entry.end()
+                if number in self.xref:
+                    continue
+                if entry.group(3) == b'n':
+                    self.xref[number] = ('n', int(entry.group(1)))
+                else:
+                    self.xref[number] = ('f',)
+
+    def _read_xref_stream(self, obj, data):
+        widths = obj['/W']
+        index = obj.get('/Index') or [0, obj['/Size']]
+        if len(data) < sum(widths) * sum(index[1::2]):
+            raise PdfSyntaxError("Truncated xref stream")
+        pos = 0
+        for start, count in zip(index[::2], index[1::2]):
+            for number in range(start, start + count):
+                fields = []
+                for width in widths:
+                    fields.append(int.from_bytes(data[pos:pos + width], 'big') if width else None)
+                    pos += width
+                if number in self.xref:
+                    continue
+                kind = 1 if fields[0] is None else fields[0]
+                if kind == 1:
+                    self.xref[number] = ('n', fields[1])
+                elif kind == 2:
+                    self.xref[number] = ('c', fields[1], fields[2] or 0)
+                else:
+                    self.xref[number] = ('f',)
+
+    # -- signatures ----------------------------------------------------------
+
+    def signature_values(self):
+        """Return the /V dictionaries of all /Sig fields, fully resolved."""
+        self.load_xref()
+        catalog = self.resolve(self.trailer.get('/Root'))
+        if not isinstance(catalog, dict):
+            raise PdfSyntaxError("Missing document catalog")
+        acroform = self.resolve(catalog.get('/AcroForm'))
+        if not isinstance(acroform, dict):
+            return []
+        fields = self.resolve(acroform.get('/Fields')) or []
+        values = []
+        seen = set()
+        stack = [(field, None) for field in reversed(fields)]
+        while stack:
+            ref, inherited_type = stack.pop()
+            if isinstance(ref, Ref):
+                if ref in seen:
+                    continue
+                seen.add(ref)
+            field = self.resolve(ref)
+            if not isinstance(field, dict):
+                continue
+            field_type = field.get('/FT', inherited_type)
+            value_ref = field.get('/V')
+            if field_type == '/Sig' and value_ref is not None and value_ref not in seen:
+                if isinstance(value_ref, Ref):
+                    seen.add(value_ref)
+                value = self.resolve(value_ref)
+                if isinstance(value, dict):
+                    values.append({key: self.resolve(item) for key, item in value.items()})
+            kids = self.resolve(field.get('/Kids')) or []
+            stack.extend((kid, field_type) for kid in reversed(kids))
+        return values
+
+
+def _signer_key(sid):
+    if sid.name == 'issuer_and_serial_number':
+        return (sid.chosen['issuer'].hashable, sid.chosen['serial_number'].native)
+    return None
+
+
+class CachedCertificate:
+    __slots__ = ('key', '_tbs')
+
+    def __init__(self, certificate):
+        self.key = (certificate.issuer.hashable, certificate.serial_number)
+        self._tbs = None
+
+    def tbs_certificate(self, certificate):
+        """Decoded `tbs_certificate`, decoded once per process."""
+        if self._tbs is None:
+            self._tbs = certificate['tbs_certificate'].native
+        return self._tbs
+
+
+class CertificateCache:
+    """Process-wide LRU of parsed certificates keyed by the SHA-256 of their DER.
+
+    The same CA and signer certificates are embedded in most documents, so
+    their issuer/serial key and decoded fields are computed once.
+    """
+    def __init__(self, maxsize=1024):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, certificate):
+        digest = hashlib.sha256(certificate.dump()).digest()
+        with self._lock:
+            entry = self._entries.get(digest)
+            if entry is not None:
+                self._entries.move_to_end(digest)
+                self.hits += 1
+                return entry
+            self.misses += 1
+        entry = CachedCertificate(certificate)
+        with self._lock:
+            self._entries[digest] = entry
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return entry
+
+    def stats(self):
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'entries': len(self._entries)}
+
+
+certificate_cache = CertificateCache()
+
+
+class SignatureVerification:
+    """Outcome of hashing a signature's /ByteRange.
+
+    Attributes:
+        integrity (str): 'valid' when the computed digest equals the signed
+            message digest (the message imprint for timestamps), 'modified'
+            when it differs, 'unknown' when the signature carries no digest,
+            uses an unsupported algorithm or a /SubFilter that does not sign
+            the /ByteRange digest directly (such as adbe.pkcs7.sha1)
+        covers_whole_document (bool): the byte range spans the file from the
+            first byte to the last, except the /Contents hole
+        duration_ms (float): time spent hashing
+    """
+    def __init__(self, integrity, covers_whole_document, duration_ms, error=None):
+        self.integrity = integrity
+        self.covers_whole_document = covers_whole_document
+        self.duration_ms = duration_ms
+        self.error = error
+
+    def to_dict(self):
+        return {
+            "integrity": self.integrity,
+            "covers_whole_document": self.covers_whole_document,
+            "duration_ms": round(self.duration_ms, 3),
+            "error": self.error,
+        }
+
+    def __repr__(self):
+        return (f"SignatureVerification(integrity={self.integrity}, "
+                f"covers_whole_document={self.covers_whole_document}, duration_ms={self.duration_ms:.3f})")
+
+
+@contextmanager
+def _mapped(source):
+    """Memoryview over a file path (memory-mapped) or an in-memory upload."""
+    if isinstance(source, io.BytesIO):
+        view = source.getbuffer()
+        try:
+            yield view
+        finally:
+            view.release()
+        return
+    with open(source, 'rb') as f:
+        mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    view = memoryview(mapping)
+    try:
+        yield view
+    finally:
+        view.release()
+        mapping.close()
+
+
+# /SubFilter values whose digest is computed over the /ByteRange itself.
+VERIFIABLE_SUB_FILTERS = {'adbe.pkcs7.detached', 'ETSI.CAdES.detached', 'ETSI.RFC3161'}
+
+
+def _verify_byte_range(data, signature):
+    start = time.perf_counter()
+    byte_range = signature.byte_range or []
+    spans = list(zip(byte_range[::2], byte_range[1::2]))
+    size = len(data)
+    covers = (
+        bool(spans) and spans[0][0] == 0 and spans[-1][0] + spans[-1][1] == size
+        and all(a_start + a_len <= b_start for (a_start, a_len), (b_start, _) in zip(spans, spans[1:]))
+    )
+    if signature.signature_type not in VERIFIABLE_SUB_FILTERS:
+        return SignatureVerification('unknown', covers, (time.perf_counter() - start) * 1000,
+                                     error=f"/SubFilter {signature.signature_type} is not verified")
+    if signature.signature_type == 'ETSI.RFC3161':
+        algorithm, expected = signature.imprint_algorithm, signature.message_imprint
+    else:
+        algorithm, expected = signature.digest_algorithm, signature.message_digest
+    if not spans or expected is None:
+        return SignatureVerification('unknown', covers, (time.perf_counter() - start) * 1000,
+                                     error="No /ByteRange or message digest")
+    if any(offset < 0 or length < 0 or offset + length > size for offset, length in spans):
+        return SignatureVerification('modified', False, (time.perf_counter() - start) * 1000,
+                                     error="/ByteRange points outside the file")
+    try:
+        digest = hashlib.new(algorithm)
+    except (TypeError, ValueError):
+        return SignatureVerification('unknown', covers, (time.perf_counter() - start) * 1000,
+                                     error=f"Unsupported digest algorithm {algorithm}")
+    for offset, length in spans:
+        digest.update(data[offset:offset + length])
+    integrity = 'valid' if digest.digest() == expected else 'modified'
+    return SignatureVerification(integrity, covers, (time.perf_counter() - start) * 1000)
+
+
+class SignatureCache:
+    """LRU of parsed signatures, shared by all extractions in the process.
+
+    An incremental save only appends bytes, so every earlier revision's
+    signature value (its /ByteRange, /Contents and dictionary entries) is
+    unchanged in a re-uploaded file. The key hashes those entries; since
+    /Contents embeds the signed digest of the covered byte range, it stands
+    in for hashing the covered prefix itself. Only signatures added by the
+    new revision are parsed again.
+
+    The cache holds at most `maxsize` signature values and about
+    `max_bytes` of parsed data, whichever is reached first.
+    """
+    # Entries of the signature dictionary that end up in the results.
+    KEY_FIELDS = ('/Type', '/Filter', '/SubFilter', '/Name', '/ContactInfo', '/Location', '/M', '/ByteRange')
+    # Rough size of a parsed record besides its byte strings: the dict,
+    # certificate names, dates and algorithm names.
+    RECORD_OVERHEAD = 2048
+
+    def __init__(self, maxsize=4096, max_bytes=64 * 1024 * 1024):
+        self.maxsize = maxsize
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def key(cls, v):
+        """Digest of /Contents and the normalized entries in KEY_FIELDS.
+
+        Values are reduced to text (numbers for /ByteRange) so the key is the
+        same whether the dictionary came from SignatureLocator or pypdf.
+        """
+        sha256 = hashlib.sha256(bytes(v['/Contents']))
+        for name in cls.KEY_FIELDS:
+            value = v.get(name)
+            if name == '/ByteRange' and value is not None:
+                value = ' '.join(str(int(n)) for n in value)
+            sha256.update(f"{name}={'' if value is None else value};".encode('utf-8', 'surrogatepass'))
+        return sha256.digest()
+
+    @classmethod
+    def size(cls, attrdicts):
+        return sum(
+            cls.RECORD_OVERHEAD + len(attrdict.get('signature_bytes') or b'') for attrdict in attrdicts
+        )
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, attrdicts):
+        size = self.size(attrdicts)
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.bytes -= previous[1]
+            self._entries[key] = (attrdicts, size)
+            self.bytes += size
+            while len(self._entries) > self.maxsize or (self.bytes > self.max_bytes and len(self._entries) > 1):
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self.bytes -= evicted
+                self.evictions += 1
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'evictions': self.evictions,
+                'entries': len(self._entries),
+                'max_entries': self.maxsize,
+                'bytes': self.bytes,
+                'max_bytes': self.max_bytes,
+            }
+
+
+signature_cache = SignatureCache()
+
+
+class SignatureExtract:
+    def __init__(self, fast_path=True, cache=None) -> None:
+        self.fast_path = fast_path
+        self.cache = signature_cache if cache is None else cache or None
+        self.cache_hits = 0
+        self.cache_misses = 0
+        
+    def parse_pkcs7_signatures(self, signature_data: bytes):
+        content_info = cms.ContentInfo.load(signature_data)
+        if content_info['content_type'].native != 'signed_data':
+            return None
+        content = content_info['content']
+        # A timestamp token (RFC 3161) signs a TSTInfo; the document digest
+        # is its message imprint, not the signed message digest.
+        encap_content_info = content['encap_content_info']
+        imprint_algorithm = message_imprint = None
+        if encap_content_info['content_type'].native == 'tst_info':
+            imprint = encap_content_info['content'].parsed['message_imprint']
+            imprint_algorithm = imprint['hash_algorithm']['algorithm'].native
+            message_imprint = imprint['hashed_message'].native
+        # Index the embedded certificates by (issuer, serial); only the
+        # signer's certificate is ever fully decoded.
+        certificates = {}
+        for choice in content['certificates']:
+            if choice.name == 'certificate':
+                entry = certificate_cache.get(choice.chosen)
+                certificates.setdefault(entry.key, (entry, choice.chosen))
+        for signer_info in content['signer_infos']:
+            sid = signer_info['sid']
+            match = certificates.get(_signer_key(sid))
+            if match is None and sid.name == 'subject_key_identifier':
+                match = next((
+                    m for m in certificates.values() if m[1].key_identifier == sid.chosen.native), None)
+            if match is None:
+                raise RuntimeError(
+                    f"Couldn't find certificate in certificates collection: {sid.native}")
+            entry, certificate = match
+            signed_attrs = {
+                sa['type'].native: sa['values'][0].native for sa in signer_info['signed_attrs']}
+            yield dict(
+                sid=sid.native,
+                certificate=Certificate(entry.tbs_certificate(certificate)),
+                digest_algorithm=signer_info['digest_algorithm']['algorithm'].native,
+                signature_algorithm=signer_info['signature_algorithm']['algorithm'].native,
+                signature_bytes=signer_info['signature'].native,
+                imprint_algorithm=imprint_algorithm,
+                message_imprint=message_imprint,
+                **signed_attrs,
+            )
+
+
+    def locate_signatures(self, filename):
+        """Signature dictionaries via the memory-mapped locator."""
+        with SignatureLocator(filename) as locator:
+            return [
+                {key: value if key == '/Contents' else _text(value) for key, value in v.items()}
+                for v in locator.signature_values()
+            ]
+
+    def read_signature_fields(self, filename):
+        """Signature dictionaries via a full pypdf form walk."""
+        reader = PdfReader(filename)
+        fields = (reader.get_fields() or {}).values()
+        return [f.value for f in fields if f.field_type == '/Sig']
+
+    def get_signature_values(self, filename):
+        if self.fast_path:
+            try:
+                return self.locate_signatures(filename)
+            except Exception:
+                # Malformed or unusual file: let pypdf deal with it.
+                if isinstance(filename, io.BytesIO):
+                    filename.seek(0)
+        return self.read_signature_fields(filename)
+
+    def get_pdf_signatures(self, filename, verify=False):
+        """Parse PDF signatures
+
+        With `verify`, every signature also gets a `verification`
+        (SignatureVerification) comparing its /ByteRange with the signed digest.
+        """
+        if verify:
+            signatures = list(self.get_pdf_signatures(filename))
+            self.verify_signatures(filename, signatures)
+            yield from signatures
+            return
+        for attrdict in self._signature_attrdicts(filename, keep_raw=True):
+            yield Signature(dict(attrdict))
+
+    def _signature_attrdicts(self, filename, keep_raw=False):
+        """Parsed attribute dicts of every signature, through the cache.
+
+        The dicts may be shared with the cache and must not be modified.
+        With `keep_raw` they are copies that also carry the CMS blob as
+        `raw`, taken from /Contents; the cache never holds it.
+        """
+        for v in self.get_signature_values(filename):
+            v_type = v['/Type']
+            if v_type in ('/Sig', '/DocTimeStamp'):  # unknow types are skipped
+                if self.cache is None:
+                    attrdicts = self.parse_signature_value(v)
+                else:
+                    key = SignatureCache.key(v)
+                    attrdicts = self.cache.get(key)
+                    if attrdicts is None:
+                        self.cache_misses += 1
+                        attrdicts = self.parse_signature_value(v)
+                        self.cache.put(key, attrdicts)
+                    else:
+                        self.cache_hits += 1
+                if keep_raw:
+                    attrdicts = [{**attrdict, 'raw': v['/Contents']} for attrdict in attrdicts]
+                yield from attrdicts
+
+    def get_signature_details(self, filename, verify=False, keep_raw=False):
+        """SignatureDetails of every signature, without Signature wrappers.
+
+        `keep_raw` keeps the CMS blob (base64 in the JSON); it is dropped
+        otherwise so the results stay small.
+        """
+        if verify:
+            return [SignatureDetails.from_attrdict(signature._data, keep_raw)
+                    for signature in self.get_pdf_signatures(filename, verify=True)]
+        return [SignatureDetails.from_attrdict(attrdict, keep_raw)
+                for attrdict in self._signature_attrdicts(filename, keep_raw)]
+
+    def parse_signature_value(self, v):
+        """Attribute dicts of the signatures in one /Sig or /DocTimeStamp value."""
+        is_timestamp = v['/Type'] == '/DocTimeStamp'
+        try:
+            signing_time = parse(v['/M'][2:].strip("'").replace("'", ":"))
+        except KeyError:
+            signing_time = None
+        # - used standard for signature encoding, in my case:
+        # - get PKCS7/CMS/CADES signature package encoded in ASN.1 / DER format
+        raw_signature_data = v['/Contents']
+        # if is_timestamp:
+        attrdicts = []
+        for attrdict in self.parse_pkcs7_signatures(raw_signature_data):
+            if attrdict:
+                attrdict.update(dict(
+                    type='timestamp' if is_timestamp else 'signature',
+                    signer_name=v.get('/Name'),
+                    signer_contact_info=v.get('/ContactInfo'),
+                    signer_location=v.get('/Location'),
+                    signing_time=signing_time or attrdict.get('signing_time'),
+                    signature_type=v['/SubFilter'][1:],  # ETSI.CAdES.detached, ...
+                    signature_handler=v['/Filter'][1:],
+                    byte_range=[int(n) for n in v.get('/ByteRange') or []],
+                ))
+                attrdicts.append(attrdict)
+        return attrdicts
+
+    def verify_signatures(self, filename, signatures):
+        """Check the document bytes still match each signature's digest.
+
+        The /ByteRange spans are hashed straight from the memory-mapped file,
+        one thread per signature (hashlib releases the GIL while hashing).
+        """
+        with _mapped(filename) as data:
+            workers = min(len(signatures), os.cpu_count() or 1) or 1
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                results = list(pool.map(lambda sig: _verify_byte_range(data, sig), signatures))
+        for signature, result in zip(signatures, results):
+            signature._data['verification'] = result
+        return results
+    
+    
+    
+def extract_signatures_json(filename, verify=False):
+    """(count, JSON array) of the signatures in a file, for the process pool.
+
+    Sending the finished JSON back is cheaper than pickling dicts only to
+    serialize them again in the parent.
+    """
+    details = SignatureExtract().get_signature_details(filename, verify=verify)
+    return len(details), dumps_signatures(details)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2:
+        print(f"Usage: {sys.argv[0]} <filename>")
+        sys.exit(1)
+    filename = sys.argv[1]
+    signatureExtract = SignatureExtract()
+    for signature in signatureExtract.get_pdf_signatures(filename):
+        print(f"--- {signature.type} ---")
+        print(f"Signature: {signature}")
+        print(f"Signer: {signature.signer_name}")
+        print(f"Signing time: {signature.signing_time}")
+        certificate = signature.certificate
+        print(f"Signer's certificate: {certificate}")
+        print(f"  - not before: {certificate.validity.not_before}")
+        print(f"  - not after: {certificate.validity.not_after}")
+        print(f"  - issuer: {certificate.issuer}")
+        subject = signature.certificate.subject
+        print(f"  - subject: {subject}")
+        print(f"    - common name: {subject.common_name}")
         print(f"    - serial number: {subject.serial_number}")
\ No newline at end of file
@@ -0,0 +1,231 @@
+import os
+import struct
+import zipfile
+
+CFB_MAGIC = b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1"
+ENDOFCHAIN = 0xFFFFFFFE
+
+# Real document format -> converter kind; None means no conversion needed.
+FORMATS = {
+    'pdf': None,
+    'doc': 'word',
+    'docx': 'word',
+    'docm': 'word',
+    'rtf': 'word',
+    'xls': 'excel',
+    'xlsx': 'excel',
+    'xlsm': 'excel',
+}
+# OOXML packages expanding to more than this in total are treated as a zip
+# bomb, not a document. Compression ratios alone say little: repetitive
+# sheet XML routinely deflates by a factor of several hundred.
+MAX_UNCOMPRESSED_BYTES = 1024 * 1024 * 1024
+
+
+class Preflight:
+    """What the bytes of an upload say it is.
+
+    Attributes:
+        format (str, None): real format, a key of FORMATS, when recognised
+        encrypted (bool): password protected
+        error (str, None): why the file cannot be converted
+    """
+    def __init__(self, format=None, encrypted=False, error=None):
+        self.format = format
+        self.encrypted = encrypted
+        self.error = error
+
+    @property
+    def kind(self):
+        return FORMATS.get(self.format)
+
+    def check(self):
+        """Raise ValueError when the file should not reach a converter."""
+        if self.encrypted:
+            raise ValueError("The file is password protected and cannot be opened.")
+        if self.error:
+            raise ValueError(self.error)
+        return self
+
+    def to_dict(self):
+        return {"format": self.format, "encrypted": self.encrypted, "error": self.error}
+
+
+def classify(path):
+    """Sniff `path` without Office: PDF, OLE/CFB (doc, xls), OOXML zip or RTF."""
+    try:
+        with open(path, 'rb') as f:
+            head = f.read(1024)
+            if head.startswith(CFB_MAGIC):
+                return _classify_cfb(f)
+    except OSError as e:
+        return Preflight(error=f"Cannot read the file: {e.strerror}")
+    if not head:
+        return Preflight(error="The file is empty")
+    # Signatures at offset 0 first: a document may well contain the text
+    # "%PDF-" in its first kilobyte (a zip member name, say).
+    if head.startswith(b"PK\x03\x04"):
+        return _classify_zip(path)
+    if head.startswith(b"{\\rtf"):
+        return Preflight('rtf')
+    # Readers accept a PDF header anywhere in the first 1024 bytes.
+    if b"%PDF-" in head:
+        return Preflight('pdf')
+    return Preflight(error="Unsupported file type")
+
+
+def _classify_zip(path):
+    try:
+        with zipfile.ZipFile(path) as archive:
+            members = {info.filename: info for info in archive.infolist()}
+            if sum(info.file_size for info in members.values()) > MAX_UNCOMPRESSED_BYTES:
+                return Preflight(error="The file is corrupt: it expands to more than "
+                                       f"{MAX_UNCOMPRESSED_BYTES // (1024 * 1024)} MB")
+            if '[Content_Types].xml' not in members:
+                return Preflight(error="Unsupported file type: zip archive without Office content")
+            content_types = archive.read('[Content_Types].xml')
+    except (zipfile.BadZipFile, zipfile.LargeZipFile, OSError, EOFError) as e:
+        return Preflight(error=f"The file is corrupt: {e}")
+    macros = b"macroEnabled" in content_types
+    if 'word/document.xml' in members:
+        return Preflight('docm' if macros else 'docx')
+    if 'xl/workbook.xml' in members:
+        return Preflight('xlsm' if macros else 'xlsx')
+    return Preflight(error="Unsupported file type: only Word and Excel documents can be converted")
+
+
+def _classify_cfb(f):
+    try:
+        reader = _CompoundFile(f)
+        streams = reader.root_streams()
+        if 'EncryptionInfo' in streams and 'EncryptedPackage' in streams:
+            # Password-protected .docx/.xlsx are wrapped in a CFB container.
+            return Preflight(encrypted=True)
+        if 'WordDocument' in streams:
+            fib = reader.read_stream(streams['WordDocument'], 12)
+            if len(fib) < 12:
+                return Preflight('doc', error="The file is corrupt: truncated Word header")
+            flags = struct.unpack_from('<H', fib, 0x0A)[0]
+            # fEncrypted (0x0100) and fObfuscated (0x8000) both need a password.
+            return Preflight('doc', encrypted=bool(flags & 0x8100))
+        for name in ('Workbook', 'Book'):
+            if name in streams:
+                return Preflight('xls', encrypted=_biff_has_filepass(reader.read_stream(streams[name], 8192)))
+    except (ValueError, struct.error) as e:
+        return Preflight(error=f"The file is corrupt: {e}")
+    return Preflight(error="Unsupported file type: only Word and Excel documents can be converted")
+
+
+def _biff_has_filepass(data):
+    # FILEPASS (0x002F) follows the workbook globals BOF when encrypted.
+    pos = 0
+    while pos + 4 <= len(data):
+        record, length = struct.unpack_from('<HH', data, pos)
+        if record == 0x002F:
+            return True
+        if record == 0x000A:  # EOF of the globals substream
+            return False
+        pos += 4 + length
+    return False
+
+
+class _CompoundFile:
+    """Just enough of the OLE compound file format to read stream heads."""
+    def __init__(self, f):
+        self.f = f
+        f.seek(0, os.SEEK_END)
+        self.size = f.tell()
+        header = self._read_at(0, 512)
+        if len(header) < 512:
+            raise ValueError("truncated compound file header")
+        self.sector_size = 1 << struct.unpack_from('<H', header, 0x1E)[0]
+        self.mini_sector_size = 1 << struct.unpack_from('<H', header, 0x20)[0]
+        if self.sector_size not in (512, 4096) or self.mini_sector_size != 64:
+            raise ValueError("bad compound file sector size")
+        fat_sectors, self.first_directory = struct.unpack_from('<II', header, 0x2C)
+        self.mini_cutoff, self.first_mini_fat = struct.unpack_from('<II', header, 0x38)
+        first_difat, difat_count = struct.unpack_from('<II', header, 0x44)
+        self.max_sectors = self.size // self.sector_size + 1
+
+        difat = list(struct.unpack_from('<109I', header, 0x4C))
+        sector = first_difat
+        for _ in range(min(difat_count, self.max_sectors)):
+            if sector >= ENDOFCHAIN:
+                break
+            entries = struct.unpack(f'<{self.sector_size // 4}I', self._sector(sector))
+            difat.extend(entries[:-1])
+            sector = entries[-1]
+        self.fat = []
+        for sector in difat[:fat_sectors]:
+            self.fat.extend(struct.unpack(f'<{self.sector_size // 4}I', self._sector(sector)))
+        self._mini_fat = None
+        self._root = None
+
+    def _read_at(self, offset, length):
+        self.f.seek(offset)
+        return self.f.read(length)
+
+    def _sector(self, sector):
+        data = self._read_at((sector + 1) * self.sector_size, self.sector_size)
+        if len(data) < self.sector_size:
+            raise ValueError(f"sector {sector} is past the end of the file")
+        return data
+
+    def _chain(self, start, table, limit):
+        sector = start
+        for _ in range(limit):
+            if sector >= ENDOFCHAIN:
+                return
+            if sector >= len(table):
+                raise ValueError(f"broken sector chain at {sector}")
+            yield sector
+            sector = table[sector]
+        if sector < ENDOFCHAIN:
+            raise ValueError("sector chain does not end")
+
+    def root_streams(self):
+        """{name: (start sector, size)} of the streams in the root storage."""
+        directory = b"".join(self._sector(s) for s in self._chain(self.first_directory, self.fat, self.max_sectors))
+        streams = {}
+        for offset in range(0, len(directory) - 127, 128):
+            entry = directory[offset:offset + 128]
+            name_length = struct.unpack_from('<H', entry, 0x40)[0]
+            kind = entry[0x42]
+            start = struct.unpack_from('<I', entry, 0x74)[0]
+            size = struct.unpack_from('<Q', entry, 0x78)[0] & 0xFFFFFFFF
+            if kind == 5:
+                self._root = (start, size)
+            elif kind == 2 and 2 <= name_length <= 64:
+                streams[entry[:name_length - 2].decode('utf-16-le', 'replace')] = (start, size)
+        return streams
+
+    def read_stream(self, stream, length):
+        """First `length` bytes of a (start sector, size) stream."""
+        start, size = stream
+        length = min(length, size)
+        if size >= self.mini_cutoff:
+            data = bytearray()
+            for sector in self._chain(start, self.fat, self.max_sectors):
+                data += self._sector(sector)
+                if len(data) >= length:
+                    break
+            return bytes(data[:length])
+        # Small streams live in the mini stream, addressed in 64-byte units.
+        if self._root is None:
+            raise ValueError("missing root entry")
+        if self._mini_fat is None:
+            self._mini_fat = []
+            for sector in self._chain(self.first_mini_fat, self.fat, self.max_sectors):
+                self._mini_fat.extend(struct.unpack(f'<{self.sector_size // 4}I', self._sector(sector)))
+        root_sectors = list(self._chain(self._root[0], self.fat, self.max_sectors))
+        per_sector = self.sector_size // self.mini_sector_size
+        data = bytearray()
+        for mini in self._chain(start, self._mini_fat, self.max_sectors * per_sector):
+            index, offset = divmod(mini, per_sector)
+            if index >= len(root_sectors):
+                raise ValueError("mini sector is outside the mini stream")
+            position = (root_sectors[index] + 1) * self.sector_size + offset * self.mini_sector_size
+            data += self._read_at(position, self.mini_sector_size)
+            if len(data) >= length:
+                break
+        return bytes(data[:length])
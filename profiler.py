@@ -0,0 +1,319 @@
+"""On-demand request profiling.
+
+A request is profiled when it sends the access token in the X-Profile
+header (or a `profile` query value), or when sampling picks it. cProfile
+runs on the request thread and on the threads its work is handed to (see
+`follow`); requested profiles also record, with tracemalloc, where memory
+was allocated while the request ran. Work done in the process pool is not
+profiled.
+
+From Python 3.12 cProfile runs on sys.monitoring: only one profiler can
+be active in the process and it records every thread. One request is
+profiled at a time there, and its record carries a `note` saying that
+its functions include whatever else the process ran meanwhile.
+"""
+import contextvars
+import cProfile
+import hmac
+import marshal
+import pstats
+import random
+import sys
+import threading
+import time
+import tracemalloc
+import uuid
+from collections import OrderedDict
+
+current = contextvars.ContextVar('profile', default=None)
+
+PROCESS_WIDE = sys.version_info >= (3, 12)
+PROCESS_WIDE_NOTE = "Profiled process-wide (Python 3.12+): includes other requests running at the same time"
+BUSY_NOTE = "Another request was being profiled; no function profile was recorded"
+
+SORT_KEYS = {'cumulative': 'cumtime_ms', 'tottime': 'tottime_ms', 'calls': 'calls'}
+
+
+def follow(fn):
+    """`fn`, profiled into the current request's profile on whatever thread runs it.
+
+    Returns `fn` itself when the request is not being profiled.
+    """
+    record = current.get()
+    if record is None:
+        return fn
+
+    def profiled(*args, **kwargs):
+        if sys.getprofile() is not None:
+            # Already profiled on this thread; a second profiler would replace it.
+            return fn(*args, **kwargs)
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            # Python 3.12+ profiles every thread with one profiler at a time.
+            return fn(*args, **kwargs)
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            profile.disable()
+            record.add(profile)
+    return profiled
+
+
+class ProfileRecord:
+    """Profile of one request.
+
+    Attributes:
+        id (str): retrievable id, returned in the X-Profile-ID header
+        endpoint (str): URL rule of the request, such as /jobs/<job_id>
+        sampled (bool): picked by sampling rather than requested
+        duration_ms (float, None): request time, None while it runs
+        allocations (list[dict], None): top allocation sites, for requested
+            profiles only
+        note (str, None): caveat about what the profile covers
+    """
+    def __init__(self, endpoint, method, path, sampled):
+        self.id = uuid.uuid4().hex[:16]
+        self.endpoint = endpoint
+        self.method = method
+        self.path = path
+        self.sampled = sampled
+        self.started_at = time.time()
+        self.duration_ms = None
+        self.status = None
+        self.allocations = None
+        self.traced_peak_bytes = None
+        self.note = None
+        self._profiles = []
+        self._functions = None
+        self._lock = threading.Lock()
+
+    def add(self, profile):
+        # Followed work may finish after the request did (queued jobs).
+        with self._lock:
+            self._profiles.append(profile)
+            self._functions = None
+
+    def stats(self):
+        with self._lock:
+            profiles = list(self._profiles)
+        if not profiles:
+            return None
+        stats = pstats.Stats(profiles[0])
+        for profile in profiles[1:]:
+            stats.add(profile)
+        return stats
+
+    def functions(self):
+        """Every profiled function, as dicts with times in milliseconds."""
+        with self._lock:
+            if self._functions is not None:
+                return self._functions
+        stats = self.stats()
+        functions = [] if stats is None else [
+            {
+                'function': pstats.func_std_string(func),
+                'calls': calls,
+                'primitive_calls': primitive,
+                'tottime_ms': round(tottime * 1000, 3),
+                'cumtime_ms': round(cumtime * 1000, 3),
+            }
+            for func, (primitive, calls, tottime, cumtime, _) in stats.stats.items()
+        ]
+        with self._lock:
+            self._functions = functions
+        return functions
+
+    def dump(self):
+        """The merged stats in the .prof format read by pstats and snakeviz."""
+        stats = self.stats()
+        return marshal.dumps(stats.stats if stats else {})
+
+    def summary(self):
+        return {
+            'id': self.id,
+            'endpoint': self.endpoint,
+            'method': self.method,
+            'path': self.path,
+            'sampled': self.sampled,
+            'started_at': self.started_at,
+            'duration_ms': self.duration_ms,
+            'status': self.status,
+            'note': self.note,
+        }
+
+    def to_dict(self, top=30, sort='cumulative'):
+        key = SORT_KEYS.get(sort, 'cumtime_ms')
+        functions = sorted(self.functions(), key=lambda f: f[key], reverse=True)
+        return {
+            **self.summary(),
+            'functions': functions[:top],
+            'allocations': self.allocations,
+            'traced_peak_bytes': self.traced_peak_bytes,
+        }
+
+
+class _Session:
+    def __init__(self, record, profile, token, snapshot, exclusive=False):
+        self.record = record
+        self.profile = profile
+        self.token = token
+        self.snapshot = snapshot
+        self.exclusive = exclusive
+        self.start = time.perf_counter()
+
+
+class Profiler:
+    """Decides which requests to profile and keeps their records.
+
+    With no `token` and a zero `sample_rate` the profiler is disabled and
+    `start` returns at once. Sampled requests only get cProfile; tracemalloc
+    slows every allocation in the process, so it is reserved for requests
+    that ask for a profile. At most `max_active` sampled requests are
+    profiled at a time, and only one on Python 3.12+ (see PROCESS_WIDE).
+    """
+    def __init__(self, token=None, sample_rate=0.0, keep=200, window=3600, top=30, max_active=2,
+                 trace_frames=10):
+        self.token = token
+        self.sample_rate = sample_rate
+        self.keep = keep
+        self.window = window
+        self.top = top
+        self.max_active = max_active
+        self.trace_frames = trace_frames
+        self._records = OrderedDict()
+        self._active = 0
+        self._tracing = 0
+        self._exclusive = False
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self):
+        return bool(self.token) or self.sample_rate > 0
+
+    def authorized(self, value):
+        if not self.token or not value:
+            return False
+        return hmac.compare_digest(value.encode(), self.token.encode())
+
+    def start(self, endpoint, method, path, requested=False):
+        """Begin profiling the current request; None when it is not profiled."""
+        sampled = not requested and self.sample_rate > 0 and random.random() < self.sample_rate
+        if not requested and not sampled:
+            return None
+        with self._lock:
+            if sampled and (self._active >= self.max_active or self._exclusive):
+                return None
+            self._active += 1
+            # A requested profile still records its allocations when another
+            # request holds the process-wide profiler.
+            exclusive = PROCESS_WIDE and not self._exclusive
+            if exclusive:
+                self._exclusive = True
+        record = ProfileRecord(endpoint, method, path, sampled)
+        snapshot = self._start_tracing() if requested else None
+        profile = None
+        if exclusive or not PROCESS_WIDE:
+            profile = cProfile.Profile()
+            try:
+                profile.enable()
+            except ValueError:
+                # Held by followed work of an earlier request (Python 3.12+).
+                profile = None
+        if PROCESS_WIDE:
+            record.note = PROCESS_WIDE_NOTE if profile is not None else BUSY_NOTE
+        return _Session(record, profile, current.set(record), snapshot, exclusive)
+
+    def stop(self, session, status=None):
+        record = session.record
+        if session.profile is not None:
+            session.profile.disable()
+            record.add(session.profile)
+        record.duration_ms = round((time.perf_counter() - session.start) * 1000, 3)
+        if status is not None:
+            record.status = status
+        try:
+            current.reset(session.token)
+        except ValueError:
+            current.set(None)
+        if session.snapshot is not None:
+            self._stop_tracing(record, session.snapshot)
+        with self._lock:
+            self._active -= 1
+            if session.exclusive:
+                self._exclusive = False
+            self._records[record.id] = record
+            while len(self._records) > self.keep:
+                self._records.popitem(last=False)
+        return record
+
+    def _start_tracing(self):
+        with self._lock:
+            if self._tracing == 0 and not tracemalloc.is_tracing():
+                tracemalloc.start(self.trace_frames)
+            self._tracing += 1
+        return tracemalloc.take_snapshot()
+
+    def _stop_tracing(self, record, before):
+        after = tracemalloc.take_snapshot()
+        record.traced_peak_bytes = tracemalloc.get_traced_memory()[1]
+        ignore = [tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, __file__)]
+        differences = after.filter_traces(ignore).compare_to(before.filter_traces(ignore), 'lineno')
+        record.allocations = [
+            {
+                'location': str(difference.traceback[0]),
+                'size_diff': difference.size_diff,
+                'count_diff': difference.count_diff,
+                'size': difference.size,
+            }
+            for difference in differences[:self.top] if difference.size_diff > 0
+        ]
+        with self._lock:
+            self._tracing -= 1
+            if self._tracing == 0:
+                tracemalloc.stop()
+
+    def get(self, profile_id):
+        with self._lock:
+            return self._records.get(profile_id)
+
+    def recent(self, endpoint=None, limit=50):
+        with self._lock:
+            records = list(reversed(self._records.values()))
+        return [record.summary() for record in records
+                if endpoint is None or record.endpoint == endpoint][:limit]
+
+    def hot(self, endpoint=None, window=None, limit=20):
+        """Functions with the most own time, summed per endpoint over `window` seconds."""
+        since = time.time() - (window or self.window)
+        with self._lock:
+            records = [record for record in self._records.values()
+                       if record.started_at >= since and (endpoint is None or record.endpoint == endpoint)]
+        endpoints = {}
+        for record in records:
+            entry = endpoints.setdefault(record.endpoint, {'profiles': 0, 'functions': {}})
+            entry['profiles'] += 1
+            for function in record.functions():
+                total = entry['functions'].setdefault(
+                    function['function'], {'function': function['function'], 'calls': 0,
+                                           'tottime_ms': 0.0, 'cumtime_ms': 0.0, 'profiles': 0})
+                total['calls'] += function['calls']
+                total['tottime_ms'] += function['tottime_ms']
+                total['cumtime_ms'] += function['cumtime_ms']
+                total['profiles'] += 1
+        return {
+            name: {
+                'profiles': entry['profiles'],
+                'functions': [
+                    {**function, 'tottime_ms': round(function['tottime_ms'], 3),
+                     'cumtime_ms': round(function['cumtime_ms'], 3)}
+                    for function in sorted(entry['functions'].values(),
+                                           key=lambda f: f['tottime_ms'], reverse=True)[:limit]
+                ],
+            }
+            for name, entry in endpoints.items()
+        }
+
+
+profiler = Profiler()
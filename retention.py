@@ -0,0 +1,168 @@
+import os
+import shutil
+import sqlite3
+import threading
+import time
+from collections import Counter
+
+
+class RetentionIndex:
+    """Expiry index of the files in uploads/ and output/.
+
+    Every file is recorded with its expiry time when it is created, so
+    `sweep` only pops the rows that are due instead of listing the folders.
+    Once the tracked files exceed `quota_bytes`, or the disk is fuller than
+    `high_water`, the oldest files are evicted until the disk is back under
+    `low_water` (and the tracked files under the same share of the quota).
+    Files leased by an in-flight request or download are never deleted.
+    """
+    def __init__(self, db_path, folders, ttl=24 * 3600, quota_bytes=None,
+                 high_water=0.90, low_water=0.80, on_delete=None, log=print):
+        self.folders = [os.path.abspath(folder) for folder in folders]
+        self.ttl = ttl
+        self.quota_bytes = quota_bytes
+        self.high_water = high_water
+        self.low_water = low_water
+        self.on_delete = on_delete
+        self.log = log
+        self._lock = threading.Lock()
+        self._leases = Counter()
+        self._db = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS files (
+                path TEXT PRIMARY KEY,
+                size INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                expires_at REAL NOT NULL
+            )""")
+        self._db.execute("CREATE INDEX IF NOT EXISTS files_expires_at ON files (expires_at)")
+        self._db.execute("CREATE INDEX IF NOT EXISTS files_created_at ON files (created_at)")
+
+    def track(self, path, ttl=None):
+        """Record (or refresh) a file; its expiry restarts from now."""
+        path = os.path.abspath(path)
+        try:
+            size = os.path.getsize(path)
+        except OSError:
+            return
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "INSERT INTO files (path, size, created_at, expires_at) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(path) DO UPDATE SET size = excluded.size, expires_at = excluded.expires_at",
+                (path, size, now, now + (self.ttl if ttl is None else ttl)))
+
+    def lease(self, *paths):
+        with self._lock:
+            for path in paths:
+                self._leases[os.path.abspath(path)] += 1
+
+    def release(self, *paths):
+        with self._lock:
+            for path in paths:
+                path = os.path.abspath(path)
+                self._leases[path] -= 1
+                if self._leases[path] <= 0:
+                    del self._leases[path]
+
+    def leased(self, path):
+        # No lock: the conversion cache calls this with its own lock held,
+        # while _delete holds ours and calls back into the cache.
+        return os.path.abspath(path) in self._leases
+
+    def _delete(self, path):
+        # Called with the lock held.
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            self.log(f"Error deleting file {path}: {e}")
+            return False
+        self._db.execute("DELETE FROM files WHERE path = ?", (path,))
+        if self.on_delete:
+            self.on_delete(path)
+        return True
+
+    def sweep(self, batch=500):
+        """Delete expired files, then evict if over quota. Returns the count."""
+        now = time.time()
+        deleted = 0
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT path FROM files WHERE expires_at <= ? ORDER BY expires_at LIMIT ?", (now, batch)).fetchall()
+            for (path,) in rows:
+                if path in self._leases:
+                    continue
+                if self._delete(path):
+                    deleted += 1
+        if deleted:
+            self.log(f"Deleted {deleted} expired files")
+        return deleted + self.evict()
+
+    def _over_limit(self, high):
+        # Evict once above the high-water mark and stop again under the low one.
+        if self.quota_bytes is not None:
+            (tracked,) = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM files").fetchone()
+            limit = self.quota_bytes if high else self.quota_bytes * self.low_water / self.high_water
+            if tracked > limit:
+                return True
+        usage = shutil.disk_usage(self.folders[0])
+        return usage.used / usage.total > (self.high_water if high else self.low_water)
+
+    def evict(self, batch=100):
+        """Delete the oldest unleased files while usage is above the high-water mark."""
+        evicted = 0
+        with self._lock:
+            if not self._over_limit(high=True):
+                return 0
+            while self._over_limit(high=False):
+                rows = self._db.execute(
+                    "SELECT path FROM files ORDER BY created_at LIMIT ?", (batch + len(self._leases),)).fetchall()
+                candidates = [path for (path,) in rows if path not in self._leases][:batch]
+                deleted = sum(1 for path in candidates if self._delete(path))
+                if not deleted:
+                    break
+                evicted += deleted
+        if evicted:
+            self.log(f"Disk usage above high-water mark, evicted {evicted} oldest files")
+        return evicted
+
+    def reconcile(self):
+        """Index files that were written without being tracked (crash, old
+        version) and drop rows whose file is gone."""
+        with self._lock:
+            known = {path for (path,) in self._db.execute("SELECT path FROM files")}
+        found = set()
+        for folder in self.folders:
+            for entry in os.scandir(folder):
+                if not entry.is_file():
+                    continue
+                path = os.path.abspath(entry.path)
+                found.add(path)
+                if path not in known:
+                    stat = entry.stat()
+                    with self._lock:
+                        self._db.execute(
+                            "INSERT OR IGNORE INTO files (path, size, created_at, expires_at) VALUES (?, ?, ?, ?)",
+                            (path, stat.st_size, stat.st_mtime, stat.st_mtime + self.ttl))
+        with self._lock:
+            for path in known - found:
+                self._db.execute("DELETE FROM files WHERE path = ?", (path,))
+
+    def usage(self):
+        """{folder: (files, bytes)} of the tracked files in each folder."""
+        usage = {}
+        with self._lock:
+            for folder in self.folders:
+                prefix = folder.rstrip(os.sep) + os.sep
+                usage[folder] = self._db.execute(
+                    "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM files WHERE substr(path, 1, ?) = ?",
+                    (len(prefix), prefix)).fetchone()
+        return usage
+
+    def stats(self):
+        with self._lock:
+            count, size = self._db.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM files").fetchone()
+            return {'files': count, 'bytes': size, 'leased': len(self._leases)}
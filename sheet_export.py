@@ -0,0 +1,144 @@
+import os
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import fitz
+
+
+class SheetExportError(Exception):
+    """Raised when some selected sheets could not be exported.
+
+    No PDF is written, so a partial workbook is never served or cached;
+    `report` holds the per-sheet entries, failed ones with an "error".
+    """
+    def __init__(self, message, report):
+        super().__init__(message)
+        self.report = report
+
+
+class SheetOptions:
+    """Per-request settings for exporting a workbook sheet by sheet.
+
+    Attributes:
+        sheets (str, None): selection such as "1-3,Summary" (1-based indexes
+            and ranges of visible sheets, or sheet names); all sheets when
+            None
+        parallel (int, None): converter instances to spread the sheets over;
+            every Excel instance of the pool when None
+    """
+    def __init__(self, sheets=None, parallel=None):
+        self.sheets = sheets
+        self.parallel = parallel
+
+    @classmethod
+    def from_form(cls, form):
+        """Options from request form/query values, or None when not requested."""
+        sheets = form.get('sheets') or None
+        if form.get('split_sheets', 'false').lower() != 'true' and not sheets:
+            return None
+        try:
+            parallel = int(form['parallel_sheets']) if form.get('parallel_sheets') else None
+        except ValueError as e:
+            raise ValueError(f"Invalid parallel_sheets: {e}") from e
+        if parallel is not None and parallel < 1:
+            raise ValueError("parallel_sheets must be at least 1")
+        return cls(sheets, parallel)
+
+    def to_dict(self):
+        return {"sheets": self.sheets}
+
+
+def select_sheets(names, selection):
+    """Sheet names picked by `selection`, in workbook order without repeats."""
+    if not selection:
+        return list(names)
+    picked = set()
+    for part in selection.split(','):
+        part = part.strip()
+        if part in names:
+            picked.add(part)
+            continue
+        first, _, last = part.partition('-')
+        try:
+            first, last = int(first), int(last or first)
+        except ValueError:
+            raise ValueError(f"Unknown sheet: {part}") from None
+        if not 1 <= first <= last <= len(names):
+            raise ValueError(f"Sheet indexes must be between 1 and {len(names)}")
+        picked.update(names[first - 1:last])
+    return [name for name in names if name in picked]
+
+
+def _chunks(items, count):
+    """Split `items` into `count` contiguous runs of near-equal length."""
+    size, extra = divmod(len(items), count)
+    start = 0
+    for index in range(count):
+        end = start + size + (1 if index < extra else 0)
+        yield items[start:end]
+        start = end
+
+
+def export_workbook(pool, file_path, output_path, options, timeout=None):
+    """Export the selected sheets on several Excel instances and stitch them.
+
+    Sheets are split into contiguous runs, one per instance; each instance
+    exports its sheets to separate PDFs, which are then joined in workbook
+    order with a bookmark per sheet. Returns the per-sheet report, or raises
+    SheetExportError when any sheet failed.
+    """
+    start = time.perf_counter()
+    names = pool.run('excel', lambda backend: backend.sheet_names(file_path), file_path, timeout,
+                     f"Reading the sheets of {os.path.basename(file_path)}")
+    sheets = select_sheets(names, options.sheets)
+    if not sheets:
+        raise ValueError("The workbook has no visible sheet to export")
+    parallel = max(1, min(options.parallel or pool.size, pool.size, len(sheets)))
+
+    base = f"{output_path}.{uuid.uuid4().hex[:8]}"
+    targets = [(name, f"{base}.sheet{index}.pdf") for index, name in enumerate(sheets)]
+    runs = list(_chunks(targets, parallel))
+    try:
+        with ThreadPoolExecutor(max_workers=parallel) as executor:
+            futures = [
+                executor.submit(pool.run, 'excel',
+                                lambda backend, run=run: backend.export_sheets(file_path, run),
+                                file_path, timeout)
+                for run in runs
+            ]
+            results = [result for future in futures for result in future.result()]
+
+        report = []
+        toc = []
+        stitched = fitz.open()
+        try:
+            for (name, path), (seconds, error) in zip(targets, results):
+                entry = {"sheet": name, "duration_ms": round(seconds * 1000, 1), "pages": 0}
+                if error or not os.path.exists(path):
+                    entry["error"] = error or "No output"
+                else:
+                    with fitz.open(path) as doc:
+                        toc.append([1, name, stitched.page_count + 1])
+                        stitched.insert_pdf(doc)
+                        entry["pages"] = doc.page_count
+                report.append(entry)
+            failed = [entry["sheet"] for entry in report if "error" in entry]
+            if failed:
+                message = ("None of the selected sheets could be exported" if len(failed) == len(report)
+                           else f"{len(failed)} of {len(report)} sheets could not be exported")
+                raise SheetExportError(f"{message}: {', '.join(failed)}",
+                                       {"parallel": parallel, "sheets": report})
+            stitched.set_toc(toc)
+            stitched.save(output_path, garbage=1, deflate=True)
+        finally:
+            stitched.close()
+    finally:
+        for _, path in targets:
+            if os.path.exists(path):
+                os.remove(path)
+    return {
+        "parallel": parallel,
+        "sheets": report,
+        "duration_ms": round((time.perf_counter() - start) * 1000, 1),
+    }
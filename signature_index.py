@@ -0,0 +1,328 @@
+"""Persistent index of the signatures in an archive of PDFs.
+
+    python signature_index.py index <folder> [--db signatures.sqlite3] [--workers 8]
+    python signature_index.py query [--expiring-before 2026-12-31] [--issuer "CA X"] ...
+
+Every signature is stored as one row keyed by the SHA-256 of its file, so
+renamed or duplicated files are parsed once. Files whose size and mtime
+did not change since the last run are skipped without being read.
+"""
+import argparse
+import fnmatch
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+
+from pdf_signature_extract import SignatureExtract
+
+COLUMNS = (
+    'type', 'signer_common_name', 'signer_organization', 'signer_country',
+    'issuer_common_name', 'issuer_organization', 'issuer_country', 'serial',
+    'valid_from', 'valid_to', 'signing_time', 'digest_algorithm',
+    'signature_algorithm', 'signature_type',
+)
+
+
+def _timestamp(value):
+    """UTC 'YYYY-MM-DDTHH:MM:SS' so that stored times compare as strings."""
+    if not isinstance(value, datetime):
+        return None
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value.isoformat(timespec='seconds')
+
+
+def signature_rows(signatures):
+    """Index rows (tuples in COLUMNS order) for parsed signatures."""
+    rows = []
+    for signature in signatures:
+        certificate = signature.certificate
+        subject, issuer = certificate.subject, certificate.issuer
+        rows.append((
+            signature.type,
+            subject.common_name,
+            subject.organization_name,
+            subject.country_name,
+            issuer.common_name,
+            issuer.organization_name,
+            issuer.country_name,
+            # Serial numbers exceed SQLite integers; store them as hex.
+            format(certificate.serial_number, 'x') if certificate.serial_number is not None else None,
+            _timestamp(certificate.validity.not_before),
+            _timestamp(certificate.validity.not_after),
+            _timestamp(signature.signing_time),
+            signature.digest_algorithm,
+            signature.signature_algorithm,
+            signature.signature_type,
+        ))
+    return rows
+
+
+def file_digest(path):
+    """SHA-256 of one file, or None when it cannot be read; runs in a worker process."""
+    digest = hashlib.sha256()
+    try:
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(chunk)
+    except OSError:
+        return None
+    return digest.hexdigest()
+
+
+def index_file(path):
+    """Signature rows of one file and the parse error; runs in a worker process."""
+    try:
+        return signature_rows(SignatureExtract().get_pdf_signatures(path)), None
+    except Exception as e:
+        return [], f"{e.__class__.__name__}: {e}"
+
+
+class SignatureIndex:
+    def __init__(self, db_path):
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(f"""
+            CREATE TABLE IF NOT EXISTS files (
+                path TEXT PRIMARY KEY,
+                size INTEGER NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                digest TEXT NOT NULL,
+                indexed_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS files_digest ON files (digest);
+            CREATE TABLE IF NOT EXISTS documents (
+                digest TEXT PRIMARY KEY,
+                signature_count INTEGER NOT NULL,
+                error TEXT
+            );
+            CREATE TABLE IF NOT EXISTS signatures (
+                digest TEXT NOT NULL,
+                position INTEGER NOT NULL,
+                {', '.join(f'{column} TEXT' for column in COLUMNS)},
+                PRIMARY KEY (digest, position)
+            );
+            CREATE INDEX IF NOT EXISTS signatures_valid_to ON signatures (valid_to);
+            CREATE INDEX IF NOT EXISTS signatures_issuer_cn ON signatures (issuer_common_name COLLATE NOCASE);
+            CREATE INDEX IF NOT EXISTS signatures_issuer_org ON signatures (issuer_organization COLLATE NOCASE);
+            CREATE INDEX IF NOT EXISTS signatures_signer_cn ON signatures (signer_common_name COLLATE NOCASE);
+            CREATE INDEX IF NOT EXISTS signatures_serial ON signatures (serial);
+            CREATE INDEX IF NOT EXISTS signatures_signing_time ON signatures (signing_time);
+        """)
+
+    def _changed(self, paths):
+        """The paths whose size or mtime differ from the indexed ones."""
+        changed = []
+        with self._lock:
+            known = dict(((path, (size, mtime)) for path, size, mtime in
+                          self._db.execute("SELECT path, size, mtime_ns FROM files")))
+        for path in paths:
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            if known.get(path) != (stat.st_size, stat.st_mtime_ns):
+                changed.append((path, stat.st_size, stat.st_mtime_ns))
+        return changed
+
+    def index(self, root, executor=None, workers=None, pattern='*.pdf', log=print):
+        """Bring the index up to date with the PDFs under `root`.
+
+        Changed files are hashed on `executor` (or a new process pool of
+        `workers`); only digests that are not indexed yet are parsed, and
+        other files with the same content reuse their rows. Rows of files
+        that disappeared from `root` are dropped. Returns counts of what was
+        scanned, parsed, reused and removed.
+        """
+        start = time.perf_counter()
+        root = os.path.abspath(root)
+        paths = []
+        for folder, _, names in os.walk(root):
+            paths.extend(os.path.join(folder, name) for name in names if fnmatch.fnmatch(name.lower(), pattern))
+        changed = self._changed(paths)
+
+        own_executor = executor is None
+        if own_executor:
+            executor = ProcessPoolExecutor(max_workers=workers)
+        parsed = failed = reused = 0
+        try:
+            # Submit in slices so a huge archive does not queue every file at once.
+            for offset in range(0, len(changed), 256):
+                batch = changed[offset:offset + 256]
+                digests = list(executor.map(file_digest, [path for path, _, _ in batch]))
+                known = self._known(set(digests))
+                # One path per new digest, so copies in the same batch are parsed once.
+                new = {}
+                for (path, _, _), digest in zip(batch, digests):
+                    if digest is not None and digest not in known:
+                        new.setdefault(digest, path)
+                results = dict(zip(new, executor.map(index_file, list(new.values()))))
+                for (path, size, mtime_ns), digest in zip(batch, digests):
+                    if digest is None:
+                        continue
+                    if digest in results:
+                        rows, error = results.pop(digest)
+                        self._store(path, size, mtime_ns, digest, rows, error)
+                        parsed += 1
+                        failed += error is not None
+                    else:
+                        self._link(path, size, mtime_ns, digest)
+                        reused += 1
+        finally:
+            if own_executor:
+                executor.shutdown()
+
+        removed = self._remove_missing(root, set(paths))
+        report = {
+            'scanned': len(paths),
+            'parsed': parsed,
+            'failed': failed,
+            'reused': reused,
+            'removed': removed,
+            'duration_ms': round((time.perf_counter() - start) * 1000, 1),
+        }
+        log(f"Signature index of {root}: {json.dumps(report)}")
+        return report
+
+    def _known(self, digests):
+        """The given digests that already have indexed rows."""
+        digests = [digest for digest in digests if digest is not None]
+        known = set()
+        with self._lock:
+            for offset in range(0, len(digests), 500):
+                chunk = digests[offset:offset + 500]
+                known.update(digest for (digest,) in self._db.execute(
+                    f"SELECT digest FROM documents WHERE digest IN ({', '.join('?' for _ in chunk)})", chunk))
+        return known
+
+    def _link(self, path, size, mtime_ns, digest):
+        # Point a renamed, copied or touched file at rows already indexed.
+        with self._lock:
+            self._upsert_file(path, size, mtime_ns, digest)
+
+    def _upsert_file(self, path, size, mtime_ns, digest):
+        # Called with the lock held.
+        self._db.execute(
+            "INSERT INTO files (path, size, mtime_ns, digest, indexed_at) VALUES (?, ?, ?, ?, ?) "
+            "ON CONFLICT(path) DO UPDATE SET size = excluded.size, mtime_ns = excluded.mtime_ns, "
+            "digest = excluded.digest, indexed_at = excluded.indexed_at",
+            (path, size, mtime_ns, digest, time.time()))
+
+    def _store(self, path, size, mtime_ns, digest, rows, error):
+        with self._lock:
+            self._db.execute("BEGIN")
+            try:
+                self._db.execute(
+                    "INSERT INTO documents (digest, signature_count, error) VALUES (?, ?, ?) "
+                    "ON CONFLICT(digest) DO UPDATE SET signature_count = excluded.signature_count, "
+                    "error = excluded.error",
+                    (digest, len(rows), error))
+                self._db.execute("DELETE FROM signatures WHERE digest = ?", (digest,))
+                self._db.executemany(
+                    f"INSERT INTO signatures (digest, position, {', '.join(COLUMNS)}) "
+                    f"VALUES (?, ?, {', '.join('?' for _ in COLUMNS)})",
+                    [(digest, position, *row) for position, row in enumerate(rows)])
+                self._upsert_file(path, size, mtime_ns, digest)
+                self._db.execute("COMMIT")
+            except Exception:
+                self._db.execute("ROLLBACK")
+                raise
+
+    def _remove_missing(self, root, present):
+        prefix = root.rstrip(os.sep) + os.sep
+        with self._lock:
+            stale = [path for (path,) in self._db.execute(
+                "SELECT path FROM files WHERE substr(path, 1, ?) = ?", (len(prefix), prefix))
+                if path not in present]
+            self._db.execute("BEGIN")
+            self._db.executemany("DELETE FROM files WHERE path = ?", [(path,) for path in stale])
+            # Documents no file points to any more.
+            self._db.execute("DELETE FROM signatures WHERE digest NOT IN (SELECT digest FROM files)")
+            self._db.execute("DELETE FROM documents WHERE digest NOT IN (SELECT digest FROM files)")
+            self._db.execute("COMMIT")
+        return len(stale)
+
+    def query(self, expiring_before=None, expiring_after=None, issuer=None, signer=None, serial=None,
+              signed_before=None, signed_after=None, limit=100, offset=0):
+        """Signatures matching every given filter, soonest expiry first.
+
+        Dates are ISO strings compared in UTC ('2026-12-31' or
+        '2026-12-31T23:59:59'); `issuer` and `signer` match the common name
+        or organization case-insensitively; `serial` is hexadecimal.
+        """
+        clauses, params = [], []
+        if expiring_before:
+            clauses.append("s.valid_to < ?")
+            params.append(expiring_before)
+        if expiring_after:
+            clauses.append("s.valid_to >= ?")
+            params.append(expiring_after)
+        if signed_before:
+            clauses.append("s.signing_time < ?")
+            params.append(signed_before)
+        if signed_after:
+            clauses.append("s.signing_time >= ?")
+            params.append(signed_after)
+        if issuer:
+            clauses.append("(s.issuer_common_name = ? COLLATE NOCASE OR s.issuer_organization = ? COLLATE NOCASE)")
+            params += [issuer, issuer]
+        if signer:
+            clauses.append("(s.signer_common_name = ? COLLATE NOCASE OR s.signer_organization = ? COLLATE NOCASE)")
+            params += [signer, signer]
+        if serial:
+            clauses.append("s.serial = ?")
+            params.append(serial.lower().lstrip('0') or '0')
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        sql = (f"SELECT s.digest, s.position, {', '.join(f's.{column}' for column in COLUMNS)}, "
+               f"(SELECT json_group_array(path) FROM files f WHERE f.digest = s.digest) "
+               f"FROM signatures s {where} ORDER BY s.valid_to, s.digest, s.position LIMIT ? OFFSET ?")
+        with self._lock:
+            rows = self._db.execute(sql, (*params, limit, offset)).fetchall()
+        results = []
+        for digest, position, *values, paths in rows:
+            result = dict(zip(COLUMNS, values))
+            result.update(digest=digest, position=position, paths=json.loads(paths))
+            results.append(result)
+        return results
+
+    def stats(self):
+        with self._lock:
+            files, = self._db.execute("SELECT COUNT(*) FROM files").fetchone()
+            documents, failed = self._db.execute(
+                "SELECT COUNT(*), COUNT(error) FROM documents").fetchone()
+            signatures, = self._db.execute("SELECT COUNT(*) FROM signatures").fetchone()
+        return {'files': files, 'documents': documents, 'failed': failed, 'signatures': signatures}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--db', default='signatures.sqlite3', help='Index database. Default signatures.sqlite3')
+    commands = parser.add_subparsers(dest='command', required=True)
+    index = commands.add_parser('index', help='Index (or re-index) the PDFs under a folder')
+    index.add_argument('folder')
+    index.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    query = commands.add_parser('query', help='Print matching signatures as JSON lines')
+    for name in ('expiring-before', 'expiring-after', 'issuer', 'signer', 'serial', 'signed-before', 'signed-after'):
+        query.add_argument(f'--{name}')
+    query.add_argument('--limit', type=int, default=100)
+    args = parser.parse_args()
+
+    signature_index = SignatureIndex(args.db)
+    if args.command == 'index':
+        signature_index.index(args.folder, workers=args.workers)
+        print(json.dumps(signature_index.stats()))
+    else:
+        filters = {key: value for key, value in vars(args).items() if key not in ('db', 'command', 'limit')}
+        for row in signature_index.query(limit=args.limit, **filters):
+            print(json.dumps(row))
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,427 @@
+"""Run several converter workers behind one port.
+
+    python supervisor.py --config supervisor.json
+
+The supervisor starts `min_workers` instances of main.py on consecutive
+ports, probes each one's /ping, restarts workers that exit or stop
+answering, and serves a router on `router_port` that forwards every
+request to the least-loaded healthy worker. Workers are added while
+requests queue up and removed again once they have been idle for a while.
+
+Example config (every key is optional):
+
+    {
+        "command": ["python", "main.py"],
+        "args": ["--converters", "2", "--threads", "16"],
+        "host": "127.0.0.1",
+        "base_port": 5001,
+        "router_port": 5000,
+        "router_threads": 32,
+        "min_workers": 2,
+        "max_workers": 4,
+        "workdir": "workers",
+        "probe_interval": 5,
+        "probe_timeout": 3,
+        "unhealthy_after": 3,
+        "scale_up_waiting": 4,
+        "scale_down_idle": 300
+    }
+
+Without a "command", workers run main.py with the current interpreter; a
+frozen supervisor executable runs the pdf-converter executable next to it.
+
+Each worker runs in its own directory under `workdir`, so uploads, output
+and the retention index are never shared between processes. Requests for
+a job (/jobs/<id>/...) or a result (/results/<id>) therefore go to the
+worker that returned that id.
+"""
+import argparse
+import http.client
+import json
+import os
+import shutil
+import signal
+import subprocess
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+from waitress import serve
+
+def default_command():
+    if getattr(sys, "frozen", False):
+        # sys.executable is the supervisor itself; main.py is not on disk.
+        name = "pdf-converter.exe" if os.name == "nt" else "pdf-converter"
+        return [os.path.join(os.path.dirname(sys.executable), name)]
+    return [sys.executable, os.path.join(os.path.dirname(os.path.abspath(__file__)), "main.py")]
+
+
+DEFAULTS = {
+    "command": default_command(),
+    "args": [],
+    "host": "127.0.0.1",
+    "base_port": 5001,
+    "router_port": 5000,
+    "router_threads": 32,
+    "min_workers": 2,
+    "max_workers": 4,
+    "workdir": "workers",
+    "probe_interval": 5,
+    "probe_timeout": 3,
+    "unhealthy_after": 3,
+    "startup_grace": 60,
+    "scale_up_waiting": 4,
+    "scale_down_idle": 300,
+}
+
+# Hop-by-hop headers are meaningful for a single connection only.
+HOP_HEADERS = {'connection', 'keep-alive', 'proxy-authenticate', 'proxy-authorization',
+               'te', 'trailers', 'transfer-encoding', 'upgrade'}
+CHUNK_SIZE = 1024 * 1024
+
+
+def cout(message):
+    print(f"[{time.strftime('%Y-%m-%d %H:%M:%S')}] supervisor: {message}", flush=True)
+
+
+def load_config(path):
+    config = dict(DEFAULTS)
+    if path:
+        with open(path) as f:
+            config.update(json.load(f))
+        base = os.path.dirname(os.path.abspath(path))
+        config["workdir"] = os.path.join(base, config["workdir"])
+    if config["min_workers"] < 1 or config["max_workers"] < config["min_workers"]:
+        raise ValueError("Need 1 <= min_workers <= max_workers")
+    program = config["command"][0] if config["command"] else ""
+    if not shutil.which(program):
+        raise ValueError(f"Worker program not found: {program!r}; set \"command\" in the config")
+    return config
+
+
+class Worker:
+    """One main.py process and what the supervisor knows about it."""
+    def __init__(self, port, config):
+        self.port = port
+        self.host = config["host"]
+        self.config = config
+        self.process = None
+        self.started_at = None
+        self.healthy = False
+        self.failures = 0
+        self.restarts = 0
+        self.in_flight = 0
+        self.waiting = 0
+        self.draining = False
+        self.last_busy = time.monotonic()
+
+    def start(self):
+        folder = os.path.join(self.config["workdir"], f"worker-{self.port}")
+        os.makedirs(folder, exist_ok=True)
+        command = list(self.config["command"]) + list(self.config["args"]) + ["--port", str(self.port)]
+        self.process = subprocess.Popen(command, cwd=folder)
+        self.started_at = time.monotonic()
+        self.healthy = False
+        self.failures = 0
+        cout(f"Started worker {self.port} (pid {self.process.pid})")
+
+    def stop(self, timeout=10):
+        if self.process is None or self.process.poll() is not None:
+            return
+        self.process.terminate()
+        try:
+            self.process.wait(timeout)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+            self.process.wait()
+
+    def exited(self):
+        return self.process is None or self.process.poll() is not None
+
+    def request(self, path):
+        connection = http.client.HTTPConnection(self.host, self.port, timeout=self.config["probe_timeout"])
+        try:
+            connection.request("GET", path)
+            response = connection.getresponse()
+            return response.status, response.read()
+        finally:
+            connection.close()
+
+    def probe(self):
+        """Ping the worker and refresh its queue depth; returns True if healthy."""
+        try:
+            status, _ = self.request("/ping")
+            if status != 200:
+                return False
+            status, body = self.request("/admission-stats")
+            if status == 200:
+                self.waiting = sum(lane["waiting"] for lane in json.loads(body).values())
+            return True
+        except (OSError, http.client.HTTPException, ValueError):
+            return False
+
+    def load(self):
+        return self.in_flight + self.waiting
+
+    def to_dict(self):
+        return {
+            "port": self.port,
+            "pid": self.process.pid if self.process else None,
+            "healthy": self.healthy,
+            "draining": self.draining,
+            "in_flight": self.in_flight,
+            "waiting": self.waiting,
+            "restarts": self.restarts,
+        }
+
+
+class Supervisor:
+    def __init__(self, config):
+        self.config = config
+        self.workers = []
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        # Job and result ids live on the worker that returned them; remember
+        # where, keyed by ("jobs" | "results", id).
+        self._owners = OrderedDict()
+
+    def _next_port(self):
+        used = {worker.port for worker in self.workers}
+        port = self.config["base_port"]
+        while port in used:
+            port += 1
+        return port
+
+    def add_worker(self):
+        with self._lock:
+            worker = Worker(self._next_port(), self.config)
+            self.workers.append(worker)
+        worker.start()
+        return worker
+
+    def remove_worker(self, worker):
+        with self._lock:
+            worker.draining = True
+        # Let requests already routed to it finish before stopping it.
+        deadline = time.monotonic() + 600
+        while worker.in_flight and time.monotonic() < deadline:
+            time.sleep(0.5)
+        worker.stop()
+        with self._lock:
+            self.workers.remove(worker)
+        cout(f"Stopped worker {worker.port}")
+
+    def start(self):
+        for _ in range(self.config["min_workers"]):
+            self.add_worker()
+        threading.Thread(target=self._monitor, daemon=True).start()
+
+    def close(self):
+        self._stop.set()
+        for worker in list(self.workers):
+            worker.stop()
+
+    def _monitor(self):
+        while not self._stop.wait(self.config["probe_interval"]):
+            for worker in list(self.workers):
+                self._check(worker)
+            self._scale()
+
+    def _check(self, worker):
+        if worker.draining:
+            return
+        if worker.exited():
+            cout(f"Worker {worker.port} exited with {worker.process.returncode}; restarting")
+            worker.healthy = False
+            worker.restarts += 1
+            worker.start()
+            return
+        if worker.probe():
+            if not worker.healthy:
+                cout(f"Worker {worker.port} is healthy")
+            worker.healthy = True
+            worker.failures = 0
+            return
+        worker.failures += 1
+        starting = time.monotonic() - worker.started_at < self.config["startup_grace"]
+        if starting and not worker.healthy:
+            return
+        worker.healthy = False
+        if worker.failures >= self.config["unhealthy_after"]:
+            cout(f"Worker {worker.port} failed {worker.failures} probes; restarting")
+            worker.stop()
+            worker.restarts += 1
+            worker.start()
+
+    def _scale(self):
+        with self._lock:
+            active = [worker for worker in self.workers if not worker.draining]
+        healthy = [worker for worker in active if worker.healthy]
+        if not healthy:
+            return
+        now = time.monotonic()
+        for worker in healthy:
+            if worker.load():
+                worker.last_busy = now
+        waiting = sum(worker.waiting for worker in healthy) / len(healthy)
+        if waiting >= self.config["scale_up_waiting"] and len(active) < self.config["max_workers"]:
+            cout(f"Average of {waiting:.1f} waiting requests per worker; adding a worker")
+            self.add_worker()
+        elif len(active) > self.config["min_workers"]:
+            idle = [worker for worker in healthy if now - worker.last_busy > self.config["scale_down_idle"]]
+            if len(idle) == len(healthy):
+                threading.Thread(target=self.remove_worker, args=(idle[-1],), daemon=True).start()
+
+    def pick(self, path):
+        """Least-loaded healthy worker, or the one that owns the job or result in `path`."""
+        with self._lock:
+            parts = path.split("/")
+            if len(parts) > 2 and parts[1] in ("jobs", "results"):
+                owner = self._owners.get((parts[1], parts[2]))
+                if owner is not None and owner in self.workers:
+                    owner.in_flight += 1
+                    return owner
+            candidates = [worker for worker in self.workers if worker.healthy and not worker.draining]
+            if not candidates:
+                return None
+            worker = min(candidates, key=Worker.load)
+            worker.in_flight += 1
+            return worker
+
+    def done(self, worker):
+        with self._lock:
+            worker.in_flight -= 1
+
+    def remember(self, kind, key, worker):
+        with self._lock:
+            self._owners[(kind, key)] = worker
+            self._owners.move_to_end((kind, key))
+            while len(self._owners) > 100000:
+                self._owners.popitem(last=False)
+
+    def status(self):
+        with self._lock:
+            return {"workers": [worker.to_dict() for worker in self.workers]}
+
+
+class _Relay:
+    """Response body streamed from a worker; `close` runs even if unread."""
+    def __init__(self, response, on_close):
+        self.response = response
+        self.on_close = on_close
+
+    def __iter__(self):
+        while True:
+            chunk = self.response.read(CHUNK_SIZE)
+            if not chunk:
+                return
+            yield chunk
+
+    def close(self):
+        if self.on_close:
+            self.on_close()
+            self.on_close = None
+
+
+class Router:
+    """WSGI app forwarding requests to the supervisor's workers."""
+    def __init__(self, supervisor):
+        self.supervisor = supervisor
+
+    def __call__(self, environ, start_response):
+        path = environ.get("PATH_INFO", "/")
+        if path == "/supervisor/status":
+            body = json.dumps(self.supervisor.status()).encode()
+            start_response("200 OK", [("Content-Type", "application/json"), ("Content-Length", str(len(body)))])
+            return [body]
+
+        worker = self.supervisor.pick(path)
+        if worker is None:
+            return self._error(start_response, "503 Service Unavailable", "No healthy worker")
+        try:
+            connection, response = self._forward(worker, path, environ)
+        except (OSError, http.client.HTTPException) as e:
+            self.supervisor.done(worker)
+            return self._error(start_response, "502 Bad Gateway", f"Worker {worker.port} failed: {e}")
+
+        headers = [(name, value) for name, value in response.getheaders() if name.lower() not in HOP_HEADERS]
+        start_response(f"{response.status} {response.reason}", headers)
+        result_id = response.getheader("X-Result-ID")
+        if result_id:
+            self.supervisor.remember("results", result_id, worker)
+        if environ["REQUEST_METHOD"] == "POST" and path == "/jobs" and response.status == 202:
+            body = response.read()
+            self._release(worker, connection)
+            try:
+                self.supervisor.remember("jobs", json.loads(body)["id"], worker)
+            except (ValueError, KeyError):
+                pass
+            return [body]
+        return _Relay(response, lambda: self._release(worker, connection))
+
+    def _forward(self, worker, path, environ):
+        query = environ.get("QUERY_STRING")
+        target = f"{path}?{query}" if query else path
+        headers = {}
+        for key, value in environ.items():
+            if key.startswith("HTTP_"):
+                name = key[5:].replace("_", "-").title()
+                if name.lower() not in HOP_HEADERS:
+                    headers[name] = value
+        if environ.get("CONTENT_TYPE"):
+            headers["Content-Type"] = environ["CONTENT_TYPE"]
+        length = int(environ.get("CONTENT_LENGTH") or 0)
+        headers["Content-Length"] = str(length)
+        # Fair-share admission on the worker keys on the original client.
+        headers.setdefault("X-Client-Id", environ.get("REMOTE_ADDR", ""))
+        headers["X-Forwarded-For"] = ", ".join(filter(None, [headers.get("X-Forwarded-For"), environ.get("REMOTE_ADDR")]))
+
+        connection = http.client.HTTPConnection(worker.host, worker.port, timeout=3600)
+        connection.putrequest(environ["REQUEST_METHOD"], target, skip_host=True, skip_accept_encoding=True)
+        connection.putheader("Host", f"{worker.host}:{worker.port}")
+        for name, value in headers.items():
+            connection.putheader(name, value)
+        connection.endheaders()
+        body = environ["wsgi.input"]
+        while length > 0:
+            chunk = body.read(min(CHUNK_SIZE, length))
+            if not chunk:
+                break
+            connection.send(chunk)
+            length -= len(chunk)
+        return connection, connection.getresponse()
+
+    def _release(self, worker, connection):
+        connection.close()
+        self.supervisor.done(worker)
+
+    @staticmethod
+    def _error(start_response, status, message):
+        body = json.dumps({"error": message}).encode()
+        start_response(status, [("Content-Type", "application/json"), ("Content-Length", str(len(body)))])
+        return [body]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Supervise converter workers behind a load-balancing router")
+    parser.add_argument('--config', help='JSON config file, see the module docstring')
+    args = parser.parse_args()
+
+    try:
+        config = load_config(args.config)
+    except ValueError as e:
+        parser.error(str(e))
+    supervisor = Supervisor(config)
+    # Turn a service stop into SystemExit so the workers are stopped too.
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    supervisor.start()
+    cout(f"Routing port {config['router_port']} to {config['min_workers']}-{config['max_workers']} workers")
+    try:
+        serve(Router(supervisor), host='0.0.0.0', port=config["router_port"], threads=config["router_threads"])
+    finally:
+        supervisor.close()
+
+
+if __name__ == "__main__":
+    main()
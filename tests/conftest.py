@@ -0,0 +1,15 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from log_pipeline import pipeline
+
+
+@pytest.fixture(autouse=True, scope='session')
+def log_folder(tmp_path_factory):
+    # Keep the JSON-lines log of the code under test out of the work tree.
+    pipeline.folder = str(tmp_path_factory.mktemp('log'))
+    pipeline.echo = False
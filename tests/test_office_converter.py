@@ -0,0 +1,104 @@
+import pytest
+
+from office_converter import ConversionTimeout, ConverterPool, FakeConverter
+
+
+class HangingConverter(FakeConverter):
+    hang_on = 'poison'
+
+
+class HangOnceConverter(FakeConverter):
+    """Hangs on the first conversion of the first instance only."""
+    hangs = None
+
+    def convert(self, file_path, output_path):
+        if HangOnceConverter.hangs:
+            HangOnceConverter.hangs -= 1
+            self._killed.wait()
+            raise RuntimeError("Fake converter was killed.")
+        return super().convert(file_path, output_path)
+
+
+@pytest.fixture
+def make_pool():
+    pools = []
+
+    def make(factory=FakeConverter, **kwargs):
+        pool = ConverterPool({'word': factory}, **kwargs)
+        pool.start(wait=True)
+        pools.append(pool)
+        return pool
+    yield make
+    for pool in pools:
+        pool.close()
+
+
+def convert(pool, tmp_path, name='document.docx'):
+    source = tmp_path / name
+    source.write_bytes(b'document')
+    output = tmp_path / (name + '.pdf')
+    pool.convert('word', str(source), str(output))
+    return output
+
+
+def test_instance_is_recycled_after_max_jobs(make_pool, tmp_path):
+    pool = make_pool(size=1, max_jobs=2)
+    with pool.acquire('word') as first:
+        pass
+
+    convert(pool, tmp_path)
+    with pool.acquire('word') as instance:
+        assert instance is first
+        assert instance.jobs == 1
+    convert(pool, tmp_path)
+
+    assert pool.recycled == 1
+    with pool.acquire('word', timeout=5) as instance:
+        assert instance is not first
+        assert instance.jobs == 0
+    assert pool.stats()['instances']['word'] == {'idle': 1, 'busy': 0, 'launching': 0}
+
+
+def test_health_check_replaces_dead_instance(make_pool):
+    pool = make_pool(size=2)
+    with pool.acquire('word') as dead, pool.acquire('word') as healthy:
+        pass
+    dead.backend.kill()
+
+    pool.check_idle(timeout=5)
+
+    with pool.acquire('word', timeout=5) as first, pool.acquire('word', timeout=5) as second:
+        assert healthy in (first, second)
+        assert dead not in (first, second)
+    assert pool.recycled == 0
+
+
+def test_watchdog_kills_and_retries_hanging_conversion(make_pool, tmp_path):
+    HangOnceConverter.hangs = 1
+    pool = make_pool(HangOnceConverter, size=1, convert_timeout=0.2, retries=1)
+    with pool.acquire('word') as stuck:
+        pass
+
+    output = convert(pool, tmp_path)
+
+    assert output.read_bytes().startswith(b'%PDF-')
+    stats = pool.stats()
+    assert (stats['timeouts'], stats['kills']) == (1, 1)
+    assert [entry['attempt'] for entry in stats['timed_out']] == [1]
+    assert stuck.alive is False
+    with pool.acquire('word', timeout=5) as instance:
+        assert instance is not stuck
+
+
+def test_poison_document_times_out_on_every_attempt(make_pool, tmp_path):
+    pool = make_pool(HangingConverter, size=1, convert_timeout=0.2, retries=1)
+
+    with pytest.raises(ConversionTimeout):
+        convert(pool, tmp_path, 'poison.docx')
+
+    stats = pool.stats()
+    assert stats['timeouts'] == 2
+    assert [(entry['file'], entry['attempt']) for entry in stats['timed_out']] == [
+        ('poison.docx', 1), ('poison.docx', 2)]
+    # A fresh instance still converts other documents.
+    assert convert(pool, tmp_path).read_bytes().startswith(b'%PDF-')
@@ -0,0 +1,100 @@
+import threading
+import zipfile
+
+import fitz
+import pytest
+
+from office_converter import ConverterPool, FakeConverter, write_placeholder_pdf
+from sheet_export import SheetExportError, SheetOptions, export_workbook
+
+PAGES = {'Summary': 1, 'Q1': 2, 'Q2': 3, 'Broken': 1, 'Q3': 1}
+
+
+class SheetConverter(FakeConverter):
+    """Writes `PAGES[sheet]` pages per sheet and fails the sheet named Broken."""
+    barrier = None
+    calls = []
+
+    def export_sheets(self, file_path, targets):
+        SheetConverter.calls.append((self, [name for name, _ in targets]))
+        if SheetConverter.barrier:
+            # Only passes when every run is exported at the same time.
+            SheetConverter.barrier.wait()
+        results = []
+        for name, output_path in targets:
+            if name == 'Broken':
+                results.append((0.0, 'Export failed'))
+                continue
+            write_placeholder_pdf(output_path, pages=PAGES[name])
+            results.append((0.001, None))
+        return results
+
+
+@pytest.fixture
+def pool():
+    SheetConverter.calls = []
+    pool = ConverterPool({'excel': SheetConverter}, size=3)
+    pool.start(wait=True)
+    yield pool
+    pool.close()
+
+
+@pytest.fixture
+def workbook(tmp_path):
+    path = tmp_path / 'book.xlsx'
+    sheets = ''.join(
+        f'<sheet name="{name}" sheetId="{index}"{state}/>' for index, (name, state) in enumerate([
+            ('Summary', ''), ('Q1', ''), ('Hidden', ' state="hidden"'), ('Q2', ''), ('Broken', ''), ('Q3', '')]))
+    with zipfile.ZipFile(path, 'w') as archive:
+        archive.writestr('xl/workbook.xml', f'<workbook><sheets>{sheets}</sheets></workbook>')
+    return path
+
+
+def test_sheets_are_exported_in_parallel_and_stitched_in_order(pool, workbook, tmp_path):
+    SheetConverter.barrier = threading.Barrier(3, timeout=5)
+    output = tmp_path / 'book.pdf'
+    try:
+        report = export_workbook(pool, str(workbook), str(output), SheetOptions('Summary,Q1,Q2,Q3'))
+    finally:
+        SheetConverter.barrier = None
+
+    assert report['parallel'] == 3
+    # Contiguous runs, one per instance.
+    assert sorted(names for _, names in SheetConverter.calls) == [['Q2'], ['Q3'], ['Summary', 'Q1']]
+    assert len({instance for instance, _ in SheetConverter.calls}) == 3
+
+    assert [(entry['sheet'], entry['pages']) for entry in report['sheets']] == [
+        ('Summary', 1), ('Q1', 2), ('Q2', 3), ('Q3', 1)]
+    with fitz.open(str(output)) as doc:
+        assert doc.page_count == 7
+        assert doc.get_toc() == [[1, 'Summary', 1], [1, 'Q1', 2], [1, 'Q2', 4], [1, 'Q3', 7]]
+    # The per-sheet PDFs are removed once stitched.
+    assert sorted(path.name for path in tmp_path.iterdir()) == ['book.pdf', 'book.xlsx']
+
+
+def test_failed_sheet_fails_the_export(pool, workbook, tmp_path):
+    output = tmp_path / 'book.pdf'
+
+    with pytest.raises(SheetExportError, match='1 of 5 sheets could not be exported: Broken') as raised:
+        export_workbook(pool, str(workbook), str(output), SheetOptions())
+
+    assert [(entry['sheet'], entry['pages'], entry.get('error')) for entry in raised.value.report['sheets']] == [
+        ('Summary', 1, None), ('Q1', 2, None), ('Q2', 3, None), ('Broken', 0, 'Export failed'), ('Q3', 1, None)]
+    # No partial workbook is left behind to be served or cached.
+    assert sorted(path.name for path in tmp_path.iterdir()) == ['book.xlsx']
+
+
+def test_selected_sheets_only(pool, workbook, tmp_path):
+    output = tmp_path / 'book.pdf'
+
+    report = export_workbook(pool, str(workbook), str(output), SheetOptions('Q3,1-2', parallel=1))
+
+    assert report['parallel'] == 1
+    assert [names for _, names in SheetConverter.calls] == [['Summary', 'Q1', 'Q3']]
+    with fitz.open(str(output)) as doc:
+        assert doc.get_toc() == [[1, 'Summary', 1], [1, 'Q1', 2], [1, 'Q3', 4]]
+
+
+def test_no_exported_sheet_is_an_error(pool, workbook, tmp_path):
+    with pytest.raises(SheetExportError, match='None of the selected sheets'):
+        export_workbook(pool, str(workbook), str(tmp_path / 'book.pdf'), SheetOptions('Broken'))
@@ -0,0 +1,39 @@
+import io
+
+import pytest
+from flask import Flask, jsonify
+
+from benchmarks.signature_serialization import legacy_details
+from benchmarks.signed_pdf import make_pdf
+from pdf_signature_extract import Signature, SignatureDetails, SignatureExtract, dumps_signatures
+
+
+@pytest.fixture(scope='module')
+def pdf():
+    return make_pdf(pages=1, signatures=3, timestamp=True, signers=['Signer 1', 'Signataire é'])
+
+
+def jsonified(value):
+    # The bytes /extract-signature sent when it returned jsonify(...).
+    with Flask(__name__).app_context():
+        return jsonify(value).get_data(as_text=True).rstrip('\n')
+
+
+def test_json_matches_the_former_jsonify_output(pdf):
+    attrdicts = list(SignatureExtract(cache=False)._signature_attrdicts(io.BytesIO(pdf)))
+
+    before = jsonified([legacy_details(Signature(dict(attrdict))) for attrdict in attrdicts])
+    after = dumps_signatures([SignatureDetails.from_attrdict(attrdict) for attrdict in attrdicts])
+
+    assert after == before
+
+
+def test_json_with_verification_and_raw_matches_to_dict(pdf, tmp_path):
+    path = tmp_path / 'signed.pdf'
+    path.write_bytes(pdf)
+
+    details = SignatureExtract(cache=False).get_signature_details(str(path), verify=True, keep_raw=True)
+
+    assert [d.verification.integrity for d in details] == ['valid', 'valid', 'valid']
+    assert all(d.raw for d in details)
+    assert dumps_signatures(details) == jsonified([d.to_dict() for d in details])
@@ -0,0 +1,119 @@
+import hashlib
+import io
+import os
+import time
+import uuid
+from datetime import datetime
+
+from flask import Request, current_app
+from werkzeug.exceptions import RequestEntityTooLarge
+from werkzeug.utils import secure_filename
+
+
+class UploadFile:
+    """Write target for one multipart file part.
+
+    The part is written straight to a uniquely named file in the upload
+    folder (or kept in memory when `path` is None) while its SHA-256 and size
+    are computed, and the upload is aborted as soon as it exceeds `max_size`.
+
+    Uploads are removed when the request ends unless the view `claim`s them.
+    """
+    claimed = False
+
+    def __init__(self, filename, path=None, max_size=None):
+        self.filename = filename
+        self.path = path
+        self.max_size = max_size
+        self.size = 0
+        self._sha256 = hashlib.sha256()
+        self._file = open(path, 'w+b') if path else io.BytesIO()
+
+    @property
+    def in_memory(self):
+        return self.path is None
+
+    def write(self, data):
+        self.size += len(data)
+        if self.max_size is not None and self.size > self.max_size:
+            self.discard()
+            raise RequestEntityTooLarge(f"Uploaded file is larger than {self.max_size} bytes")
+        self._sha256.update(data)
+        return self._file.write(data)
+
+    def hexdigest(self):
+        return self._sha256.hexdigest()
+
+    def source(self):
+        """Path of the saved upload, or an in-memory buffer positioned at 0."""
+        if self.in_memory:
+            self._file.seek(0)
+            return self._file
+        self._file.close()
+        return self.path
+
+    def claim(self):
+        """Keep the saved file after the request; the caller now removes it."""
+        self.claimed = True
+        return self
+
+    def discard(self):
+        self._file.close()
+        if self.path and os.path.exists(self.path):
+            os.remove(self.path)
+
+    def __getattr__(self, name):
+        return getattr(self._file, name)
+
+
+class StreamingRequest(Request):
+    """Request class that streams uploaded files into UploadFile objects.
+
+    Replaces werkzeug's spooled temporary files so each upload is written
+    once, to its final location, instead of being spooled and then copied
+    by `FileStorage.save`.
+
+    `upload_seconds` is the time spent receiving and writing the files, or
+    None when the request carried no file.
+    """
+    upload_seconds = None
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Every file part written so far, including those of a form that
+        # failed to parse half way.
+        self.uploads = []
+
+    def discard_unclaimed(self):
+        """Remove the uploads the view did not `claim`."""
+        for upload in self.uploads:
+            if not upload.claimed:
+                upload.discard()
+
+    def _load_form_data(self):
+        start = time.perf_counter()
+        super()._load_form_data()
+        if self.files:
+            self.upload_seconds = time.perf_counter() - start
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        config = current_app.config
+        filename = secure_filename(filename or '') or 'upload'
+        max_size = config.get('MAX_UPLOAD_BYTES')
+        if max_size is not None and total_content_length and total_content_length > max_size:
+            raise RequestEntityTooLarge(f"Uploaded file is larger than {max_size} bytes")
+
+        in_memory = (
+            self.path in config.get('UPLOAD_MEMORY_ROUTES', ())
+            and total_content_length is not None
+            and total_content_length <= config.get('UPLOAD_MEMORY_MAX', 0)
+        )
+        if in_memory:
+            upload = UploadFile(filename, max_size=max_size)
+        else:
+            timestamp = datetime.now().strftime('%Y%m%d%H%M%S')
+            unique_name = f"{timestamp}_{uuid.uuid4().hex[:8]}_{filename}"
+            path = os.path.abspath(os.path.join(config['UPLOAD_FOLDER'], unique_name))
+            upload = UploadFile(filename, path=path, max_size=max_size)
+        self.uploads.append(upload)
+        return upload